@@ -0,0 +1,402 @@
+from datetime import datetime, timezone, timedelta
+import os
+from typing import TYPE_CHECKING, Optional, List, Dict, Tuple
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+if TYPE_CHECKING:
+    import numpy as np  # imported on first analytics call; it is the slowest import on the startup path
+
+# Upper bounds (ms) of the latency histogram stored in every rollup row.
+# Anything slower than the last bound lands in the overflow bucket.
+LATENCY_BOUNDS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+OVERFLOW_BOUND = LATENCY_BOUNDS_MS[-1] + 1
+PERCENTILES = (50, 90, 95, 99)
+INTERVALS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+DEFAULT_RANGE = timedelta(hours=24)
+# An hour is only rolled up a little after it closes, so rows stamped just before
+# the boundary but still in flight to Mongo are not skipped
+ROLLUP_GRACE = timedelta(seconds=int(os.environ.get("ROLLUP_GRACE_SECONDS", "60")))
+
+
+def floor_hour(value: datetime) -> datetime:
+    """Truncate a timestamp to the start of its hour (UTC)"""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value: datetime) -> datetime:
+    """Truncate a timestamp to the start of its day (UTC)"""
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def resolve_range(start: Optional[datetime], end: Optional[datetime]) -> Tuple[datetime, datetime]:
+    """Normalize an analytics time range, defaulting to the last 24 hours"""
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    start = _as_utc(start) if start else end - DEFAULT_RANGE
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return start, end
+
+
+def _latency_bucket_expr() -> dict:
+    """Aggregation expression mapping $time to its histogram upper bound"""
+    return {
+        "$switch": {
+            "branches": [
+                {"case": {"$lt": ["$time", bound]}, "then": bound}
+                for bound in LATENCY_BOUNDS_MS
+            ],
+            "default": OVERFLOW_BOUND
+        }
+    }
+
+
+def rollup_pipeline(match: dict) -> List[dict]:
+    """Group raw history rows into hourly per-endpoint/per-status rows with a latency histogram"""
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "org_id": "$org_id",
+                "hour": {"$dateTrunc": {"date": "$timestamp", "unit": "hour"}},
+                "method": "$method",
+                "endpoint": {"$arrayElemAt": [{"$split": ["$url", "?"]}, 0]},
+                "status": "$status",
+                "le": _latency_bucket_expr()
+            },
+            "count": {"$sum": 1},
+            "time_sum": {"$sum": "$time"},
+            "time_max": {"$max": "$time"}
+        }},
+        {"$group": {
+            "_id": {
+                "org_id": "$_id.org_id",
+                "hour": "$_id.hour",
+                "method": "$_id.method",
+                "endpoint": "$_id.endpoint",
+                "status": "$_id.status"
+            },
+            "count": {"$sum": "$count"},
+            "time_sum": {"$sum": "$time_sum"},
+            "time_max": {"$max": "$time_max"},
+            "buckets": {"$push": {"le": "$_id.le", "n": "$count"}}
+        }},
+        {"$project": {
+            "_id": 0,
+            "org_id": "$_id.org_id",
+            "hour": "$_id.hour",
+            "method": "$_id.method",
+            "endpoint": "$_id.endpoint",
+            "status": "$_id.status",
+            "count": 1,
+            "time_sum": 1,
+            "time_max": 1,
+            "buckets": 1
+        }}
+    ]
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    """Create indexes used by history queries and rollup merges"""
+    await db.request_history.create_index([("org_id", 1), ("timestamp", -1)])
+    await db.request_history_hourly.create_index(
+        [("org_id", 1), ("hour", 1), ("method", 1), ("endpoint", 1), ("status", 1)],
+        unique=True
+    )
+    await db.request_history_daily.create_index(
+        [("org_id", 1), ("day", 1), ("method", 1), ("endpoint", 1), ("status", 1)],
+        unique=True
+    )
+
+
+async def _rollup_state(db: AsyncIOMotorDatabase, org_id: str) -> dict:
+    state = await db.request_history_rollup_state.find_one({"org_id": org_id}, {"_id": 0})
+    return state or {}
+
+
+def _expiry_stage(field: str, expire_after: Optional[timedelta]) -> List[dict]:
+    if expire_after is None:
+        return []
+    millis = int(expire_after.total_seconds() * 1000)
+    return [{"$addFields": {"expires_at": {"$add": [f"${field}", millis]}}}]
+
+
+async def refresh_hourly_rollups(
+    db: AsyncIOMotorDatabase,
+    org_id: str,
+    now: Optional[datetime] = None,
+    expire_after: Optional[timedelta] = None
+):
+    """Roll up every hour that closed at least ROLLUP_GRACE before `now` and is not yet materialized"""
+    until = floor_hour((_as_utc(now) if now else datetime.now(timezone.utc)) - ROLLUP_GRACE)
+
+    state = await _rollup_state(db, org_id)
+    since = _as_utc(state["rolled_until"]) if state.get("rolled_until") else None
+    if since is not None and since >= until:
+        return
+
+    match = {"org_id": org_id, "timestamp": {"$lt": until}}
+    if since is not None:
+        match["timestamp"]["$gte"] = since
+
+    pipeline = rollup_pipeline(match) + _expiry_stage("hour", expire_after) + [{
+        "$merge": {
+            "into": "request_history_hourly",
+            "on": ["org_id", "hour", "method", "endpoint", "status"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }
+    }]
+    await db.request_history.aggregate(pipeline).to_list(length=None)
+
+    await db.request_history_rollup_state.update_one(
+        {"org_id": org_id},
+        {"$set": {"org_id": org_id, "rolled_until": until}},
+        upsert=True
+    )
+
+
+async def refresh_daily_rollups(
+    db: AsyncIOMotorDatabase,
+    org_id: str,
+    expire_after: Optional[timedelta] = None
+):
+    """Fold completed days of hourly rollups into daily rollups"""
+    state = await _rollup_state(db, org_id)
+    if not state.get("rolled_until"):
+        return
+    until = floor_day(_as_utc(state["rolled_until"]))
+    since = _as_utc(state["daily_rolled_until"]) if state.get("daily_rolled_until") else None
+    if since is not None and since >= until:
+        return
+
+    match = {"org_id": org_id, "hour": {"$lt": until}}
+    if since is not None:
+        match["hour"]["$gte"] = since
+
+    pipeline = [
+        {"$match": match},
+        {"$unwind": {"path": "$buckets", "includeArrayIndex": "bucket_index"}},
+        {"$group": {
+            "_id": {
+                "org_id": "$org_id",
+                "day": {"$dateTrunc": {"date": "$hour", "unit": "day"}},
+                "method": "$method",
+                "endpoint": "$endpoint",
+                "status": "$status",
+                "le": "$buckets.le"
+            },
+            "n": {"$sum": "$buckets.n"},
+            # Each hourly row is unwound once per bucket; count its totals only once
+            "time_sum": {"$sum": {"$cond": [{"$eq": ["$bucket_index", 0]}, "$time_sum", 0]}},
+            "time_max": {"$max": "$time_max"}
+        }},
+        {"$group": {
+            "_id": {
+                "org_id": "$_id.org_id",
+                "day": "$_id.day",
+                "method": "$_id.method",
+                "endpoint": "$_id.endpoint",
+                "status": "$_id.status"
+            },
+            "count": {"$sum": "$n"},
+            "time_sum": {"$sum": "$time_sum"},
+            "time_max": {"$max": "$time_max"},
+            "buckets": {"$push": {"le": "$_id.le", "n": "$n"}}
+        }},
+        {"$project": {
+            "_id": 0,
+            "org_id": "$_id.org_id",
+            "day": "$_id.day",
+            "method": "$_id.method",
+            "endpoint": "$_id.endpoint",
+            "status": "$_id.status",
+            "count": 1,
+            "time_sum": 1,
+            "time_max": 1,
+            "buckets": 1
+        }}
+    ] + _expiry_stage("day", expire_after) + [{
+        "$merge": {
+            "into": "request_history_daily",
+            "on": ["org_id", "day", "method", "endpoint", "status"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }
+    }]
+    await db.request_history_hourly.aggregate(pipeline).to_list(length=None)
+
+    await db.request_history_rollup_state.update_one(
+        {"org_id": org_id},
+        {"$set": {"daily_rolled_until": until}}
+    )
+
+
+def _histogram(buckets: List[dict]) -> "np.ndarray":
+    """Convert stored bucket rows into a dense count vector"""
+    import numpy as np
+
+    bounds = LATENCY_BOUNDS_MS + [OVERFLOW_BOUND]
+    hist = np.zeros(len(bounds), dtype=np.int64)
+    for bucket in buckets or []:
+        hist[bounds.index(bucket["le"])] += bucket["n"]
+    return hist
+
+
+def _percentiles(hist: "np.ndarray", time_max: int) -> Dict[str, Optional[float]]:
+    """Estimate latency percentiles from a histogram by linear interpolation within buckets"""
+    import numpy as np
+
+    total = int(hist.sum())
+    if total == 0:
+        return {f"p{p}": None for p in PERCENTILES}
+
+    uppers = np.array(LATENCY_BOUNDS_MS + [max(time_max, OVERFLOW_BOUND)], dtype=np.float64)
+    lowers = np.concatenate(([0.0], uppers[:-1]))
+    cumulative = np.cumsum(hist)
+    ranks = np.array(PERCENTILES, dtype=np.float64) / 100.0 * total
+    idx = np.searchsorted(cumulative, ranks, side="left")
+    before = np.where(idx > 0, cumulative[idx - 1], 0)
+    fraction = (ranks - before) / np.maximum(hist[idx], 1)
+    values = np.minimum(lowers[idx] + fraction * (uppers[idx] - lowers[idx]), time_max)
+    return {f"p{p}": round(float(v), 1) for p, v in zip(PERCENTILES, values)}
+
+
+def _is_error(status: int) -> bool:
+    return status is None or status < 100 or status >= 400
+
+
+class _Accumulator:
+    """Running totals for one analytics group"""
+
+    def __init__(self):
+        import numpy as np
+
+        self.count = 0
+        self.errors = 0
+        self.time_sum = 0
+        self.time_max = 0
+        self.hist = np.zeros(len(LATENCY_BOUNDS_MS) + 1, dtype=np.int64)
+
+    def add(self, row: dict, hist: "np.ndarray"):
+        self.count += row["count"]
+        if _is_error(row.get("status")):
+            self.errors += row["count"]
+        self.time_sum += row.get("time_sum") or 0
+        self.time_max = max(self.time_max, row.get("time_max") or 0)
+        self.hist += hist
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.count, 4) if self.count else 0.0,
+            "avg_ms": round(self.time_sum / self.count, 1) if self.count else None,
+            "max_ms": self.time_max,
+            **_percentiles(self.hist, self.time_max)
+        }
+
+
+async def _collect_rows(db: AsyncIOMotorDatabase, org_id: str, start: datetime, end: datetime, tiers: list) -> List[dict]:
+    """Fetch rollup-shaped rows for a range, preferring the coarsest compacted tier"""
+    if start >= end:
+        return []
+    if not tiers:
+        return await db.request_history.aggregate(rollup_pipeline({
+            "org_id": org_id,
+            "timestamp": {"$gte": start, "$lt": end}
+        })).to_list(length=None)
+
+    collection, field, floor, step, rolled_until = tiers[0]
+    full_start = floor(start)
+    if full_start < start:
+        full_start += step
+    full_end = floor(end)
+    if rolled_until is not None:
+        full_end = min(full_end, _as_utc(rolled_until))
+    if rolled_until is None or full_start >= full_end:
+        return await _collect_rows(db, org_id, start, end, tiers[1:])
+
+    rows = await db[collection].find(
+        {"org_id": org_id, field: {"$gte": full_start, "$lt": full_end}},
+        {"_id": 0, "expires_at": 0}
+    ).to_list(length=None)
+    if field != "hour":
+        for row in rows:
+            row["hour"] = row.pop(field)
+
+    rows += await _collect_rows(db, org_id, start, full_start, tiers[1:])
+    rows += await _collect_rows(db, org_id, full_end, end, tiers[1:])
+    return rows
+
+
+def _interval_start(hour: datetime, interval: str) -> datetime:
+    if interval == "day":
+        return hour.replace(hour=0)
+    return hour
+
+
+async def history_analytics(
+    db: AsyncIOMotorDatabase,
+    org_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    interval: str = "hour",
+    limit: int = 50
+) -> dict:
+    """Compute per-endpoint/per-status stats and a time series over request history.
+
+    Whole periods already compacted are served from the daily/hourly rollups; only
+    the uncompacted remainder at either edge of the range is aggregated from raw history.
+    """
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of: {', '.join(INTERVALS)}")
+    start, end = resolve_range(start, end)
+
+    state = await _rollup_state(db, org_id)
+    tiers = [("request_history_hourly", "hour", floor_hour, timedelta(hours=1), state.get("rolled_until"))]
+    if interval == "day":
+        tiers.insert(0, ("request_history_daily", "day", floor_day, timedelta(days=1), state.get("daily_rolled_until")))
+    rows = await _collect_rows(db, org_id, start, end, tiers)
+
+    totals = _Accumulator()
+    endpoints: Dict[Tuple[str, str], _Accumulator] = {}
+    statuses: Dict[int, int] = {}
+    series: Dict[datetime, _Accumulator] = {}
+
+    for row in rows:
+        hist = _histogram(row.get("buckets"))
+        totals.add(row, hist)
+        endpoints.setdefault((row["method"], row["endpoint"]), _Accumulator()).add(row, hist)
+        statuses[row["status"]] = statuses.get(row["status"], 0) + row["count"]
+        bucket = _interval_start(_as_utc(row["hour"]), interval)
+        series.setdefault(bucket, _Accumulator()).add(row, hist)
+
+    endpoint_rows = [
+        {"method": method, "endpoint": endpoint, **acc.summary()}
+        for (method, endpoint), acc in endpoints.items()
+    ]
+    endpoint_rows.sort(key=lambda r: r["count"], reverse=True)
+
+    return {
+        "org_id": org_id,
+        "start": start,
+        "end": end,
+        "interval": interval,
+        "totals": totals.summary(),
+        "endpoints": endpoint_rows[:limit],
+        "statuses": [
+            {"status": status, "count": count}
+            for status, count in sorted(statuses.items(), key=lambda item: item[0] or 0)
+        ],
+        "series": [
+            {"bucket": bucket, **acc.summary()}
+            for bucket, acc in sorted(series.items())
+        ]
+    }
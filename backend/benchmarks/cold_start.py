@@ -0,0 +1,42 @@
+"""Cold-start probe, run in a fresh interpreter by benchmarks.run.
+
+Times `import server` and the first two requests against a freshly seeded
+stand-in database, then prints the timings as one JSON line. Runs as its own
+process so nothing is already imported or warmed.
+"""
+import asyncio
+import json
+import sys
+import time
+
+started = time.perf_counter()
+import server  # noqa: E402
+imported = time.perf_counter()
+
+
+async def main(requests: int):
+    import httpx
+    from benchmarks.run import bind_server
+    from benchmarks.seed import seed_org, BENCH_ORG_ID, BENCH_TOKEN
+    from benchmarks.standin import StandInDatabase
+
+    db = StandInDatabase()
+    await seed_org(db, requests, 1, "http://127.0.0.1:1")
+    bind_server(db)
+    transport = httpx.ASGITransport(app=server.app)
+    auth = {"Authorization": f"Bearer {BENCH_TOKEN}"}
+    timings = {"import_ms": (imported - started) * 1000}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=auth) as http:
+        for key in ["first_request_ms", "second_request_ms"]:
+            begun = time.perf_counter()
+            response = await http.get(f"/api/organizations/{BENCH_ORG_ID}/requests")
+            if response.status_code != 200:
+                raise RuntimeError(f"cold start request -> {response.status_code}: {response.text[:200]}")
+            timings[key] = (time.perf_counter() - begun) * 1000
+    server.http_session.close()
+    server.dispatcher.shutdown()
+    print(json.dumps({key: round(value, 3) for key, value in timings.items()}))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
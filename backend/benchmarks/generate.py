@@ -0,0 +1,242 @@
+"""Deterministic synthetic data for scale testing.
+
+Usage (from backend/):
+    python -m benchmarks.generate --mongo mongodb://localhost:27017 --db api_nexus_scale \\
+        --orgs 3 --members 5000 --collections 40 --requests 200000 --history 500000 --seed 7
+
+The same seed and --anchor always produce the same documents (ids included),
+so measurements taken before and after a change run against identical data.
+Everything is written with unordered insert_many in batches.
+"""
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List
+import argparse
+import asyncio
+import math
+import random
+import time
+
+BATCH_SIZE = 5000
+RESOURCES = [
+    "users", "orders", "payments", "invoices", "products", "inventory", "auth",
+    "webhooks", "reports", "search", "shipments", "customers", "refunds", "coupons"
+]
+ACTIONS = ["List", "Get", "Create", "Update", "Delete", "Search", "Export", "Bulk update"]
+METHODS = [("GET", 55), ("POST", 20), ("PUT", 8), ("PATCH", 7), ("DELETE", 10)]
+STATUSES = [(200, 70), (201, 8), (204, 4), (400, 5), (401, 3), (404, 5), (429, 2), (500, 2), (502, 1)]
+HOSTS = ["api.example.com", "staging.example.com", "payments.example.net", "localhost:8080"]
+ROLES = [("view", 50), ("edit", 45), ("admin", 5)]
+
+
+class Generator:
+    """Builds documents from a seeded RNG; ids are drawn from the RNG too"""
+
+    def __init__(self, seed: int, anchor: datetime):
+        self.rng = random.Random(seed)
+        self.anchor = anchor
+
+    def id(self, prefix: str) -> str:
+        return f"{prefix}_{self.rng.getrandbits(48):012x}"
+
+    def weighted(self, choices):
+        values, weights = zip(*choices)
+        return self.rng.choices(values, weights)[0]
+
+    def moment(self, days_back: float) -> datetime:
+        return self.anchor - timedelta(seconds=self.rng.uniform(0, days_back * 86400))
+
+    def users(self, count: int) -> List[dict]:
+        docs = []
+        for _ in range(count):
+            user_id = self.id("user")
+            docs.append({
+                "user_id": user_id,
+                "email": f"{user_id[5:]}@scale.example.com",
+                "name": f"Scale User {user_id[-6:]}",
+                "created_at": self.moment(365)
+            })
+        return docs
+
+    def organization(self, index: int, owner_id: str, member_ids: List[str]) -> dict:
+        return {
+            "org_id": self.id("org"),
+            "name": f"Scale Org {index}",
+            "type": "team",
+            "owner_id": owner_id,
+            "members": [owner_id] + member_ids,
+            "member_roles": [{"user_id": owner_id, "role": "admin", "added_at": self.anchor}] + [
+                {"user_id": user_id, "role": self.weighted(ROLES), "added_at": self.anchor} for user_id in member_ids
+            ],
+            "created_at": self.moment(365)
+        }
+
+    def folder_tree(self, depth: int, fanout: int) -> List[List[str]]:
+        """Folder paths of a random tree, parents before children"""
+        paths = []
+        frontier = [[]]
+        for _ in range(depth):
+            next_frontier = []
+            for parent in frontier:
+                pool = [name for name in RESOURCES if name not in parent]
+                names = self.rng.sample(pool, min(len(pool), self.rng.randint(1, fanout)))
+                for name in names:
+                    path = parent + [name]
+                    paths.append(path)
+                    next_frontier.append(path)
+            frontier = next_frontier
+        return paths
+
+    def collection(self, org: dict, index: int, depth: int, fanout: int) -> dict:
+        folders = self.folder_tree(depth, fanout)
+        created = self.moment(300)
+        return {
+            "collection_id": self.id("col"),
+            "org_id": org["org_id"],
+            "name": f"{self.rng.choice(RESOURCES).title()} API {index}",
+            "description": "Generated for scale testing",
+            "folders": [" / ".join(path) for path in folders],
+            "created_by": org["owner_id"],
+            "created_at": created,
+            "updated_at": created,
+            "_folder_paths": folders
+        }
+
+    def request(self, org: dict, collection: dict, editors: List[str]) -> dict:
+        folder_path = self.rng.choice(collection["_folder_paths"] + [[]])
+        resource = folder_path[-1] if folder_path else self.rng.choice(RESOURCES)
+        method = self.weighted(METHODS)
+        created = self.moment(300)
+        body = {"type": "none", "content": ""}
+        if method in ("POST", "PUT", "PATCH"):
+            body = {"type": "json", "content": f'{{"name": "{resource}-{self.rng.randint(1, 9999)}", "active": true}}'}
+        return {
+            "request_id": self.id("req"),
+            "collection_id": collection["collection_id"],
+            "org_id": org["org_id"],
+            "name": f"{self.rng.choice(ACTIONS)} {resource}",
+            "method": method,
+            "url": f"{{{{base_url}}}}/v1/{resource}" + (f"/{{{{{resource}_id}}}}" if self.rng.random() < 0.5 else ""),
+            "headers": [{"key": "Accept", "value": "application/json", "enabled": True}],
+            "params": [{"key": "limit", "value": str(self.rng.choice([10, 25, 50, 100])), "enabled": True}],
+            "body": body,
+            "auth": {"type": "bearer", "token": "{{token}}"},
+            "folder_path": folder_path,
+            "created_by": self.rng.choice(editors),
+            "created_at": created,
+            "updated_at": created + timedelta(days=self.rng.uniform(0, 30))
+        }
+
+    def history(self, org: dict, request_ids: List[str], user_ids: List[str], days: int, raw_days: int) -> dict:
+        timestamp = self.moment(days)
+        status = self.weighted(STATUSES)
+        latency = int(math.exp(self.rng.gauss(4.5, 0.8)))  # median ~90ms with a long tail
+        return {
+            "history_id": self.id("hist"),
+            "request_id": self.rng.choice(request_ids) if request_ids else None,
+            "user_id": self.rng.choice(user_ids),
+            "org_id": org["org_id"],
+            "method": self.weighted(METHODS),
+            "url": f"https://{self.rng.choice(HOSTS)}/v1/{self.rng.choice(RESOURCES)}/{self.rng.randint(1, 50000)}",
+            "status": status,
+            "time": latency,
+            "size": self.rng.randint(80, 200000),
+            "timestamp": timestamp,
+            "expires_at": timestamp + timedelta(days=raw_days)
+        }
+
+
+async def insert_batched(collection, docs_iter, label: str):
+    started = time.perf_counter()
+    batch = []
+    written = 0
+    for doc in docs_iter:
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            await collection.insert_many(batch, ordered=False)
+            written += len(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+        written += len(batch)
+    print(f"  {label:<12} {written:>9} docs in {time.perf_counter() - started:6.1f}s", flush=True)
+
+
+async def generate(db, args) -> Dict[str, int]:
+    """Write the synthetic dataset into db; returns document counts"""
+    gen = Generator(args.seed, args.anchor)
+    counts = {"users": 0, "organizations": 0, "collections": 0, "requests": 0, "request_history": 0}
+
+    for org_index in range(args.orgs):
+        users = gen.users(args.members + 1)
+        owner, members = users[0], users[1:]
+        org = gen.organization(org_index, owner["user_id"], [u["user_id"] for u in members])
+        editors = [owner["user_id"]] + [r["user_id"] for r in org["member_roles"] if r["role"] != "view"]
+        print(f"{org['name']} ({org['org_id']}): {args.members} members", flush=True)
+
+        await insert_batched(db.users, iter(users), "users")
+        await db.organizations.insert_one(org)
+        collections = [gen.collection(org, i, args.folder_depth, args.folder_fanout) for i in range(args.collections)]
+        await insert_batched(db.collections, ({k: v for k, v in c.items() if k != "_folder_paths"} for c in collections), "collections")
+
+        request_ids = []
+
+        def requests_iter():
+            for _ in range(args.requests):
+                doc = gen.request(org, gen.rng.choice(collections), editors)
+                request_ids.append(doc["request_id"])
+                yield doc
+
+        await insert_batched(db.requests, requests_iter(), "requests")
+        user_ids = [owner["user_id"]] + [u["user_id"] for u in members]
+        await insert_batched(
+            db.request_history,
+            (gen.history(org, request_ids, user_ids, args.history_days, args.raw_days) for _ in range(args.history)),
+            "history"
+        )
+
+        counts["users"] += len(users)
+        counts["organizations"] += 1
+        counts["collections"] += len(collections)
+        counts["requests"] += args.requests
+        counts["request_history"] += args.history
+    return counts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate deterministic scale-test data")
+    parser.add_argument("--mongo", default="mongodb://localhost:27017")
+    parser.add_argument("--db", required=True, help="Target database (should be a scratch database)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--anchor", default=None, help="ISO date all timestamps count back from (default: today, UTC)")
+    parser.add_argument("--orgs", type=int, default=1)
+    parser.add_argument("--members", type=int, default=2000, help="Members per organization")
+    parser.add_argument("--collections", type=int, default=20, help="Collections per organization")
+    parser.add_argument("--folder-depth", type=int, default=3)
+    parser.add_argument("--folder-fanout", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=100000, help="Saved requests per organization")
+    parser.add_argument("--history", type=int, default=200000, help="History rows per organization")
+    parser.add_argument("--history-days", type=int, default=7)
+    parser.add_argument("--raw-days", type=int, default=7, help="History TTL; rows older than this expire")
+    parser.add_argument("--drop", action="store_true", help="Drop the target database first")
+    args = parser.parse_args(argv)
+    if args.anchor:
+        args.anchor = datetime.fromisoformat(args.anchor).replace(tzinfo=timezone.utc)
+    else:
+        args.anchor = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return args
+
+
+async def main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(args.mongo)
+    try:
+        if args.drop:
+            await client.drop_database(args.db)
+        counts = await generate(client[args.db], args)
+        print("Done: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
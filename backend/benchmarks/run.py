@@ -0,0 +1,344 @@
+"""Benchmark the backend hot paths and compare against a stored baseline.
+
+Usage (from backend/):
+    python -m benchmarks.run                          # mongomock stand-in, compare to baseline
+    python -m benchmarks.run --mongo mongodb://localhost:27017 --sizes 10000,100000,1000000
+    python -m benchmarks.run --write-baseline         # accept current numbers
+    python -m benchmarks.run --only cold_start        # import time and first request in fresh processes
+
+Exits non-zero when a benchmark's p95 latency or throughput regresses by more
+than --tolerance against the baseline recorded for the same backend.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+# Quotas would throttle the execute benchmark; must be set before server is imported
+for _name in ["EXECUTE_USER_RATE", "EXECUTE_USER_BURST", "EXECUTE_ORG_RATE", "EXECUTE_ORG_BURST"]:
+    os.environ.setdefault(_name, "1000000")
+os.environ.setdefault("EXECUTE_ORG_CONCURRENCY", "1000")
+os.environ.setdefault("EXECUTE_HOST_CONCURRENCY", "1000")
+# One process, and the mongomock stand-in has no capped collections to tail
+os.environ["RATE_LIMIT_BACKEND"] = "local"
+os.environ["EVENT_BUS"] = "local"
+
+import httpx
+from starlette.requests import Request
+
+import server
+from auth import get_current_user
+from blobs import BlobStore
+from executor import send
+from dispatch import ExecutionScheduler
+from mock_server import MockApp
+from sso_allowlist import AllowlistIndex
+from outbound import create_session
+from permissions import check_org_permission
+from rate_limit import create_limiter
+
+from benchmarks.seed import seed_org, BENCH_USER_ID, BENCH_ORG_ID, BENCH_TOKEN, COLLECTIONS
+from benchmarks.standin import StandInDatabase
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+BACKEND_DIR = Path(__file__).parent.parent
+COLD_START_PHASES = ("import", "first_request", "second_request")
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+# ============= Harness =============
+
+def percentile(sorted_values, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def measure(fn, iterations: int, concurrency: int, max_seconds: float, warmup: int = 3) -> dict:
+    """Run `fn` up to `iterations` times at the given concurrency; stops early after max_seconds"""
+    for _ in range(warmup):
+        await fn()
+
+    latencies = []
+    deadline = time.perf_counter() + max_seconds
+    remaining = iterations
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0 and (len(latencies) < concurrency or time.perf_counter() < deadline):
+            remaining -= 1
+            started = time.perf_counter()
+            await fn()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def summarize(latencies: list, wall: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "iterations": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3),
+        "throughput_rps": round(len(latencies) / wall, 1)
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    body = json.dumps({"ok": True, "items": [{"id": i, "name": f"item {i}"} for i in range(20)]}).encode()
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self.path.startswith("/slow"):
+            time.sleep(0.05)  # a slow upstream for batch load
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    stub.daemon_threads = True
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    return stub
+
+
+# ============= Scenarios =============
+
+async def open_database(mongo: str):
+    if mongo == "mongomock":
+        return StandInDatabase(), None
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(mongo)
+    return client[f"bench_{uuid.uuid4().hex[:8]}"], client
+
+
+def bind_server(db):
+    """Point the app's per-worker globals at the benchmark database (lifespan is not run)"""
+    server.db = db
+    server.app.state.db = db
+    server.limiter = create_limiter(db)
+    server.http_session = create_session()
+    server.blob_store = BlobStore(db)
+    server.sso_allowlists = AllowlistIndex(db)
+    if server.dispatcher is None:
+        server.dispatcher = ExecutionScheduler()
+
+
+def scope_request(db) -> Request:
+    app = type("App", (), {"state": type("State", (), {"db": db})()})()
+    return Request({
+        "type": "http",
+        "app": app,
+        "headers": [(b"authorization", f"Bearer {BENCH_TOKEN}".encode())]
+    })
+
+
+async def bench_mock_server(db, requests: int, args) -> dict:
+    """Mock hits spread over routes compiled from every seeded request"""
+    await db.requests.update_many({}, {"$set": {"mock_response": {"status": 200, "body": '{"ok": true}'}}})
+    app = MockApp(db)
+    await app.startup()
+    try:
+        # Seeded request i is a GET when i % 4 == 0
+        paths = itertools.cycle([f"/col_bench{i % COLLECTIONS:03d}/items/{i}" for i in range(0, requests, 4)])
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://mock") as http:
+            async def hit():
+                response = await http.get(next(paths))
+                if response.status_code != 200:
+                    raise RuntimeError(f"mock -> {response.status_code}: {response.text[:200]}")
+            return await measure(hit, args.iterations, args.concurrency, args.max_seconds)
+    finally:
+        await app.shutdown()
+
+
+async def bench_execute_under_load(call, stub_url: str, args) -> dict:
+    """Interactive execute latency while runner-class calls to a slow upstream queue for every batch slot"""
+    loop = asyncio.get_running_loop()
+    lane = server.dispatcher.lane("runner", "org_batch")
+    spec = {"method": "GET", "url": f"{stub_url}/slow", "headers": [], "params": [], "body": {"type": "none"}}
+    done = asyncio.Event()
+
+    async def batch():
+        while not done.is_set():
+            await loop.run_in_executor(lane, send, server.http_session, spec, 30)
+
+    load = [asyncio.create_task(batch()) for _ in range(server.dispatcher.workers * 4)]
+    try:
+        return await measure(lambda: call("POST", "/api/requests/execute", json={
+            "method": "GET", "url": f"{stub_url}/items", "org_id": BENCH_ORG_ID
+        }), args.iterations, args.concurrency, args.max_seconds)
+    finally:
+        done.set()
+        await asyncio.gather(*load)
+
+
+def bench_cold_start(args) -> dict:
+    """Fresh interpreters: `import server`, then the first request and a warm one for comparison"""
+    runs = max(1, min(args.iterations, args.cold_starts))
+    command = [sys.executable, "-m", "benchmarks.cold_start", "100"]
+    samples = {key: [] for key in COLD_START_PHASES}
+    wall = 0.0
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout
+        wall += time.perf_counter() - started
+        timings = json.loads(output.strip().splitlines()[-1])
+        for key in samples:
+            samples[key].append(timings[f"{key}_ms"])
+    return {f"cold_start[{key}]": summarize(values, wall) for key, values in samples.items()}
+
+
+async def run_scenario(args, stub_url: str, requests: int, members: int, list_only: bool = False) -> dict:
+    db, client = await open_database(args.mongo)
+    try:
+        await seed_org(db, requests, members, stub_url)
+        bind_server(db)
+        results = {}
+        auth = {"Authorization": f"Bearer {BENCH_TOKEN}"}
+        transport = httpx.ASGITransport(app=server.app)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=auth) as http:
+            async def call(method: str, path: str, **kwargs):
+                response = await http.request(method, path, **kwargs)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{method} {path} -> {response.status_code}: {response.text[:200]}")
+
+            request = scope_request(db)
+            benches = {
+                f"get_current_user[members={members}]": lambda: get_current_user(request),
+                f"check_org_permission[members={members}]": lambda: check_org_permission(db, BENCH_USER_ID, BENCH_ORG_ID, "view"),
+                f"get_org_requests[requests={requests}]": lambda: call("GET", f"/api/organizations/{BENCH_ORG_ID}/requests"),
+                f"get_organization_members[members={members}]": lambda: call("GET", f"/api/organizations/{BENCH_ORG_ID}/members"),
+                f"execute_request[members={members}]": lambda: call("POST", "/api/requests/execute", json={
+                    "method": "POST",
+                    "url": f"{stub_url}/items",
+                    "body": {"type": "json", "content": '{"name": "item"}'},
+                    "org_id": BENCH_ORG_ID
+                }),
+            }
+            for name, fn in benches.items():
+                if args.only and args.only not in name:
+                    continue
+                is_list = name.startswith("get_org_requests")
+                if (is_list and not requests) or (list_only and not is_list):
+                    continue
+                results[name] = await measure(fn, args.iterations, args.concurrency, args.max_seconds)
+                print(format_row(name, results[name]), flush=True)
+            name = f"execute_request[members={members},batch_load]"
+            if not list_only and (not args.only or args.only in name):
+                results[name] = await bench_execute_under_load(call, stub_url, args)
+                print(format_row(name, results[name]), flush=True)
+        name = f"mock_serve[requests={requests}]"
+        if requests and (not args.only or args.only in name):
+            results[name] = await bench_mock_server(db, requests, args)
+            print(format_row(name, results[name]), flush=True)
+        server.http_session.close()
+        return results
+    finally:
+        if client is not None:
+            await client.drop_database(db.name)
+            client.close()
+
+
+# ============= Reporting =============
+
+def format_row(name: str, result: dict, note: str = "") -> str:
+    return (
+        f"{name:<48} n={result['iterations']:<5} p50={result['p50_ms']:>9.2f}ms "
+        f"p95={result['p95_ms']:>9.2f}ms p99={result['p99_ms']:>9.2f}ms "
+        f"{result['throughput_rps']:>9.1f} req/s {note}"
+    )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result["throughput_rps"] < before["throughput_rps"] / (1 + tolerance):
+            regressions.append(f"{name}: throughput {before['throughput_rps']} -> {result['throughput_rps']} req/s")
+    return regressions
+
+
+async def main(args) -> int:
+    backend = "mongomock" if args.mongo == "mongomock" else "mongod"
+    stub = start_stub_server()
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    print(f"backend={backend} python={platform.python_version()} concurrency={args.concurrency}")
+
+    results = {}
+    for i, size in enumerate(args.sizes):
+        # Per-user paths don't depend on the request count; measure them once
+        results.update(await run_scenario(args, stub_url, size, args.default_members, list_only=i > 0))
+    for members in args.members:
+        if members != args.default_members:
+            results.update(await run_scenario(args, stub_url, 0, members))
+    stub.shutdown()
+    cold_names = [f"cold_start[{key}]" for key in COLD_START_PHASES]
+    if not args.only or any(args.only in name for name in cold_names):
+        for name, result in bench_cold_start(args).items():
+            if not args.only or args.only in name:
+                results[name] = result
+                print(format_row(name, result), flush=True)
+
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.write_baseline:
+        baselines[backend] = {**baselines.get(backend, {}), **results}
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baselines.get(backend, {}), args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backend hot-path benchmarks")
+    parser.add_argument("--mongo", default="mongomock", help="'mongomock' or a MongoDB URL (uses a throwaway database)")
+    parser.add_argument("--sizes", default="10000", help="Saved request counts for get_org_requests (comma separated)")
+    parser.add_argument("--members", default="100,1000", help="Member counts for get_organization_members")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="Time budget per benchmark")
+    parser.add_argument("--cold-starts", type=int, default=10, help="Fresh processes for the cold start benchmark")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed regression before failing")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--write-baseline", action="store_true")
+    parser.add_argument("--only", help="Run only benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+    args.sizes = [int(v) for v in args.sizes.split(",") if v]
+    args.members = [int(v) for v in args.members.split(",") if v]
+    args.default_members = args.members[0] if args.members else 100
+    return args
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,71 @@
+"""Synthetic fixtures for the benchmark suite."""
+from datetime import datetime, timezone, timedelta
+
+BENCH_USER_ID = "user_bench"
+BENCH_ORG_ID = "org_bench"
+BENCH_TOKEN = "bench-session-token"
+COLLECTIONS = 50
+BATCH_SIZE = 5000
+
+
+async def seed_org(db, requests: int, members: int, stub_url: str):
+    """One org owned by the bench user, with `members` members and `requests` saved requests"""
+    now = datetime.now(timezone.utc)
+    await db.users.insert_one({
+        "user_id": BENCH_USER_ID, "email": "bench@example.com", "name": "Bench", "created_at": now
+    })
+    await db.user_sessions.insert_one({
+        "session_token": BENCH_TOKEN, "user_id": BENCH_USER_ID,
+        "expires_at": now + timedelta(days=1), "created_at": now
+    })
+
+    member_ids = [f"user_m{i:07d}" for i in range(members)]
+    for start in range(0, members, BATCH_SIZE):
+        await db.users.insert_many([
+            {"user_id": user_id, "email": f"{user_id}@example.com", "name": user_id, "created_at": now}
+            for user_id in member_ids[start:start + BATCH_SIZE]
+        ])
+    await db.organizations.insert_one({
+        "org_id": BENCH_ORG_ID,
+        "name": "Bench Org",
+        "type": "team",
+        "owner_id": BENCH_USER_ID,
+        "members": [BENCH_USER_ID] + member_ids,
+        "member_roles": [{"user_id": BENCH_USER_ID, "role": "admin", "added_at": now}] + [
+            {"user_id": user_id, "role": "edit" if i % 4 else "view", "added_at": now} for i, user_id in enumerate(member_ids)
+        ],
+        "created_at": now
+    })
+
+    await db.collections.insert_many([
+        {
+            "collection_id": f"col_bench{i:03d}",
+            "org_id": BENCH_ORG_ID,
+            "name": f"Collection {i}",
+            "folders": ["users", "orders", "admin"],
+            "created_by": BENCH_USER_ID,
+            "created_at": now,
+            "updated_at": now
+        }
+        for i in range(COLLECTIONS)
+    ])
+    for start in range(0, requests, BATCH_SIZE):
+        await db.requests.insert_many([
+            {
+                "request_id": f"req_bench{i:08d}",
+                "collection_id": f"col_bench{i % COLLECTIONS:03d}",
+                "org_id": BENCH_ORG_ID,
+                "name": f"Request {i}",
+                "method": ("GET", "POST", "PUT", "DELETE")[i % 4],
+                "url": f"{stub_url}/items/{i}?page=1",
+                "headers": [{"key": "Accept", "value": "application/json", "enabled": True}],
+                "params": [{"key": "page", "value": "1", "enabled": True}],
+                "body": {"type": "json", "content": '{"name": "item", "count": 1}'},
+                "auth": {"type": "bearer", "token": "{{token}}"},
+                "folder_path": [("users", "orders", "admin")[i % 3]],
+                "created_by": BENCH_USER_ID,
+                "created_at": now,
+                "updated_at": now
+            }
+            for i in range(start, min(start + BATCH_SIZE, requests))
+        ])
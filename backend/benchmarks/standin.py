@@ -0,0 +1,72 @@
+"""Async facade over mongomock so the backend can be benchmarked without a mongod.
+
+Only the Motor surface the benchmarked paths use is covered: cursor methods
+(find/aggregate) return an awaitable cursor, everything else is awaited directly.
+"""
+import mongomock
+
+CURSOR_METHODS = {"find", "aggregate", "list_indexes"}
+
+
+class StandInCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, count):
+        self.cursor = self.cursor.limit(count)
+        return self
+
+    def skip(self, count):
+        self.cursor = self.cursor.skip(count)
+        return self
+
+    async def to_list(self, length=None):
+        docs = []
+        for doc in self.cursor:
+            docs.append(doc)
+            if length and len(docs) >= length:
+                break
+        return docs
+
+    def __aiter__(self):
+        self._iterator = iter(self.cursor)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class StandInCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self.collection, name)
+        if not callable(attr):
+            return attr
+        if name in CURSOR_METHODS:
+            return lambda *args, **kwargs: StandInCursor(attr(*args, **kwargs))
+
+        async def call(*args, **kwargs):
+            return attr(*args, **kwargs)
+        return call
+
+
+class StandInDatabase:
+    def __init__(self, name: str = "bench"):
+        self.client = mongomock.MongoClient()
+        self.database = self.client[name]
+        self.name = name
+
+    def __getattr__(self, name):
+        return StandInCollection(self.database[name])
+
+    def __getitem__(self, name):
+        return StandInCollection(self.database[name])
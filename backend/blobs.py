@@ -0,0 +1,283 @@
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+import gridfs
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+from pymongo.errors import DuplicateKeyError
+
+BLOB_BUCKET = "blobs"
+MAX_BLOB_BYTES = int(os.environ.get("MAX_BLOB_BYTES", str(512 * 1024 * 1024)))
+CHUNK_SIZE = 1024 * 1024
+# Response bodies kept for download expire; uploaded bodies are kept until deleted
+RESPONSE_BLOB_TTL_SECONDS = int(os.environ.get("RESPONSE_BLOB_TTL_SECONDS", str(24 * 3600)))
+BLOB_SWEEP_INTERVAL_SECONDS = int(os.environ.get("BLOB_SWEEP_INTERVAL_SECONDS", "600"))
+
+logger = logging.getLogger(__name__)
+
+
+def body_blob_ids(body: Optional[dict]) -> List[str]:
+    """Blob ids a request body refers to (binary body or multipart file parts)"""
+    body = body or {}
+    if body.get("type") == "binary" and body.get("blob_id"):
+        return [body["blob_id"]]
+    if body.get("type") == "multipart":
+        return [
+            part["blob_id"] for part in body.get("parts") or []
+            if part.get("type") == "file" and part.get("blob_id") and part.get("enabled", True)
+        ]
+    return []
+
+
+async def iter_bytes(data: bytes, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Feed an in-memory body to BlobStore.put"""
+    for offset in range(0, len(data), chunk_size):
+        yield data[offset:offset + chunk_size]
+
+
+class BlobStore:
+    """Content-addressed request body storage in GridFS, deduplicated per organization.
+
+    Uploads are streamed into GridFS chunk by chunk; reads for the execute proxy
+    happen on worker threads through the synchronous GridFS API, so bodies are
+    streamed to the upstream without ever being held in memory.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self._bucket = None
+        self._sync_bucket = None
+
+    # Buckets are created on first use, so requests without file bodies never touch GridFS
+    @property
+    def bucket(self) -> AsyncIOMotorGridFSBucket:
+        if self._bucket is None:
+            self._bucket = AsyncIOMotorGridFSBucket(self.db, bucket_name=BLOB_BUCKET)
+        return self._bucket
+
+    @property
+    def sync_bucket(self) -> gridfs.GridFSBucket:
+        if self._sync_bucket is None:
+            self._sync_bucket = gridfs.GridFSBucket(self.db.delegate, bucket_name=BLOB_BUCKET)
+        return self._sync_bucket
+
+    async def ensure_indexes(self):
+        await self.db.blobs.create_index("blob_id", unique=True)
+        await self.db.blobs.create_index([("org_id", 1), ("sha256", 1)], unique=True)
+        await self.db.blobs.create_index("expires_at", sparse=True)
+
+    async def put(
+        self,
+        org_id: str,
+        user_id: str,
+        chunks: AsyncIterator[bytes],
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None,
+        expires_in: Optional[int] = None
+    ) -> dict:
+        """Stream chunks into GridFS; returns the blob record (an existing one if the content is a duplicate).
+
+        With `expires_in` (seconds) the blob is removed by `purge_expired` after that long.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        upload = self.bucket.open_upload_stream(filename or "blob", chunk_size_bytes=255 * 1024)
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > MAX_BLOB_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Body exceeds {MAX_BLOB_BYTES} bytes")
+                digest.update(chunk)
+                await upload.write(chunk)
+            await upload.close()
+        except BaseException:
+            await upload.abort()
+            raise
+
+        blob = {
+            "blob_id": f"blob_{uuid.uuid4().hex[:12]}",
+            "org_id": org_id,
+            "sha256": digest.hexdigest(),
+            "size": size,
+            "filename": filename,
+            "content_type": content_type or "application/octet-stream",
+            "file_id": upload._id,
+            "created_by": user_id,
+            "created_at": datetime.now(timezone.utc)
+        }
+        if expires_in is not None:
+            blob["expires_at"] = blob["created_at"] + timedelta(seconds=expires_in)
+        try:
+            await self.db.blobs.insert_one(blob)
+        except DuplicateKeyError:
+            # Same content already stored for this org: keep the original copy, but never
+            # let it expire sooner than this put asked for
+            await self.bucket.delete(upload._id)
+            match = {"org_id": org_id, "sha256": blob["sha256"]}
+            if "expires_at" in blob:
+                update = {"$max": {"expires_at": blob["expires_at"]}}
+                match["expires_at"] = {"$exists": True}
+                await self.db.blobs.update_one(match, update)
+                match.pop("expires_at")
+            else:
+                await self.db.blobs.update_one(match, {"$unset": {"expires_at": ""}})
+            blob = await self.db.blobs.find_one(match)
+        blob.pop("_id", None)
+        blob.pop("file_id", None)
+        return blob
+
+    async def list(self, org_id: str) -> List[dict]:
+        return await self.db.blobs.find(
+            {"org_id": org_id}, {"_id": 0, "file_id": 0}
+        ).sort("created_at", -1).to_list(1000)
+
+    async def open(self, org_id: str, blob_id: str) -> Tuple[dict, AsyncIterator[bytes]]:
+        """(blob, chunk iterator) for download; raises 404 when the blob is not in the org"""
+        blob = await self.db.blobs.find_one({"blob_id": blob_id, "org_id": org_id}, {"_id": 0})
+        if not blob:
+            raise HTTPException(status_code=404, detail="Blob not found")
+        stream = await self.bucket.open_download_stream(blob.pop("file_id"))
+
+        async def chunks():
+            while True:
+                chunk = await stream.readchunk()
+                if not chunk:
+                    return
+                yield chunk
+        return blob, chunks()
+
+    async def delete(self, org_id: str, blob_id: str) -> bool:
+        blob = await self.db.blobs.find_one_and_delete({"blob_id": blob_id, "org_id": org_id})
+        if not blob:
+            return False
+        await self.bucket.delete(blob["file_id"])
+        return True
+
+    async def purge_expired(self) -> int:
+        """Delete blobs past their expiry (metadata and GridFS content); returns how many were removed"""
+        now = datetime.now(timezone.utc)
+        purged = 0
+        async for blob in self.db.blobs.find({"expires_at": {"$lte": now}}, {"blob_id": 1}):
+            # Re-check on delete: a permanent upload of the same content may have cleared the expiry
+            blob = await self.db.blobs.find_one_and_delete({"blob_id": blob["blob_id"], "expires_at": {"$lte": now}})
+            if blob:
+                await self.bucket.delete(blob["file_id"])
+                purged += 1
+        return purged
+
+    async def expiry_loop(self, lease=None, interval: int = BLOB_SWEEP_INTERVAL_SECONDS):
+        """Periodically purge expired blobs (only on the lease holder, if given)"""
+        while True:
+            try:
+                if lease is not None and not await lease.acquire():
+                    await asyncio.sleep(min(interval, lease.ttl / 2))
+                    continue
+                purged = await self.purge_expired()
+                if purged:
+                    logger.info(f"Purged {purged} expired blobs")
+            except Exception as e:
+                logger.error(f"Blob expiry error: {e}")
+            await asyncio.sleep(interval)
+
+    async def resolve(self, org_id: Optional[str], blob_ids: Iterable[str]) -> Dict[str, dict]:
+        """Look up blobs referenced by a request body; raises 404 for any not visible to the org"""
+        blob_ids = list(set(blob_ids))
+        if not blob_ids:
+            return {}
+        if not org_id:
+            raise HTTPException(status_code=400, detail="File bodies require an organization")
+        blobs = {
+            blob["blob_id"]: blob
+            for blob in await self.db.blobs.find(
+                {"blob_id": {"$in": blob_ids}, "org_id": org_id}, {"_id": 0}
+            ).to_list(length=None)
+        }
+        missing = [blob_id for blob_id in blob_ids if blob_id not in blobs]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Blob not found: {', '.join(missing)}")
+        return blobs
+
+    async def opener_for(self, org_id: Optional[str], body: Optional[dict]) -> Optional[Callable]:
+        """Resolve a body's blobs up front; returns a blocking `open_blob(blob_id) -> (stream, blob)` for worker threads"""
+        blobs = await self.resolve(org_id, body_blob_ids(body))
+        if not blobs:
+            return None
+
+        def open_blob(blob_id: str):
+            blob = blobs[blob_id]
+            return self.sync_bucket.open_download_stream(blob["file_id"]), blob
+        return open_blob
+
+
+class MultipartStream:
+    """File-like multipart/form-data body that reads file parts lazily.
+
+    Having a length lets `requests` send a Content-Length instead of chunked
+    encoding, which some upload endpoints require.
+    """
+
+    def __init__(self, parts: List[dict], boundary: Optional[str] = None):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.segments = []  # bytes, or (file, size) for file parts
+        for part in parts:
+            disposition = f'form-data; name="{_quote(part["name"])}"'
+            if part.get("file") is not None:
+                disposition += f'; filename="{_quote(part.get("filename") or part["name"])}"'
+            head = f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+            if part.get("content_type"):
+                head += f"Content-Type: {part['content_type']}\r\n"
+            self.segments.append((head + "\r\n").encode())
+            if part.get("file") is not None:
+                self.segments.append((part["file"], part["size"]))
+            else:
+                self.segments.append(str(part.get("value") or "").encode())
+            self.segments.append(b"\r\n")
+        self.segments.append(f"--{self.boundary}--\r\n".encode())
+        self.length = sum(len(s) if isinstance(s, bytes) else s[1] for s in self.segments)
+        self._index = 0
+        self._offset = 0
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size: int = -1) -> bytes:
+        out = bytearray()
+        while self._index < len(self.segments) and (size < 0 or len(out) < size):
+            segment = self.segments[self._index]
+            want = -1 if size < 0 else size - len(out)
+            if isinstance(segment, bytes):
+                piece = segment[self._offset:] if want < 0 else segment[self._offset:self._offset + want]
+                self._offset += len(piece)
+                done = self._offset >= len(segment)
+            else:
+                piece = segment[0].read(want)
+                done = not piece or (want > 0 and len(piece) < want)
+            out += piece
+            if done:
+                self._index += 1
+                self._offset = 0
+        return bytes(out)
+
+    def close(self):
+        for segment in self.segments:
+            if isinstance(segment, tuple):
+                segment[0].close()
+
+
+def _quote(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\r", " ").replace("\n", " ")
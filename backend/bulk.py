@@ -0,0 +1,243 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import uuid
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from folder_tree import clean_path, parse_folder, record_moves, sync_declared_folders
+from models import BulkRequestOperation
+from permissions import check_org_permission
+from revisions import purge_revisions, record_revisions, track_revisions
+from workspace import bump_workspace_version
+
+ACTIONS = {"move", "copy", "delete", "update"}
+MAX_BULK_REQUESTS = 10000
+LOCATION_FIELDS = {"collection_id", "folder_path"}
+LOCATION_PROJECTION = {"_id": 0, "request_id": 1, "org_id": 1, "collection_id": 1, "folder_path": 1}
+
+
+def _result(request_id: str, status: str = "ok", detail: Optional[str] = None, new_request_id: Optional[str] = None) -> dict:
+    return {"request_id": request_id, "status": status, "detail": detail, "new_request_id": new_request_id}
+
+
+def _write_failures(error: BulkWriteError, ids: List[str]) -> Dict[str, str]:
+    """request_id -> message for the operations an unordered bulk write rejected"""
+    return {ids[e["index"]]: e.get("errmsg", "Write failed") for e in error.details.get("writeErrors", [])}
+
+
+async def _select_folder(db: AsyncIOMotorDatabase, user_id: str, op: BulkRequestOperation, projection: dict) -> List[dict]:
+    prefix = clean_path(op.source_folder_path)
+    if not prefix:
+        raise HTTPException(status_code=400, detail="source_folder_path is required with source_collection_id")
+    source = await db.collections.find_one({"collection_id": op.source_collection_id}, {"_id": 0, "org_id": 1})
+    if not source:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    await check_org_permission(db, user_id, source["org_id"], "edit")
+
+    query = {"collection_id": op.source_collection_id}
+    query.update({f"folder_path.{i}": part for i, part in enumerate(prefix)})
+    docs = await db.requests.find(query, projection).to_list(MAX_BULK_REQUESTS + 1)
+    if len(docs) > MAX_BULK_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"Folder holds more than {MAX_BULK_REQUESTS} requests")
+    return docs
+
+
+async def _select_ids(db: AsyncIOMotorDatabase, user_id: str, op: BulkRequestOperation, projection: dict) -> Tuple[List[dict], List[dict]]:
+    ids = list(dict.fromkeys(op.request_ids))
+    if not ids:
+        raise HTTPException(status_code=400, detail="No requests selected")
+    if len(ids) > MAX_BULK_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_REQUESTS} requests per call")
+
+    docs = await db.requests.find({"request_id": {"$in": ids}}, projection).to_list(length=None)
+    found = {doc["request_id"] for doc in docs}
+    failures = [_result(request_id, "not_found", "Request not found") for request_id in ids if request_id not in found]
+
+    # One permission check per organization rather than per request
+    denied = {}
+    for org_id in {doc["org_id"] for doc in docs}:
+        try:
+            await check_org_permission(db, user_id, org_id, "edit")
+        except HTTPException as e:
+            denied[org_id] = e.detail
+    permitted = []
+    for doc in docs:
+        if doc["org_id"] in denied:
+            failures.append(_result(doc["request_id"], "forbidden", denied[doc["org_id"]]))
+        else:
+            permitted.append(doc)
+    return permitted, failures
+
+
+async def _resolve_target(db: AsyncIOMotorDatabase, user_id: str, op: BulkRequestOperation) -> Optional[dict]:
+    if not op.collection_id:
+        return None
+    target = await db.collections.find_one({"collection_id": op.collection_id}, {"_id": 0})
+    if not target:
+        raise HTTPException(status_code=404, detail="Target collection not found")
+    await check_org_permission(db, user_id, target["org_id"], "edit")
+    return target
+
+
+def _destination(doc: dict, op: BulkRequestOperation, target: Optional[dict], prefix: List[str]) -> Tuple[Optional[str], List[str]]:
+    collection_id = target["collection_id"] if target else doc.get("collection_id")
+    if prefix:
+        # A selected folder keeps its name and subfolders under the destination folder
+        folder = clean_path(op.folder_path) + clean_path(doc.get("folder_path"))[len(prefix) - 1:]
+    elif op.folder_path is not None:
+        folder = clean_path(op.folder_path)
+    else:
+        folder = clean_path(doc.get("folder_path"))
+    return collection_id, folder
+
+
+async def _carry_declared_folders(db: AsyncIOMotorDatabase, op: BulkRequestOperation, target: Optional[dict], prefix: List[str]):
+    """Move/copy the Collection.folders entries of a selected folder so empty subfolders come along"""
+    source = await db.collections.find_one({"collection_id": op.source_collection_id}, {"_id": 0})
+    destination = target or source
+    base = clean_path(op.folder_path)
+    carried, kept = [], []
+    for folder in source.get("folders") or []:
+        path = parse_folder(folder)
+        if path[:len(prefix)] == prefix:
+            carried.append(" / ".join(base + path[len(prefix) - 1:]))
+            if op.action == "copy":
+                kept.append(folder)
+        else:
+            kept.append(folder)
+    if not carried:
+        return
+
+    if destination["collection_id"] == source["collection_id"]:
+        source["folders"] = list(dict.fromkeys(kept + carried))
+    else:
+        source["folders"] = kept
+        destination["folders"] = list(dict.fromkeys((destination.get("folders") or []) + carried))
+        await db.collections.update_one(
+            {"collection_id": destination["collection_id"]}, {"$set": {"folders": destination["folders"]}}
+        )
+        await sync_declared_folders(db, destination)
+    await db.collections.update_one({"collection_id": source["collection_id"]}, {"$set": {"folders": source["folders"]}})
+    await sync_declared_folders(db, source)
+
+
+async def apply_bulk(db: AsyncIOMotorDatabase, user_id: str, op: BulkRequestOperation) -> dict:
+    """Apply one action to many requests with a single write; results are reported per request.
+
+    `collection_ids` in the result lists the collections the operation touched.
+    """
+    if op.action not in ACTIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown action: {op.action}")
+    if op.action == "move" and op.collection_id is None and op.folder_path is None and not op.source_collection_id:
+        raise HTTPException(status_code=400, detail="collection_id or folder_path is required to move")
+    fields = {}
+    if op.action == "update":
+        fields = {k: v for k, v in (op.fields.dict() if op.fields else {}).items() if v is not None}
+        if not fields:
+            raise HTTPException(status_code=400, detail="No fields to update")
+        if LOCATION_FIELDS & set(fields):
+            raise HTTPException(status_code=400, detail="Use the move action to change collection_id or folder_path")
+
+    projection = {"_id": 0} if op.action == "copy" else LOCATION_PROJECTION
+    prefix = []
+    if op.source_collection_id:
+        prefix = clean_path(op.source_folder_path)
+        docs, failures = await _select_folder(db, user_id, op, projection), []
+    else:
+        docs, failures = await _select_ids(db, user_id, op, projection)
+    target = await _resolve_target(db, user_id, op) if op.action in ("move", "copy") else None
+    if prefix and op.action == "move":
+        destination_id = target["collection_id"] if target else op.source_collection_id
+        if destination_id == op.source_collection_id and clean_path(op.folder_path)[:len(prefix)] == prefix:
+            raise HTTPException(status_code=400, detail="Cannot move a folder into itself")
+
+    now = datetime.now(timezone.utc)
+    ids = [doc["request_id"] for doc in docs]
+    written: Dict[str, Optional[str]] = {}  # request_id -> new_request_id (copies)
+    errors: Dict[str, str] = {}
+    moves = []
+    # Baselines for untracked requests must be taken before the write changes them
+    heads = await track_revisions(db, "request", docs) if op.action in ("move", "update") else {}
+
+    if op.action == "move":
+        operations = []
+        for doc in docs:
+            collection_id, folder = _destination(doc, op, target, prefix)
+            update = {"collection_id": collection_id, "folder_path": folder, "updated_at": now}
+            if target:
+                update["org_id"] = target["org_id"]
+            operations.append(UpdateOne({"request_id": doc["request_id"]}, {"$set": update}))
+            moves.append(((doc.get("collection_id"), doc.get("folder_path")), (collection_id, folder)))
+        if operations:
+            try:
+                await db.requests.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                errors = _write_failures(e, ids)
+        written = {request_id: None for request_id in ids}
+
+    elif op.action == "copy":
+        copies = []
+        for doc in docs:
+            collection_id, folder = _destination(doc, op, target, prefix)
+            copies.append({
+                **doc,
+                "request_id": f"req_{uuid.uuid4().hex[:12]}",
+                "collection_id": collection_id,
+                "org_id": target["org_id"] if target else doc["org_id"],
+                "folder_path": folder,
+                "created_by": user_id,
+                "created_at": now,
+                "updated_at": now
+            })
+            moves.append((None, (collection_id, folder)))
+        if copies:
+            try:
+                await db.requests.insert_many(copies, ordered=False)
+            except BulkWriteError as e:
+                errors = _write_failures(e, ids)
+        written = {doc["request_id"]: copy["request_id"] for doc, copy in zip(docs, copies)}
+        await record_revisions(
+            db, "request", {}, [copy for doc, copy in zip(docs, copies) if doc["request_id"] not in errors],
+            user_id, action="create"
+        )
+
+    elif op.action == "delete":
+        if ids:
+            await db.requests.delete_many({"request_id": {"$in": ids}})
+            await purge_revisions(db, "request", *ids)
+        moves = [((doc.get("collection_id"), doc.get("folder_path")), None) for doc in docs]
+        written = {request_id: None for request_id in ids}
+
+    else:
+        if ids:
+            await db.requests.update_many({"request_id": {"$in": ids}}, {"$set": {**fields, "updated_at": now}})
+        written = {request_id: None for request_id in ids}
+
+    if heads:
+        landed = [request_id for request_id in ids if request_id not in errors]
+        updated = await db.requests.find({"request_id": {"$in": landed}}, {"_id": 0}).to_list(length=None)
+        await record_revisions(db, "request", heads, updated, user_id, action=op.action)
+
+    # Folder counts only change for the writes that landed
+    await record_moves(db, [move for request_id, move in zip(ids, moves) if request_id not in errors])
+    if prefix and op.action in ("move", "copy"):
+        await _carry_declared_folders(db, op, target, prefix)
+    await bump_workspace_version(db, [doc["org_id"] for doc in docs] + ([target["org_id"]] if target else []))
+
+    results = failures + [
+        _result(request_id, "error", errors[request_id]) if request_id in errors
+        else _result(request_id, new_request_id=new_request_id)
+        for request_id, new_request_id in written.items()
+    ]
+    succeeded = sum(1 for r in results if r["status"] == "ok")
+    # Collections whose mock routes may have changed, for the caller to publish
+    touched = {doc.get("collection_id") for doc in docs} | ({target["collection_id"]} if target else set())
+    return {
+        "action": op.action,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results,
+        "collection_ids": sorted(c for c in touched if c)
+    }
@@ -0,0 +1,181 @@
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future
+from typing import Deque, Dict, Optional
+import os
+import threading
+import time
+from fastapi import HTTPException
+
+# Highest priority first
+PRIORITIES = ("interactive", "runner", "monitor")
+OUTBOUND_WORKERS = int(os.environ.get("OUTBOUND_WORKERS", "32"))
+# Workers batch classes may never occupy, so a Send click always finds a free thread
+INTERACTIVE_RESERVE = int(os.environ.get("OUTBOUND_INTERACTIVE_RESERVE", str(max(1, OUTBOUND_WORKERS // 4))))
+MAX_QUEUED = int(os.environ.get("OUTBOUND_MAX_QUEUED", "10000"))  # per priority class
+WAIT_SAMPLES = 2048
+
+
+class _Job:
+    __slots__ = ("future", "fn", "args", "kwargs", "priority", "enqueued")
+
+    def __init__(self, future: Future, fn, args, kwargs, priority: str):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.enqueued = time.monotonic()
+
+
+class Lane(Executor):
+    """Executor view of the scheduler for one priority class and org; pass it as `pool`"""
+
+    def __init__(self, scheduler: "ExecutionScheduler", priority: str, org_id: Optional[str]):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.org_id = org_id
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        return self.scheduler.submit(self.priority, self.org_id, fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, **kwargs):
+        pass  # the scheduler outlives its lanes
+
+
+def _percentile(values, fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, round(fraction * (len(values) - 1)))], 3)
+
+
+class ExecutionScheduler:
+    """Thread pool for blocking upstream calls with priority classes and per-org fair queues.
+
+    Workers always take the highest priority class that has work; within a class,
+    orgs are served round-robin so one org's large run cannot monopolise it.
+    Batch classes (runner, monitor) are capped at workers - reserve running jobs.
+    """
+
+    def __init__(self, workers: int = OUTBOUND_WORKERS, reserve: int = INTERACTIVE_RESERVE, max_queued: int = MAX_QUEUED):
+        self.workers = workers
+        self.batch_limit = max(1, workers - min(reserve, workers - 1))
+        self.max_queued = max_queued
+        self.cond = threading.Condition()
+        self.queues: Dict[str, "OrderedDict[Optional[str], Deque[_Job]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self.queued = {p: 0 for p in PRIORITIES}
+        self.running = {p: 0 for p in PRIORITIES}
+        self.completed = {p: 0 for p in PRIORITIES}
+        self.rejected = {p: 0 for p in PRIORITIES}
+        self.waits: Dict[str, Deque[float]] = {p: deque(maxlen=WAIT_SAMPLES) for p in PRIORITIES}
+        self.max_wait = {p: 0.0 for p in PRIORITIES}
+        self.closed = False
+        self.threads = [
+            threading.Thread(target=self._work, name=f"outbound-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def lane(self, priority: str, org_id: Optional[str] = None) -> Lane:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        return Lane(self, priority, org_id)
+
+    def submit(self, priority: str, org_id: Optional[str], fn, *args, **kwargs) -> Future:
+        future = Future()
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("Execution scheduler is shut down")
+            if self.queued[priority] >= self.max_queued:
+                self.rejected[priority] += 1
+                raise HTTPException(
+                    status_code=503, detail="Too many queued upstream calls", headers={"Retry-After": "1"}
+                )
+            queue = self.queues[priority]
+            if org_id not in queue:
+                queue[org_id] = deque()
+            queue[org_id].append(_Job(future, fn, args, kwargs, priority))
+            self.queued[priority] += 1
+            self.cond.notify()
+        return future
+
+    def _batch_running(self) -> int:
+        return self.running["runner"] + self.running["monitor"]
+
+    def _next(self) -> Optional[_Job]:
+        """Pop the next eligible job; caller holds the lock"""
+        for priority in PRIORITIES:
+            if priority != "interactive" and self._batch_running() >= self.batch_limit:
+                return None
+            queue = self.queues[priority]
+            if not queue:
+                continue
+            org_id, jobs = next(iter(queue.items()))
+            job = jobs.popleft()
+            if jobs:
+                queue.move_to_end(org_id)  # round-robin across orgs
+            else:
+                del queue[org_id]
+            self.queued[priority] -= 1
+            self.running[priority] += 1
+            return job
+        return None
+
+    def _work(self):
+        while True:
+            with self.cond:
+                job = self._next()
+                while job is None:
+                    if self.closed:
+                        return
+                    self.cond.wait()
+                    job = self._next()
+                waited = (time.monotonic() - job.enqueued) * 1000
+                self.waits[job.priority].append(waited)
+                self.max_wait[job.priority] = max(self.max_wait[job.priority], waited)
+
+            priority = job.priority
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.fn(*job.args, **job.kwargs))
+                except BaseException as e:
+                    job.future.set_exception(e)
+            job = None  # drop references to the call's arguments before waiting again
+
+            with self.cond:
+                self.running[priority] -= 1
+                self.completed[priority] += 1
+                # A freed batch slot may unblock work another worker skipped
+                self.cond.notify()
+
+    def metrics(self) -> dict:
+        """Queue depth, in-flight calls and recent queue wait per priority class"""
+        with self.cond:
+            classes = {
+                priority: {
+                    "queued": self.queued[priority],
+                    "orgs_queued": len(self.queues[priority]),
+                    "running": self.running[priority],
+                    "completed": self.completed[priority],
+                    "rejected": self.rejected[priority],
+                    "wait_p50_ms": _percentile(self.waits[priority], 0.5),
+                    "wait_p95_ms": _percentile(self.waits[priority], 0.95),
+                    "wait_p99_ms": _percentile(self.waits[priority], 0.99),
+                    "wait_max_ms": round(self.max_wait[priority], 3),
+                }
+                for priority in PRIORITIES
+            }
+            busy = sum(self.running.values())
+        return {"workers": self.workers, "batch_limit": self.batch_limit, "busy": busy, "classes": classes}
+
+    def shutdown(self):
+        """Stop idle workers; queued jobs are cancelled, running ones finish"""
+        with self.cond:
+            self.closed = True
+            for queue in self.queues.values():
+                for jobs in queue.values():
+                    for job in jobs:
+                        job.future.cancel()
+                queue.clear()
+            self.queued = {p: 0 for p in PRIORITIES}
+            self.cond.notify_all()
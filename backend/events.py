@@ -0,0 +1,119 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+import asyncio
+import logging
+import os
+import uuid
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE_EXISTS = 48
+
+Handler = Callable[[Any], Any]
+
+
+class LocalEventBus:
+    """In-process pub/sub; the single-worker stand-in for a shared channel"""
+
+    def __init__(self):
+        self.worker_id = f"worker_{uuid.uuid4().hex[:8]}"
+        self.handlers: Dict[str, List[Handler]] = defaultdict(list)
+
+    def subscribe(self, channel: str, handler: Handler):
+        self.handlers[channel].append(handler)
+
+    async def _dispatch(self, channel: str, payload: Any):
+        for handler in self.handlers.get(channel, []):
+            try:
+                result = handler(payload)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Event handler error on {channel}: {e}")
+
+    async def publish(self, channel: str, payload: Any = None):
+        await self._dispatch(channel, payload)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class MongoEventBus(LocalEventBus):
+    """Pub/sub across workers and nodes over a capped Mongo collection.
+
+    Publishers dispatch to their own handlers immediately and append the event to
+    the capped collection; every other worker tails it with an awaitable cursor.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, collection: str = "cache_events", size_bytes: int = 1024 * 1024):
+        super().__init__()
+        self.db = db
+        self.collection_name = collection
+        self.size_bytes = size_bytes
+        self.task = None
+
+    async def start(self):
+        try:
+            await self.db.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+            # A tailable cursor on an empty capped collection dies immediately
+            await self.db[self.collection_name].insert_one({"channel": "__init__", "origin": self.worker_id})
+        except CollectionInvalid:
+            pass
+        except OperationFailure as e:
+            # Workers starting together on a fresh database race to create it; the server-side
+            # check can report the loss as NamespaceExists instead of the driver's CollectionInvalid
+            if e.code != NAMESPACE_EXISTS:
+                raise
+        self.task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def publish(self, channel: str, payload: Any = None):
+        await self._dispatch(channel, payload)
+        await self.db[self.collection_name].insert_one({
+            "channel": channel,
+            "payload": payload,
+            "origin": self.worker_id,
+            "created_at": datetime.now(timezone.utc)
+        })
+
+    async def _listen(self):
+        collection = self.db[self.collection_name]
+        latest = await collection.find_one({}, sort=[("$natural", -1)])
+        last_id = latest["_id"] if latest else None
+        while True:
+            try:
+                query = {"_id": {"$gt": last_id}} if last_id else {}
+                cursor = collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for event in cursor:
+                        last_id = event["_id"]
+                        if event.get("origin") != self.worker_id and event.get("channel") in self.handlers:
+                            await self._dispatch(event["channel"], event.get("payload"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Event bus listener error: {e}")
+            await asyncio.sleep(0.5)
+
+
+def create_event_bus(db: AsyncIOMotorDatabase) -> LocalEventBus:
+    """Build the cache invalidation bus for the configured EVENT_BUS.
+
+    Defaults to mongo: every deployment already shares a database, and other workers,
+    nodes and the mock server would otherwise never see invalidations. `local` is
+    only safe for a lone process.
+    """
+    if os.environ.get("EVENT_BUS", "mongo").lower() == "local":
+        return LocalEventBus()
+    return MongoEventBus(db)
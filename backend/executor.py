@@ -0,0 +1,388 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+import base64
+import codecs
+import json
+import os
+import re
+import threading
+import time
+import requests
+
+from blobs import MultipartStream, body_blob_ids
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+VARIABLE_PATTERN = re.compile(r"\{\{([a-zA-Z0-9_.-]+)\}\}")
+PATH_TOKEN = re.compile(r"([^.\[\]]+)|\[(-?\d+)\]")
+CHARSET_PARAM = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+DEFAULT_TIMEOUT = 30
+JSON_CACHE_ENTRIES = int(os.environ.get("JSON_BODY_CACHE_ENTRIES", "256"))
+JSON_CACHE_MAX_BYTES = int(os.environ.get("JSON_BODY_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+# Execute previews for the browser; runners and monitors decode bodies in full
+RESPONSE_PREVIEW_MAX_BYTES = int(os.environ.get("RESPONSE_PREVIEW_MAX_BYTES", str(2 * 1024 * 1024)))
+RESPONSE_BINARY_INLINE_BYTES = int(os.environ.get("RESPONSE_BINARY_INLINE_BYTES", str(1024 * 1024)))
+HEX_PREVIEW_BYTES = 256
+SNIFF_BYTES = 1024
+
+TEXT_TYPES = {
+    "application/xml", "application/javascript", "application/ecmascript", "application/x-www-form-urlencoded",
+    "application/graphql", "application/yaml", "application/x-yaml", "application/x-ndjson", "application/sql",
+    "application/csv", "application/x-sh",
+}
+BINARY_PREFIXES = ("image/", "audio/", "video/", "font/")
+BINARY_TYPES = {
+    "application/octet-stream", "application/pdf", "application/zip", "application/gzip", "application/x-gzip",
+    "application/x-tar", "application/x-protobuf", "application/protobuf", "application/vnd.google.protobuf",
+    "application/grpc", "application/msgpack", "application/x-msgpack", "application/cbor", "application/wasm",
+    "application/x-7z-compressed", "application/vnd.apache.avro", "application/vnd.apache.parquet",
+}
+
+# request_id -> (content, parsed); one entry per saved request, replaced when the body changes
+_json_cache: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+_json_cache_lock = threading.Lock()
+
+
+# ============= Variable Substitution =============
+
+def environment_variables(environment: Optional[dict]) -> Dict[str, str]:
+    """Map of enabled environment variables (same rules as the frontend)"""
+    variables = {}
+    for variable in (environment or {}).get("variables", []):
+        key = (variable.get("key") or "").strip()
+        if key and variable.get("enabled") is not False:
+            variables[key] = variable.get("value") or ""
+    return variables
+
+
+def substitute(text: Any, variables: Dict[str, str]) -> Any:
+    """Replace {{name}} placeholders; unknown names are left untouched"""
+    if not text or not isinstance(text, str) or not variables or "{{" not in text:
+        return text
+    lowered = {k.lower(): v for k, v in variables.items()}
+
+    def replace(match):
+        name = match.group(1)
+        if name in variables:
+            return str(variables[name])
+        return str(lowered.get(name.lower(), match.group(0)))
+
+    return VARIABLE_PATTERN.sub(replace, text)
+
+
+def resolve_request(request_doc: dict, variables: Dict[str, str]) -> dict:
+    """Build an execute spec from a saved request with variables substituted"""
+    def pairs(items):
+        return [
+            {**item, "key": substitute(item.get("key", ""), variables), "value": substitute(item.get("value", ""), variables)}
+            for item in items or []
+        ]
+
+    body = dict(request_doc.get("body") or {"type": "none", "content": ""})
+    body["content"] = substitute(body.get("content", ""), variables)
+    if body.get("parts"):
+        body["parts"] = [
+            {**part, "value": substitute(part.get("value", ""), variables)} if part.get("type") != "file" else part
+            for part in body["parts"]
+        ]
+    auth = {
+        k: substitute(v, variables) if k != "type" else v
+        for k, v in (request_doc.get("auth") or {"type": "none"}).items()
+    }
+    return {
+        "method": request_doc.get("method", "GET"),
+        "url": substitute(request_doc.get("url", ""), variables),
+        "headers": pairs(request_doc.get("headers")),
+        "params": pairs(request_doc.get("params")),
+        "body": body,
+        "auth": auth,
+        "request_id": request_doc.get("request_id")
+    }
+
+
+# ============= Sending =============
+
+def parse_json_body(content: str, request_id: Optional[str] = None) -> Any:
+    """json.loads with a per-request cache, so resending an unchanged saved body skips the parse.
+
+    Raises ValueError for invalid JSON. Parsed bodies are shared between calls
+    and must not be mutated.
+    """
+    if not request_id or len(content) > JSON_CACHE_MAX_BYTES:
+        return json.loads(content)
+    with _json_cache_lock:
+        cached = _json_cache.get(request_id)
+        if cached and cached[0] == content:
+            _json_cache.move_to_end(request_id)
+            return cached[1]
+    parsed = json.loads(content)
+    with _json_cache_lock:
+        _json_cache[request_id] = (content, parsed)
+        _json_cache.move_to_end(request_id)
+        while len(_json_cache) > JSON_CACHE_ENTRIES:
+            _json_cache.popitem(last=False)
+    return parsed
+
+
+def _has_header(headers: dict, name: str) -> bool:
+    return any(key.lower() == name for key in headers)
+
+
+def build_body(body: dict, headers: dict, open_blob: Optional[Callable] = None, request_id: Optional[str] = None):
+    """Return (data, json) for requests; file bodies come back as open streams the caller must close"""
+    kind = body.get("type")
+    if kind in ["binary", "multipart"] and open_blob is None and body_blob_ids(body):
+        raise ValueError("File bodies cannot be sent from here")
+    if kind == "json" and body.get("content"):
+        try:
+            return None, parse_json_body(body["content"], request_id)
+        except ValueError:
+            return None, None
+    if kind in ["form", "raw"] and body.get("content"):
+        return body["content"], None
+    if kind == "binary" and body.get("blob_id"):
+        stream, blob = open_blob(body["blob_id"])
+        if not _has_header(headers, "content-type"):
+            headers["Content-Type"] = blob.get("content_type") or "application/octet-stream"
+        return stream, None
+    if kind == "multipart":
+        parts = []
+        for part in body.get("parts") or []:
+            if not part.get("enabled", True) or not part.get("key"):
+                continue
+            if part.get("type") == "file":
+                if not part.get("blob_id"):
+                    continue
+                stream, blob = open_blob(part["blob_id"])
+                parts.append({
+                    "name": part["key"],
+                    "file": stream,
+                    "size": blob["size"],
+                    "filename": part.get("filename") or blob.get("filename"),
+                    "content_type": part.get("content_type") or blob.get("content_type")
+                })
+            else:
+                parts.append({"name": part["key"], "value": part.get("value", "")})
+        stream = MultipartStream(parts)
+        headers["Content-Type"] = stream.content_type
+        return stream, None
+    return None, None
+
+
+def build_send_kwargs(spec: dict, open_blob: Optional[Callable] = None) -> dict:
+    """Translate an execute spec into requests.request() keyword arguments"""
+    # Build headers
+    headers = {}
+    for h in spec.get("headers", []):
+        if h.get("enabled", True):
+            headers[h["key"]] = h["value"]
+
+    # Build params
+    params = {}
+    for p in spec.get("params", []):
+        if p.get("enabled", True):
+            params[p["key"]] = p["value"]
+
+    # Build auth
+    auth = None
+    spec_auth = spec.get("auth") or {}
+    if spec_auth.get("type") == "basic":
+        auth = (spec_auth.get("username"), spec_auth.get("password"))
+    elif spec_auth.get("type") == "bearer":
+        headers["Authorization"] = f"Bearer {spec_auth.get('token')}"
+    elif spec_auth.get("type") == "apikey":
+        headers[spec_auth.get("key")] = spec_auth.get("value")
+
+    # Build body
+    data, json_data = build_body(spec.get("body") or {}, headers, open_blob, spec.get("request_id"))
+
+    return {
+        "method": spec["method"],
+        "url": spec["url"],
+        "headers": headers,
+        "params": params,
+        "json": json_data,
+        "data": data,
+        "auth": auth
+    }
+
+
+def send(
+    session: requests.Session,
+    spec: dict,
+    timeout: Any = DEFAULT_TIMEOUT,
+    open_blob: Optional[Callable] = None
+) -> Tuple[requests.Response, int]:
+    """Send an execute spec synchronously; returns the response and elapsed ms"""
+    kwargs = build_send_kwargs(spec, open_blob)
+    start_time = time.time()
+    try:
+        response = session.request(timeout=timeout, **kwargs)
+    finally:
+        if hasattr(kwargs["data"], "close"):
+            kwargs["data"].close()
+    elapsed_time = int((time.time() - start_time) * 1000)  # ms
+    return response, elapsed_time
+
+
+def format_size(size_bytes: int) -> str:
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
+    elif size_bytes < 1024 * 1024:
+        return f"{size_bytes / 1024:.1f} KB"
+    return f"{size_bytes / (1024 * 1024):.1f} MB"
+
+
+# ============= Response Decoding =============
+
+def parse_content_type(header: Optional[str]) -> Tuple[str, Optional[str]]:
+    """`Application/JSON; charset=UTF-8` -> ("application/json", "utf-8")"""
+    mime, _, params = (header or "").partition(";")
+    charset = CHARSET_PARAM.search(params)
+    return mime.strip().lower(), charset.group(1).lower() if charset else None
+
+
+def _looks_binary(sample: bytes) -> bool:
+    """NUL bytes or invalid UTF-8 in the first bytes; a multi-byte character cut at the end is fine"""
+    if b"\x00" in sample:
+        return True
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return False
+    except UnicodeDecodeError:
+        return True
+
+
+def content_kind(mime: str, content: bytes) -> str:
+    """"json", "text" or "binary", from the media type; unknown or missing types are sniffed"""
+    if mime in ("application/json", "text/json") or mime.endswith("+json"):
+        return "json"
+    if mime.startswith("text/") or mime in TEXT_TYPES or mime.endswith(("+xml", "+yaml")):
+        return "text"
+    if mime.startswith(BINARY_PREFIXES) or mime in BINARY_TYPES:
+        return "binary"
+    sample = content[:SNIFF_BYTES]
+    if _looks_binary(sample):
+        return "binary"
+    # Untyped or text/plain-like bodies that hold JSON are still parsed, as before
+    return "json" if sample.lstrip()[:1] in (b"{", b"[") else "text"
+
+
+def decode_text(content: bytes, charset: Optional[str], limit: Optional[int] = None) -> str:
+    """Decode with the declared charset (UTF-8 otherwise) and no detection pass; cuts at `limit` bytes
+    without splitting a character"""
+    try:
+        decoder = codecs.getincrementaldecoder(charset or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    if limit is not None and len(content) > limit:
+        return decoder.decode(content[:limit], final=False)
+    text = decoder.decode(content, final=True)
+    return text[1:] if text.startswith("\ufeff") else text
+
+
+def loads_json(content: bytes) -> Any:
+    """Parse a JSON document; raises ValueError"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def hex_preview(content: bytes, limit: int = HEX_PREVIEW_BYTES) -> str:
+    return content[:limit].hex(" ")
+
+
+def decode_body(content: bytes, content_type: Optional[str], max_bytes: Optional[int] = None,
+                inline_binary_bytes: int = RESPONSE_BINARY_INLINE_BYTES, parse: bool = True) -> Tuple[Any, dict]:
+    """(body, info) for a response body, driven by Content-Type and charset.
+
+    JSON is parsed (unless larger than `max_bytes`, then previewed as text), text is
+    decoded without charset detection and cut at `max_bytes`, and binary comes back
+    base64 encoded up to `inline_binary_bytes` with a hex preview either way.
+    """
+    mime, charset = parse_content_type(content_type)
+    kind = content_kind(mime, content)
+    info = {"kind": kind, "mime_type": mime or None, "bytes": len(content), "truncated": False}
+    if kind == "binary":
+        info["preview_hex"] = hex_preview(content)
+        if len(content) > inline_binary_bytes:
+            info["truncated"] = True
+            return None, info
+        info["encoding"] = "base64"
+        return base64.b64encode(content).decode("ascii"), info
+    info["charset"] = charset or "utf-8"
+    if not parse:
+        return None, info
+    truncated = max_bytes is not None and len(content) > max_bytes
+    if kind == "json" and not truncated:
+        try:
+            if charset in (None, "utf-8", "utf8"):
+                return loads_json(content[3:] if content.startswith(codecs.BOM_UTF8) else content), info
+            return loads_json(decode_text(content, charset)), info
+        except ValueError:
+            info["kind"] = "text"  # mislabeled or malformed: show it as it came
+    info["truncated"] = truncated
+    return decode_text(content, charset, max_bytes), info
+
+
+def response_filename(response: requests.Response) -> str:
+    """Content-Disposition filename, else the last URL path segment"""
+    disposition = response.headers.get("content-disposition", "")
+    match = re.search(r"filename\*?=(?:UTF-8'')?\"?([^\";]+)", disposition, re.IGNORECASE)
+    if match:
+        return unquote(match.group(1)).strip()
+    return urlsplit(response.url or "").path.rstrip("/").rpartition("/")[2] or "response"
+
+
+def response_summary(response: requests.Response, elapsed_time: int, parse_body: bool = True,
+                     max_bytes: Optional[int] = None) -> dict:
+    """Execute result payload as returned to the browser; `content` describes how the body was decoded"""
+    response_body, content = decode_body(
+        response.content, response.headers.get("content-type"), max_bytes=max_bytes, parse=parse_body
+    )
+
+    return {
+        "status": response.status_code,
+        "statusText": response.reason,
+        "time": elapsed_time,
+        "size": format_size(len(response.content)),
+        "headers": dict(response.headers),
+        "body": response_body,
+        "content": content
+    }
+
+
+def error_summary(error: Exception) -> dict:
+    return {
+        "status": 0,
+        "statusText": "Error",
+        "time": 0,
+        "size": "0 B",
+        "headers": {},
+        "body": {"error": str(error)}
+    }
+
+
+# ============= Response Inspection =============
+
+def extract_path(data: Any, path: str) -> Any:
+    """Resolve a dotted/indexed path such as `data.items[0].id` (leading `$.` optional)"""
+    if path in ("", "$"):
+        return data
+    if path.startswith("$."):
+        path = path[2:]
+    current = data
+    for key, index in PATH_TOKEN.findall(path):
+        if index:
+            if not isinstance(current, list):
+                raise KeyError(path)
+            current = current[int(index)]
+        else:
+            if not isinstance(current, dict) or key not in current:
+                raise KeyError(path)
+            current = current[key]
+    return current
@@ -0,0 +1,286 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import re
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from lifecycle import LeaderLease
+
+KEY_SEPARATOR = "\x1f"
+MAX_DEPTH = 5
+BUILD_WAIT_SECONDS = 10  # how long a reader waits for another worker's build before giving up
+BUILD_POLL_SECONDS = 0.05
+REQUEST_SUMMARY_FIELDS = {"_id": 0, "request_id": 1, "name": 1, "method": 1, "url": 1, "folder_path": 1, "updated_at": 1}
+
+# A request's place in the tree: (collection_id, folder_path)
+Location = Tuple[str, List[str]]
+
+
+def clean_path(path: Optional[Iterable[str]]) -> List[str]:
+    return [str(part).strip() for part in path or [] if str(part).strip()]
+
+
+def parse_folder(folder: str) -> List[str]:
+    """`Users / Admin` (Collection.folders format) -> ["Users", "Admin"]"""
+    return clean_path(re.split(r"\s*/\s*", folder or ""))
+
+
+def path_key(path: List[str]) -> str:
+    return KEY_SEPARATOR.join(path)
+
+
+def _node(collection: dict, path: List[str]) -> dict:
+    return {
+        "collection_id": collection["collection_id"],
+        "org_id": collection["org_id"],
+        "path_key": path_key(path),
+        "parent_key": path_key(path[:-1]) if path else None,
+        "path": path,
+        "name": path[-1] if path else collection.get("name"),
+        "depth": len(path)
+    }
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    await db.folder_nodes.create_index([("collection_id", 1), ("path_key", 1)], unique=True)
+    await db.folder_nodes.create_index([("collection_id", 1), ("parent_key", 1), ("name", 1)])
+    await db.requests.create_index([("collection_id", 1), ("folder_path", 1)])
+
+
+async def is_built(db: AsyncIOMotorDatabase, collection_id: str) -> bool:
+    # The root node is written last by rebuild_tree, so its presence marks a complete tree
+    return await db.folder_nodes.find_one({"collection_id": collection_id, "path_key": ""}, {"_id": 1}) is not None
+
+
+async def _direct_counts(db: AsyncIOMotorDatabase, collection_id: str) -> Dict[Tuple[str, ...], int]:
+    direct: Dict[Tuple[str, ...], int] = {}
+    async for group in db.requests.aggregate([
+        {"$match": {"collection_id": collection_id}},
+        {"$group": {"_id": "$folder_path", "count": {"$sum": 1}}}
+    ]):
+        path = tuple(clean_path(group["_id"]))
+        direct[path] = direct.get(path, 0) + group["count"]
+    return direct
+
+
+async def build_tree(db: AsyncIOMotorDatabase, collection: dict):
+    """Build an unbuilt tree once across workers: one builder holds a per-collection lease,
+    everyone else waits for its root node (503 if it takes too long)"""
+    collection_id = collection["collection_id"]
+    lease = LeaderLease(db, f"folder-tree:{collection_id}")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + BUILD_WAIT_SECONDS
+    while not await lease.acquire():
+        if await is_built(db, collection_id):
+            return
+        if loop.time() > deadline:
+            raise HTTPException(status_code=503, detail="Folder tree is being built; retry shortly", headers={"Retry-After": "1"})
+        await asyncio.sleep(BUILD_POLL_SECONDS)
+    try:
+        if not await is_built(db, collection_id):
+            await rebuild_tree(db, collection)
+            await _recount(db, collection)
+    finally:
+        await lease.release()
+
+
+async def _recount(db: AsyncIOMotorDatabase, collection: dict):
+    """Fold in requests created, moved or deleted while the tree was being built.
+
+    record_moves skips collections until the root node exists, so those changes are
+    missing from the counts; anything after the root was written is already applied.
+    """
+    collection_id = collection["collection_id"]
+    actual = await _direct_counts(db, collection_id)
+    stored = {
+        tuple(node["path"]): node["request_count"]
+        async for node in db.folder_nodes.find({"collection_id": collection_id}, {"_id": 0, "path": 1, "request_count": 1})
+    }
+    for path in set(actual) | set(stored):
+        delta = actual.get(path, 0) - stored.get(path, 0)
+        if delta:
+            await _apply_delta(db, collection, list(path), delta)
+
+
+async def rebuild_tree(db: AsyncIOMotorDatabase, collection: dict):
+    """Materialize a collection's folder nodes and counts from its requests (callers hold the build lease)"""
+    collection_id = collection["collection_id"]
+    direct = await _direct_counts(db, collection_id)
+
+    declared = {tuple(parse_folder(folder)) for folder in collection.get("folders") or []}
+    totals: Dict[Tuple[str, ...], int] = {(): 0}
+    for path in list(direct) + list(declared):
+        for depth in range(len(path) + 1):
+            totals.setdefault(path[:depth], 0)
+    for path, count in direct.items():
+        for depth in range(len(path) + 1):
+            totals[path[:depth]] += count
+    declared_prefixes = {path[:depth] for path in declared for depth in range(1, len(path) + 1)}
+
+    await db.folder_nodes.delete_many({"collection_id": collection_id})
+    nodes = [
+        {
+            **_node(collection, list(path)),
+            "request_count": direct.get(path, 0),
+            "total_count": total,
+            "declared": path in declared_prefixes
+        }
+        for path, total in totals.items() if path
+    ]
+    if nodes:
+        await db.folder_nodes.insert_many(nodes, ordered=False)
+    await db.folder_nodes.insert_one({
+        **_node(collection, []), "request_count": direct.get((), 0), "total_count": totals[()], "declared": True
+    })
+
+
+async def _apply_delta(db: AsyncIOMotorDatabase, collection: dict, path: List[str], delta: int):
+    path = clean_path(path)
+    operations = [
+        UpdateOne(
+            {"collection_id": collection["collection_id"], "path_key": path_key(path[:depth])},
+            {
+                "$inc": {"total_count": delta, "request_count": delta if depth == len(path) else 0},
+                "$setOnInsert": {**_node(collection, path[:depth]), "declared": False}
+            },
+            upsert=True
+        )
+        for depth in range(len(path) + 1)
+    ]
+    await db.folder_nodes.bulk_write(operations, ordered=False)
+    if delta < 0:
+        # Folders that only existed because of requests go away with their last request
+        await db.folder_nodes.delete_many({
+            "collection_id": collection["collection_id"],
+            "path_key": {"$in": [path_key(path[:depth]) for depth in range(1, len(path) + 1)]},
+            "total_count": {"$lte": 0},
+            "declared": {"$ne": True}
+        })
+
+
+async def record_moves(db: AsyncIOMotorDatabase, moves: List[Tuple[Optional[Location], Optional[Location]]]):
+    """Keep folder counts current for requests created (None -> loc), moved, or deleted (loc -> None).
+
+    Collections whose tree hasn't been built yet are skipped; they are built from
+    scratch on first read.
+    """
+    deltas: Dict[Tuple[str, Tuple[str, ...]], int] = {}
+    for old, new in moves:
+        if old and new and old[0] == new[0] and clean_path(old[1]) == clean_path(new[1]):
+            continue
+        if old and old[0]:
+            key = (old[0], tuple(clean_path(old[1])))
+            deltas[key] = deltas.get(key, 0) - 1
+        if new and new[0]:
+            key = (new[0], tuple(clean_path(new[1])))
+            deltas[key] = deltas.get(key, 0) + 1
+
+    collections: Dict[str, Optional[dict]] = {}
+    for (collection_id, path), delta in deltas.items():
+        if not delta:
+            continue
+        if collection_id not in collections:
+            collections[collection_id] = None
+            if await is_built(db, collection_id):
+                collections[collection_id] = await db.collections.find_one(
+                    {"collection_id": collection_id}, {"_id": 0, "collection_id": 1, "org_id": 1, "name": 1}
+                )
+        if collections[collection_id]:
+            await _apply_delta(db, collections[collection_id], list(path), delta)
+
+
+async def sync_declared_folders(db: AsyncIOMotorDatabase, collection: dict):
+    """Reflect Collection.folders (including empty folders) in a built tree"""
+    collection_id = collection["collection_id"]
+    if not await is_built(db, collection_id):
+        return
+    declared = {
+        tuple(path[:depth])
+        for path in (parse_folder(folder) for folder in collection.get("folders") or [])
+        for depth in range(1, len(path) + 1)
+    }
+    await db.folder_nodes.update_many(
+        {"collection_id": collection_id, "path_key": {"$ne": ""}},
+        {"$set": {"declared": False}}
+    )
+    if declared:
+        await db.folder_nodes.bulk_write([
+            UpdateOne(
+                {"collection_id": collection_id, "path_key": path_key(list(path))},
+                {
+                    "$set": {"declared": True},
+                    "$setOnInsert": {**_node(collection, list(path)), "request_count": 0, "total_count": 0}
+                },
+                upsert=True
+            )
+            for path in declared
+        ], ordered=False)
+    await db.folder_nodes.delete_many({
+        "collection_id": collection_id, "declared": False, "total_count": {"$lte": 0}
+    })
+
+
+async def get_tree(
+    db: AsyncIOMotorDatabase,
+    collection: dict,
+    path: Optional[List[str]] = None,
+    depth: int = 1,
+    request_limit: int = 200,
+    request_skip: int = 0
+) -> dict:
+    """Subtree rooted at `path`, expanded `depth` levels; unexpanded folders only carry counts"""
+    collection_id = collection["collection_id"]
+    path = clean_path(path)
+    depth = max(0, min(depth, MAX_DEPTH))
+    if not await is_built(db, collection_id):
+        await build_tree(db, collection)
+
+    projection = {"_id": 0, "collection_id": 0, "org_id": 0, "parent_key": 0}
+    root = await db.folder_nodes.find_one({"collection_id": collection_id, "path_key": path_key(path)}, projection)
+    if not root:
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    by_key = {path_key(path): root}
+    expanded = [root]
+    level = [root]
+    for _ in range(depth):
+        if not level:
+            break
+        children = await db.folder_nodes.find(
+            {"collection_id": collection_id, "parent_key": {"$in": [node["path_key"] for node in level]}},
+            projection
+        ).sort("name", 1).to_list(length=None)
+        for node in level:
+            node["folders"] = []
+        for child in children:
+            by_key[path_key(child["path"][:-1])]["folders"].append(child)
+            by_key[child["path_key"]] = child
+        expanded += children
+        level = children
+
+    # Child folder counts for every returned node, expanded or not
+    counts = {
+        group["_id"]: group["count"]
+        async for group in db.folder_nodes.aggregate([
+            {"$match": {"collection_id": collection_id, "parent_key": {"$in": list(by_key)}}},
+            {"$group": {"_id": "$parent_key", "count": {"$sum": 1}}}
+        ])
+    }
+    for key, node in by_key.items():
+        node["folder_count"] = counts.get(key, 0)
+
+    # Requests directly inside each expanded folder (the deepest level stays collapsed)
+    for node in expanded[:len(expanded) - len(level)]:
+        query = {"collection_id": collection_id, "folder_path": node["path"]}
+        if not node["path"]:
+            query = {"collection_id": collection_id, "$or": [{"folder_path": []}, {"folder_path": None}]}
+        requests = await db.requests.find(query, REQUEST_SUMMARY_FIELDS).sort(
+            [("name", 1), ("request_id", 1)]
+        ).skip(request_skip).limit(request_limit + 1).to_list(request_limit + 1)
+        node["requests"] = requests[:request_limit]
+        node["has_more_requests"] = len(requests) > request_limit
+
+    for node in by_key.values():
+        node.pop("path_key", None)
+    return root
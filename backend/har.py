@@ -0,0 +1,413 @@
+from concurrent.futures import Executor
+from datetime import datetime, timezone, timedelta
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+import asyncio
+import base64
+import json
+import os
+import time
+import uuid
+import zlib
+import requests
+from bson import Binary
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from starlette.concurrency import run_in_threadpool
+
+HAR_MAX_BODY_BYTES = int(os.environ.get("HAR_MAX_BODY_BYTES", str(4 * 1024 * 1024)))
+HAR_CHUNK_BYTES = 1024 * 1024  # uncompressed entry bytes buffered before a chunk is written
+MAX_REPLAY_ENTRIES = 5000
+# "original" timing replays inside one HTTP request: idle gaps are collapsed and the whole
+# schedule is compressed to fit, so a capture appended to over days still replays promptly
+MAX_REPLAY_GAP_SECONDS = float(os.environ.get("HAR_REPLAY_MAX_GAP_SECONDS", "10"))
+MAX_REPLAY_SECONDS = float(os.environ.get("HAR_REPLAY_MAX_SECONDS", "120"))
+REDACTED_HEADERS = {"authorization", "proxy-authorization", "cookie", "set-cookie"}
+# requests sets these itself from the body and connection it actually sends
+SKIPPED_REPLAY_HEADERS = {"host", "content-length", "connection", "transfer-encoding"}
+CREATOR = {"name": "api-nexus", "version": "1.0"}
+
+
+# ============= Capture =============
+
+def _iso(moment: datetime) -> str:
+    return moment.isoformat().replace("+00:00", "Z")
+
+
+def _header_list(headers) -> List[dict]:
+    return [{"name": name, "value": value} for name, value in headers.items()]
+
+
+def _is_text(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return content_type.startswith("text/") or any(
+        kind in content_type for kind in ("json", "xml", "javascript", "x-www-form-urlencoded", "graphql")
+    )
+
+
+def _content(body: bytes, content_type: str) -> dict:
+    """HAR content/postData text; binary bodies are base64 encoded, oversized ones truncated"""
+    content = {"size": len(body), "mimeType": content_type}
+    truncated = len(body) > HAR_MAX_BODY_BYTES
+    if truncated:
+        body = body[:HAR_MAX_BODY_BYTES]
+        content["comment"] = f"Truncated to {HAR_MAX_BODY_BYTES} bytes"
+    if _is_text(content_type) or not content_type:
+        try:
+            content["text"] = body.decode("utf-8")
+            return content
+        except UnicodeDecodeError:
+            pass
+    content["text"] = base64.b64encode(body).decode("ascii")
+    content["encoding"] = "base64"
+    return content
+
+
+def _request_body(prepared: requests.PreparedRequest) -> Optional[dict]:
+    body = prepared.body
+    if body is None:
+        return None
+    content_type = prepared.headers.get("Content-Type", "")
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if not isinstance(body, bytes):
+        # File and multipart bodies are streamed from blob storage and already consumed
+        return {"mimeType": content_type, "text": "", "comment": "Streamed file body not captured"}
+    post_data = _content(body, content_type)
+    post_data.pop("size")
+    if "x-www-form-urlencoded" in content_type and "encoding" not in post_data:
+        post_data["params"] = [{"name": k, "value": v} for k, v in parse_qsl(post_data["text"], keep_blank_values=True)]
+    return post_data
+
+
+def _connection_timings(transport: Optional[dict]) -> dict:
+    """HAR dns/connect/ssl; connect includes ssl, as the spec requires"""
+    if not transport or transport.get("reused", True):
+        return {"dns": -1, "connect": -1, "ssl": -1}
+    ssl_ms = transport.get("tls_ms", -1)
+    connect_ms = transport.get("connect_ms", 0) + max(0, ssl_ms)
+    return {"dns": transport.get("dns_ms", -1), "connect": round(connect_ms, 3), "ssl": ssl_ms}
+
+
+def har_entry(response: requests.Response, elapsed_time: int, request_id: Optional[str] = None) -> dict:
+    """HAR 1.2 entry for a completed call.
+
+    DNS, connect and TLS timings come from the outbound session's `.transport`
+    trace; they are -1 on reused connections or when the trace is missing.
+    """
+    prepared = response.request
+    headers_at = min(elapsed_time, response.elapsed.total_seconds() * 1000)
+    timings = _connection_timings(getattr(response, "transport", None))
+    wait = max(0, headers_at - sum(timings[k] for k in ("dns", "connect") if timings[k] > 0))
+    started = datetime.now(timezone.utc) - timedelta(milliseconds=elapsed_time)
+    raw_version = getattr(response.raw, "version", 11)
+    entry = {
+        "startedDateTime": _iso(started),
+        "time": elapsed_time,
+        "request": {
+            "method": prepared.method,
+            "url": prepared.url,
+            "httpVersion": "HTTP/1.1",
+            "cookies": [],
+            "headers": _header_list(prepared.headers),
+            "queryString": [{"name": k, "value": v} for k, v in parse_qsl(urlsplit(prepared.url).query, keep_blank_values=True)],
+            "headersSize": -1,
+            "bodySize": len(prepared.body) if isinstance(prepared.body, (bytes, str)) else -1,
+        },
+        "response": {
+            "status": response.status_code,
+            "statusText": response.reason or "",
+            "httpVersion": "HTTP/1.0" if raw_version == 10 else "HTTP/1.1",
+            "cookies": [],
+            "headers": _header_list(response.headers),
+            "content": _content(response.content, response.headers.get("Content-Type", "")),
+            "redirectURL": response.headers.get("Location", ""),
+            "headersSize": -1,
+            "bodySize": len(response.content),
+        },
+        "cache": {},
+        "timings": {
+            "blocked": -1,
+            **timings,
+            "send": 0,
+            "wait": round(wait, 3),
+            "receive": round(max(0, elapsed_time - headers_at), 3),
+        },
+    }
+    post_data = _request_body(prepared)
+    if post_data is not None:
+        entry["request"]["postData"] = post_data
+    if request_id:
+        entry["_requestId"] = request_id
+    return entry
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    await db.har_captures.create_index("capture_id", unique=True)
+    await db.har_captures.create_index([("org_id", 1), ("created_at", -1)])
+    await db.har_chunks.create_index([("capture_id", 1), ("seq", 1)], unique=True)
+
+
+async def create_capture(db: AsyncIOMotorDatabase, org_id: str, user_id: str, name: Optional[str] = None, source: str = "execute") -> dict:
+    now = datetime.now(timezone.utc)
+    capture = {
+        "capture_id": f"har_{uuid.uuid4().hex[:12]}",
+        "org_id": org_id,
+        "name": name or f"Capture {now:%Y-%m-%d %H:%M}",
+        "source": source,
+        "entry_count": 0,
+        "chunk_count": 0,
+        "size": 0,
+        "created_by": user_id,
+        "created_at": now,
+        "updated_at": now
+    }
+    await db.har_captures.insert_one(capture)
+    capture.pop("_id", None)
+    return capture
+
+
+async def get_capture(db: AsyncIOMotorDatabase, capture_id: str) -> dict:
+    capture = await db.har_captures.find_one({"capture_id": capture_id}, {"_id": 0})
+    if not capture:
+        raise HTTPException(status_code=404, detail="HAR capture not found")
+    return capture
+
+
+def _encode(entry: dict) -> bytes:
+    return json.dumps(entry, separators=(",", ":")).encode()
+
+
+class HarWriter:
+    """Buffers entries and appends them to a capture as zlib-compressed chunks.
+
+    Several writers may append to the same capture concurrently; chunk sequence
+    numbers are allocated atomically on the capture document.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, capture_id: str, chunk_bytes: int = HAR_CHUNK_BYTES):
+        self.db = db
+        self.capture_id = capture_id
+        self.chunk_bytes = chunk_bytes
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+
+    async def add(self, entry: dict):
+        line = await run_in_threadpool(_encode, entry)
+        self.buffer.append(line)
+        self.buffered += len(line)
+        if self.buffered >= self.chunk_bytes:
+            await self.flush()
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        lines, count, size = b"\n".join(self.buffer), len(self.buffer), self.buffered
+        self.buffer, self.buffered = [], 0
+        compressed = await run_in_threadpool(zlib.compress, lines, 6)
+        capture = await self.db.har_captures.find_one_and_update(
+            {"capture_id": self.capture_id},
+            {
+                "$inc": {"chunk_count": 1, "entry_count": count, "size": size},
+                "$set": {"updated_at": datetime.now(timezone.utc)}
+            },
+            projection={"_id": 0, "chunk_count": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if not capture:
+            return  # deleted while writing
+        await self.db.har_chunks.insert_one({
+            "capture_id": self.capture_id,
+            "seq": capture["chunk_count"],
+            "entries": count,
+            "data": Binary(compressed)
+        })
+
+
+async def iter_entries(db: AsyncIOMotorDatabase, capture_id: str) -> AsyncIterator[dict]:
+    """Entries in write order, decompressing one chunk at a time"""
+    async for chunk in db.har_chunks.find({"capture_id": capture_id}, {"_id": 0, "data": 1}).sort("seq", 1):
+        for line in zlib.decompress(bytes(chunk["data"])).split(b"\n"):
+            yield json.loads(line)
+
+
+def redact(entry: dict) -> dict:
+    """Mask credentials before a capture leaves the org"""
+    for side in ("request", "response"):
+        for header in entry[side]["headers"]:
+            if header["name"].lower() in REDACTED_HEADERS:
+                header["value"] = "[REDACTED]"
+    return entry
+
+
+async def export_har(db: AsyncIOMotorDatabase, capture: dict, redacted: bool = True) -> AsyncIterator[bytes]:
+    """Stream a capture as a HAR 1.2 document without holding every entry in memory"""
+    yield (
+        f'{{"log": {{"version": "1.2", "creator": {json.dumps(CREATOR)}, '
+        f'"comment": {json.dumps(capture["name"])}, "pages": [], "entries": ['
+    ).encode()
+    first = True
+    async for entry in iter_entries(db, capture["capture_id"]):
+        yield (b"" if first else b",") + json.dumps(redact(entry) if redacted else entry).encode()
+        first = False
+    yield b"]}}"
+
+
+async def import_har(db: AsyncIOMotorDatabase, org_id: str, user_id: str, har: dict, name: Optional[str] = None) -> dict:
+    entries = (har.get("log") or {}).get("entries")
+    if not isinstance(entries, list):
+        raise HTTPException(status_code=400, detail="Not a HAR document: log.entries missing")
+    for entry in entries:
+        request = entry.get("request") if isinstance(entry, dict) else None
+        if not isinstance(request, dict) or not request.get("url") or not request.get("method"):
+            raise HTTPException(status_code=400, detail="HAR entries need a request with a method and url")
+        if _started(entry) is None:
+            raise HTTPException(status_code=400, detail="HAR entries need an ISO 8601 startedDateTime")
+    capture = await create_capture(db, org_id, user_id, name or (har["log"].get("comment") or None), source="import")
+    writer = HarWriter(db, capture["capture_id"])
+    for entry in entries:
+        await writer.add(entry)
+    await writer.flush()
+    return await get_capture(db, capture["capture_id"])
+
+
+# ============= Replay =============
+
+def _started(entry: dict) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(entry["startedDateTime"].replace("Z", "+00:00")).timestamp()
+    except (KeyError, TypeError, AttributeError, ValueError):
+        return None
+
+
+def replay_schedule(entries: List[dict], speed: float) -> Tuple[List[float], float]:
+    """Start offsets in seconds for "original" timing, and the effective speed.
+
+    Gaps longer than MAX_REPLAY_GAP_SECONDS are collapsed to it, then the schedule is
+    sped up further if needed to fit MAX_REPLAY_SECONDS. Entries without a usable
+    startedDateTime start immediately.
+    """
+    starts = [_started(entry) for entry in entries]
+    offsets, offset, previous = {}, 0.0, None
+    for started in sorted({s for s in starts if s is not None}):
+        if previous is not None:
+            offset += min(started - previous, MAX_REPLAY_GAP_SECONDS)
+        offsets[started], previous = offset, started
+    effective = max(speed, offset / MAX_REPLAY_SECONDS)
+    return [offsets[s] / effective if s is not None else 0.0 for s in starts], effective
+
+
+def _replay_body(entry: dict) -> Optional[bytes]:
+    post_data = entry["request"].get("postData")
+    if not post_data or not post_data.get("text"):
+        return None
+    if post_data.get("encoding") == "base64":
+        return base64.b64decode(post_data["text"])
+    return post_data["text"].encode("utf-8")
+
+
+def send_entry(session: requests.Session, entry: dict, timeout: Any) -> requests.Response:
+    """Re-issue a HAR request as recorded (the URL already carries its query string)"""
+    request = entry["request"]
+    headers = {
+        h["name"]: h["value"] for h in request.get("headers", [])
+        if not h["name"].startswith(":") and h["name"].lower() not in SKIPPED_REPLAY_HEADERS
+    }
+    return session.request(
+        request["method"], request["url"], headers=headers, data=_replay_body(entry),
+        timeout=timeout, allow_redirects=False
+    )
+
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(fraction * (len(values) - 1))))]
+
+
+def replay_summary(results: List[dict]) -> dict:
+    completed = [r for r in results if r["error"] is None]
+    deltas = [r["delta_ms"] for r in completed if r["delta_ms"] is not None]
+    summary = {
+        "count": len(results),
+        "errors": len(results) - len(completed),
+        "status_mismatches": sum(1 for r in completed if r["original_status"] not in (None, r["status"])),
+        "mean_delta_ms": round(sum(deltas) / len(deltas), 1) if deltas else None,
+    }
+    for label, values in (
+        ("original", [r["original_time"] for r in completed if r["original_time"] is not None]),
+        ("replay", [r["time"] for r in completed]),
+        ("delta", deltas),
+    ):
+        summary[f"{label}_p50_ms"] = _percentile(values, 0.5)
+        summary[f"{label}_p95_ms"] = _percentile(values, 0.95)
+    return summary
+
+
+async def replay_entries(
+    entries: List[dict],
+    session: requests.Session,
+    guard,
+    timing: str = "original",
+    speed: float = 1.0,
+    concurrency: int = 10,
+    timeout: Any = 30,
+    pool: Optional[Executor] = None
+) -> dict:
+    """Re-issue entries concurrently; "original" timing keeps the recorded gaps (divided by speed,
+    bounded by replay_schedule).
+
+    `guard(url)` is an async context manager admitting each call (the caller's quotas).
+    """
+    if len(entries) > MAX_REPLAY_ENTRIES:
+        raise HTTPException(status_code=400, detail=f"Cannot replay more than {MAX_REPLAY_ENTRIES} entries")
+    semaphore = asyncio.Semaphore(concurrency)
+    offsets, effective_speed = replay_schedule(entries, speed) if timing == "original" else ([0.0] * len(entries), speed)
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+
+    async def replay(index: int, entry: dict) -> dict:
+        if timing == "original":
+            await asyncio.sleep(max(0.0, started_at + offsets[index] - loop.time()))
+        original = entry.get("response") or {}
+        original_time = entry.get("time")
+        result = {
+            "index": index,
+            "method": entry["request"]["method"],
+            "url": entry["request"]["url"],
+            "original_status": original.get("status"),
+            "original_time": original_time,
+            "status": None,
+            "time": None,
+            "delta_ms": None,
+            "error": None
+        }
+        async with semaphore:
+            try:
+                async with guard(entry["request"]["url"]):
+                    sent = time.perf_counter()
+                    response = await loop.run_in_executor(pool, send_entry, session, entry, timeout)
+                    elapsed = (time.perf_counter() - sent) * 1000
+            except HTTPException as e:
+                result["error"] = e.detail
+                return result
+            except Exception as e:
+                result["error"] = str(e)
+                return result
+        result["status"] = response.status_code
+        result["time"] = round(elapsed, 1)
+        if original_time is not None and original_time >= 0:
+            result["delta_ms"] = round(elapsed - original_time, 1)
+        return result
+
+    results = await asyncio.gather(*(replay(i, entry) for i, entry in enumerate(entries)))
+    return {
+        "timing": timing,
+        "speed": speed,
+        "effective_speed": round(effective_speed, 3),
+        "duration_ms": round((loop.time() - started_at) * 1000, 1),
+        "summary": replay_summary(results),
+        "entries": results
+    }
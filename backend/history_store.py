@@ -0,0 +1,184 @@
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+import zlib
+from bson import Binary
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from analytics import refresh_hourly_rollups, refresh_daily_rollups
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION = {
+    "raw_days": int(os.environ.get("HISTORY_RAW_RETENTION_DAYS", "7")),
+    "hourly_days": int(os.environ.get("HISTORY_HOURLY_RETENTION_DAYS", "90")),
+    "daily_days": int(os.environ.get("HISTORY_DAILY_RETENTION_DAYS", "730")),
+    "store_bodies": os.environ.get("HISTORY_STORE_BODIES", "").lower() in ["1", "true", "yes"],
+    "max_body_bytes": int(os.environ.get("HISTORY_MAX_BODY_BYTES", str(1024 * 1024))),
+}
+COMPACTION_INTERVAL_SECONDS = int(os.environ.get("HISTORY_COMPACTION_INTERVAL", "300"))
+POLICY_CACHE_SECONDS = 60
+
+# org_id -> (loaded_at, policy); avoids a policy read on every execute
+_policy_cache: Dict[str, Tuple[float, dict]] = {}
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    """Create TTL and lookup indexes for history storage"""
+    await db.request_history.create_index("expires_at", expireAfterSeconds=0)
+    await db.request_history.create_index("history_id", unique=True, sparse=True)
+    # Lets compact_all find orgs with recent history from the index alone
+    await db.request_history.create_index([("timestamp", 1), ("org_id", 1)])
+    await db.request_history_hourly.create_index("expires_at", expireAfterSeconds=0)
+    await db.request_history_daily.create_index("expires_at", expireAfterSeconds=0)
+    await db.history_bodies.create_index("hash", unique=True)
+    await db.history_bodies.create_index("expires_at", expireAfterSeconds=0)
+    await db.history_retention.create_index("org_id", unique=True)
+
+
+async def get_retention_policy(db: AsyncIOMotorDatabase, org_id: str) -> dict:
+    """Get an organization's history retention policy merged over the defaults"""
+    cached = _policy_cache.get(org_id)
+    if cached and time.monotonic() - cached[0] < POLICY_CACHE_SECONDS:
+        return cached[1]
+
+    record = await db.history_retention.find_one({"org_id": org_id}, {"_id": 0}) or {}
+    policy = {"org_id": org_id, **DEFAULT_RETENTION}
+    policy.update({k: v for k, v in record.items() if v is not None})
+    _policy_cache[org_id] = (time.monotonic(), policy)
+    return policy
+
+
+def invalidate_retention_policy(org_id: str):
+    """Drop a cached retention policy (called on cross-worker invalidation)"""
+    _policy_cache.pop(org_id, None)
+
+
+async def set_retention_policy(db: AsyncIOMotorDatabase, org_id: str, updates: dict, user_id: str) -> dict:
+    """Store retention overrides for an organization"""
+    fields = {k: v for k, v in updates.items() if v is not None}
+    await db.history_retention.update_one(
+        {"org_id": org_id},
+        {"$set": {
+            **fields,
+            "org_id": org_id,
+            "updated_by": user_id,
+            "updated_at": datetime.now(timezone.utc)
+        }},
+        upsert=True
+    )
+    _policy_cache.pop(org_id, None)
+    return await get_retention_policy(db, org_id)
+
+
+async def store_body(db: AsyncIOMotorDatabase, content: bytes, expires_at: datetime) -> str:
+    """Store a compressed response body once per content hash and return the hash"""
+    digest = hashlib.sha256(content).hexdigest()
+    await db.history_bodies.update_one(
+        {"hash": digest},
+        {
+            "$setOnInsert": {
+                "hash": digest,
+                "encoding": "zlib",
+                "size": len(content),
+                "data": Binary(zlib.compress(content, 6)),
+                "created_at": datetime.now(timezone.utc)
+            },
+            # Keep the body as long as its most recent referencing entry
+            "$max": {"expires_at": expires_at}
+        },
+        upsert=True
+    )
+    return digest
+
+
+async def load_body(db: AsyncIOMotorDatabase, digest: str) -> Optional[bytes]:
+    """Load and decompress a stored response body"""
+    record = await db.history_bodies.find_one({"hash": digest}, {"_id": 0, "data": 1, "encoding": 1})
+    if not record:
+        return None
+    data = bytes(record["data"])
+    return zlib.decompress(data) if record.get("encoding") == "zlib" else data
+
+
+async def record_history(
+    db: AsyncIOMotorDatabase,
+    org_id: str,
+    user_id: str,
+    method: str,
+    url: str,
+    status: int,
+    elapsed_ms: int,
+    request_id: Optional[str] = None,
+    body: Optional[bytes] = None,
+    size: Optional[int] = None,
+    extra: Optional[dict] = None
+) -> dict:
+    """Write a raw history entry with a TTL derived from the org's retention policy"""
+    policy = await get_retention_policy(db, org_id)
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(days=policy["raw_days"])
+
+    entry = {
+        "history_id": f"hist_{uuid.uuid4().hex[:12]}",
+        "request_id": request_id,
+        "user_id": user_id,
+        "org_id": org_id,
+        "method": method,
+        "url": url,
+        "status": status,
+        "time": elapsed_ms,
+        "size": size,
+        "timestamp": now,
+        "expires_at": expires_at
+    }
+    if extra:
+        entry.update(extra)
+
+    if body and policy["store_bodies"] and len(body) <= policy["max_body_bytes"]:
+        entry["body_hash"] = await store_body(db, body, expires_at)
+
+    await db.request_history.insert_one(entry)
+    entry.pop("_id", None)
+    return entry
+
+
+async def compact_org(db: AsyncIOMotorDatabase, org_id: str, now: Optional[datetime] = None):
+    """Roll an organization's raw history into hourly and daily rollups"""
+    policy = await get_retention_policy(db, org_id)
+    await refresh_hourly_rollups(db, org_id, now, expire_after=timedelta(days=policy["hourly_days"]))
+    await refresh_daily_rollups(db, org_id, expire_after=timedelta(days=policy["daily_days"]))
+
+
+async def compact_all(db: AsyncIOMotorDatabase, since: Optional[datetime] = None, now: Optional[datetime] = None):
+    """Compact every organization with raw history recorded since the given time"""
+    query = {"timestamp": {"$gte": since}} if since else {}
+    org_ids = await db.request_history.distinct("org_id", query)
+    for org_id in org_ids:
+        try:
+            await compact_org(db, org_id, now)
+        except Exception as e:
+            logger.error(f"History compaction failed for {org_id}: {e}")
+
+
+async def compaction_loop(db: AsyncIOMotorDatabase, lease=None, interval: int = COMPACTION_INTERVAL_SECONDS):
+    """Periodically compact raw history in the background (only on the lease holder, if given)"""
+    last_run = None
+    while True:
+        try:
+            if lease is not None and not await lease.acquire():
+                await asyncio.sleep(min(interval, lease.ttl / 2))
+                continue
+            started = datetime.now(timezone.utc)
+            # Look back two hours so the hour that just closed is always picked up
+            since = last_run - timedelta(hours=2) if last_run else None
+            await compact_all(db, since)
+            last_run = started
+        except Exception as e:
+            logger.error(f"History compaction error: {e}")
+        await asyncio.sleep(interval)
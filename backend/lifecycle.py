@@ -0,0 +1,145 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Awaitable, Dict, Optional
+import asyncio
+import math
+import os
+import socket
+import time
+import uuid
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+DRAIN_TIMEOUT_SECONDS = int(os.environ.get("DRAIN_TIMEOUT", "30"))
+MAX_AUTO_WORKERS = int(os.environ.get("MAX_WORKERS", "8"))
+LEASE_TTL_SECONDS = int(os.environ.get("LEADER_LEASE_TTL", "30"))
+# Serve (and pass liveness) immediately and warm up in the background; readiness waits for the warm-up
+FAST_STARTUP = os.environ.get("FAST_STARTUP", "false").lower() in ["1", "true", "yes"]
+
+
+def available_cpus() -> int:
+    """CPUs this process may actually use, honoring affinity and cgroup v2 quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    cpu_max = Path("/sys/fs/cgroup/cpu.max")
+    if cpu_max.exists():
+        quota, _, period = cpu_max.read_text().strip().partition(" ")
+        if quota != "max" and period:
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    return max(1, cpus)
+
+
+def worker_count() -> int:
+    """Number of server workers: WEB_CONCURRENCY if set, else one per usable CPU"""
+    configured = os.environ.get("WEB_CONCURRENCY")
+    if configured:
+        return max(1, int(configured))
+    return min(available_cpus(), MAX_AUTO_WORKERS)
+
+
+class InFlightTracker:
+    """Counts in-flight upstream calls so shutdown can wait for them to finish.
+
+    Lifespan shutdown only starts after uvicorn has stopped accepting connections and
+    drained HTTP requests (bounded by timeout_graceful_shutdown), so by then this mostly
+    waits for background work such as monitor runs; nothing new arrives to refuse.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @asynccontextmanager
+    async def track(self):
+        self.count += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.count -= 1
+            if self.count == 0:
+                self._idle.set()
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT_SECONDS) -> bool:
+        """Wait for in-flight calls; returns False on timeout"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class Readiness:
+    """Startup warm-up progress for the readiness probe: ready once every step has run"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.steps: Dict[str, float] = {}  # step -> ms it took
+        self.ready = False
+        self.error: Optional[str] = None
+
+    async def step(self, name: str, awaitable: Awaitable):
+        started = time.monotonic()
+        try:
+            return await awaitable
+        except Exception as e:
+            self.error = f"{name}: {e}"
+            raise
+        finally:
+            self.steps[name] = round((time.monotonic() - started) * 1000, 1)
+
+    def finish(self):
+        self.ready = True
+        self.steps["total"] = round((time.monotonic() - self.started) * 1000, 1)
+
+    def status(self) -> dict:
+        return {"ready": self.ready, "error": self.error, "steps_ms": self.steps}
+
+
+class LeaderLease:
+    """Mongo-backed lease so that only one worker across all nodes runs a singleton job.
+
+    Holders renew by calling acquire() well within the TTL; if a holder dies its
+    lease expires and the next caller takes over.
+    """
+
+    # Collections whose unique name index is known to exist in this process
+    _indexed = set()
+
+    def __init__(self, db: AsyncIOMotorDatabase, name: str, ttl: int = LEASE_TTL_SECONDS):
+        self.collection = db.leader_leases
+        self.name = name
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("name", unique=True)
+        LeaderLease._indexed.add(self.collection.full_name)
+
+    async def acquire(self) -> bool:
+        """Take or renew the lease; returns True while this worker is the leader"""
+        # Without the unique index, concurrent upserts on a fresh database could create
+        # two lease documents (and two leaders), so it must exist before the first upsert
+        if self.collection.full_name not in LeaderLease._indexed:
+            await self.ensure_indexes()
+        now = datetime.now(timezone.utc)
+        try:
+            lease = await self.collection.find_one_and_update(
+                {"name": self.name, "$or": [{"holder": self.holder}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"holder": self.holder, "expires_at": now + timedelta(seconds=self.ttl)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Someone else holds an unexpired lease, so the upsert collided
+            return False
+        return lease is not None and lease.get("holder") == self.holder
+
+    async def release(self):
+        await self.collection.delete_one({"name": self.name, "holder": self.holder})
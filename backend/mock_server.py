@@ -0,0 +1,348 @@
+"""Mock server: serves the example responses saved on requests, without touching Mongo per call.
+
+Routes live under the collection they belong to:
+    GET http://localhost:8001/<collection_id>/users/42
+
+Saved URLs are compiled into one route trie per collection. `{{var}}`, `:var` and
+`{var}` segments match any single segment, `*` matches the rest of the path, and
+static segments win over parameters. The tables are reloaded per collection when
+requests change ("mock_routes" channel on the shared event bus) and in full every
+MOCK_RELOAD_SECONDS as a safety net.
+
+The server is unauthenticated, so it listens on 127.0.0.1 unless MOCK_HOST says otherwise.
+
+Usage: python mock_server.py  (MONGO_URL, DB_NAME, MOCK_HOST, MOCK_PORT, MOCK_WORKERS from env)
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from events import create_event_bus
+
+logger = logging.getLogger(__name__)
+
+MOCK_RELOAD_SECONDS = float(os.environ.get("MOCK_RELOAD_SECONDS", "30"))
+HOST_VARIABLE = re.compile(r"^\{\{[^}]+\}\}")
+PARAM_SEGMENT = re.compile(r"^(\{\{[^}]+\}\}|:\w+|\{[^}]+\})$")
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-expose-headers", b"*"),
+]
+Headers = List[Tuple[bytes, bytes]]
+# Requests that carry a mock; must imply the mock_routes partial index filter
+MOCK_FILTER = {"collection_id": {"$type": "string"}, "mock_response": {"$type": "object"}}
+
+
+# ============= Route table =============
+
+@dataclass
+class MockRoute:
+    """A saved example response, encoded once at load time"""
+    request_id: str
+    status: int
+    headers: Headers
+    body: bytes
+    latency: float  # seconds
+    jitter: float  # seconds
+    error_rate: float
+    error_status: int
+
+
+@dataclass
+class RouteNode:
+    static: Dict[str, "RouteNode"] = field(default_factory=dict)
+    param: Optional["RouteNode"] = None
+    wildcard: Dict[str, MockRoute] = field(default_factory=dict)
+    routes: Dict[str, MockRoute] = field(default_factory=dict)  # method -> route
+
+
+def route_segments(url: str) -> List[str]:
+    """`{{baseUrl}}/users/:id?x=1` or `https://api.test/users/{{id}}` -> ["users", ":id"]"""
+    url = HOST_VARIABLE.sub("", url.strip())
+    if "://" in url:
+        path = urlsplit(url).path
+    else:
+        path = re.split(r"[?#]", url, 1)[0]
+        if not path.startswith("/") and "." in path.split("/", 1)[0]:
+            path = path.partition("/")[2]  # "api.test/users" has a host but no scheme
+    return [segment for segment in path.split("/") if segment]
+
+
+def _content_type(mock: dict, body: str) -> str:
+    if mock.get("content_type"):
+        return mock["content_type"]
+    try:
+        json.loads(body)
+        return "application/json"
+    except ValueError:
+        return "text/plain; charset=utf-8"
+
+
+def compile_route(doc: dict) -> MockRoute:
+    mock = doc["mock_response"]
+    body = (mock.get("body") or "").encode()
+    headers = [
+        (h["key"].lower().encode(), h["value"].encode())
+        for h in mock.get("headers") or [] if h.get("enabled", True) and h.get("key")
+    ]
+    if not any(name == b"content-type" for name, _ in headers):
+        headers.append((b"content-type", _content_type(mock, mock.get("body") or "").encode()))
+    headers = [h for h in headers if h[0] != b"content-length"] + [
+        (b"content-length", str(len(body)).encode()),
+        (b"x-mock-request-id", doc["request_id"].encode()),
+    ] + CORS_HEADERS
+    return MockRoute(
+        request_id=doc["request_id"],
+        status=mock.get("status", 200),
+        headers=headers,
+        body=body,
+        latency=(mock.get("latency_ms") or 0) / 1000,
+        jitter=(mock.get("latency_jitter_ms") or 0) / 1000,
+        error_rate=mock.get("error_rate") or 0,
+        error_status=mock.get("error_status", 500),
+    )
+
+
+def build_trie(docs: Iterable[dict]) -> RouteNode:
+    """Later documents win on duplicate method + pattern, so feed them oldest first"""
+    root = RouteNode()
+    for doc in docs:
+        node = root
+        segments = route_segments(doc["url"])
+        method = doc["method"].upper()
+        for i, segment in enumerate(segments):
+            if segment == "*" and i == len(segments) - 1:
+                node.wildcard[method] = compile_route(doc)
+                break
+            if PARAM_SEGMENT.match(segment):
+                node.param = node.param or RouteNode()
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, RouteNode())
+        else:
+            node.routes[method] = compile_route(doc)
+    return root
+
+
+def _pick(routes: Dict[str, MockRoute], method: str) -> Optional[MockRoute]:
+    route = routes.get(method)
+    if route is None and method == "HEAD":
+        route = routes.get("GET")
+    return route
+
+
+def match(node: RouteNode, segments: List[str], method: str, i: int = 0) -> Optional[MockRoute]:
+    """Static segments first, then parameters, then a trailing wildcard"""
+    if i == len(segments):
+        route = _pick(node.routes, method)
+        if route is not None:
+            return route
+    else:
+        child = node.static.get(segments[i])
+        if child is not None:
+            route = match(child, segments, method, i + 1)
+            if route is not None:
+                return route
+        if node.param is not None:
+            route = match(node.param, segments, method, i + 1)
+            if route is not None:
+                return route
+    return _pick(node.wildcard, method)
+
+
+class MockRouteTable:
+    """collection_id -> route trie, rebuilt from requests that carry an enabled mock_response"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.tries: Dict[str, RouteNode] = {}
+        self.route_count = 0
+        self.loaded_at: Optional[float] = None
+
+    async def ensure_indexes(self):
+        # Partial: only requests with a mock are indexed, so a reload reads just those
+        await self.db.requests.create_index(
+            [("collection_id", 1), ("updated_at", 1)],
+            name="mock_routes",
+            partialFilterExpression=MOCK_FILTER
+        )
+
+    async def _docs(self, query: dict) -> Dict[str, List[dict]]:
+        by_collection: Dict[str, List[dict]] = {}
+        cursor = self.db.requests.find(
+            {**query, **MOCK_FILTER, "mock_response.enabled": {"$ne": False}},
+            {"_id": 0, "request_id": 1, "collection_id": 1, "method": 1, "url": 1, "mock_response": 1}
+        ).sort("updated_at", 1)
+        async for doc in cursor:
+            by_collection.setdefault(doc["collection_id"], []).append(doc)
+        return by_collection
+
+    def _count(self):
+        self.route_count = sum(self._size(trie) for trie in self.tries.values())
+
+    def _size(self, node: RouteNode) -> int:
+        return len(node.routes) + len(node.wildcard) + sum(self._size(child) for child in node.static.values()) + (
+            self._size(node.param) if node.param else 0
+        )
+
+    async def load(self):
+        """Rebuild every collection's trie; the old tables keep serving until the swap"""
+        by_collection = await self._docs({})
+        self.tries = {collection_id: build_trie(docs) for collection_id, docs in by_collection.items()}
+        self._count()
+        self.loaded_at = time.monotonic()
+
+    async def refresh(self, collection_ids: Optional[List[str]] = None):
+        """Rebuild the given collections (all of them for None); subscribed to "mock_routes" """
+        if not collection_ids:
+            await self.load()
+            return
+        collection_ids = [c for c in set(collection_ids) if c]
+        by_collection = await self._docs({"collection_id": {"$in": collection_ids}})
+        for collection_id in collection_ids:
+            if collection_id in by_collection:
+                self.tries[collection_id] = build_trie(by_collection[collection_id])
+            else:
+                self.tries.pop(collection_id, None)
+        self._count()
+
+    def resolve(self, method: str, path: str) -> Optional[MockRoute]:
+        collection_id, _, rest = path.lstrip("/").partition("/")
+        trie = self.tries.get(collection_id)
+        if trie is None:
+            return None
+        return match(trie, [segment for segment in rest.split("/") if segment], method)
+
+
+# ============= ASGI app =============
+
+async def _send(send, status: int, headers: Headers, body: bytes):
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _json_response(status: int, payload: dict) -> Tuple[int, Headers, bytes]:
+    body = json.dumps(payload).encode()
+    return status, [
+        (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())
+    ] + CORS_HEADERS, body
+
+
+class MockApp:
+    """Bare ASGI app (no routing framework on the hot path) over a MockRouteTable"""
+
+    def __init__(self, db: Optional[AsyncIOMotorDatabase] = None):
+        self.db = db
+        self.client = None
+        self.bus = None
+        self.routes: Optional[MockRouteTable] = None
+        self.reload_task = None
+
+    async def startup(self):
+        if self.db is None:
+            self.client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+            self.db = self.client[os.environ["DB_NAME"]]
+        self.routes = MockRouteTable(self.db)
+        self.bus = create_event_bus(self.db)
+        self.bus.subscribe("mock_routes", self.routes.refresh)
+        await self.routes.ensure_indexes()
+        await self.routes.load()
+        await self.bus.start()
+        self.reload_task = asyncio.create_task(self._reload_loop())
+        logger.info(f"Mock server loaded {self.routes.route_count} routes")
+
+    async def shutdown(self):
+        if self.reload_task:
+            self.reload_task.cancel()
+        if self.bus:
+            await self.bus.stop()
+        if self.client:
+            self.client.close()
+
+    async def _reload_loop(self):
+        while True:
+            await asyncio.sleep(MOCK_RELOAD_SECONDS)
+            try:
+                await self.routes.load()
+            except Exception as e:
+                logger.error(f"Mock route reload failed: {e}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        method, path = scope["method"], scope["path"]
+        if path == "/_health":
+            await _send(send, *_json_response(200, {"routes": self.routes.route_count, "collections": len(self.routes.tries)}))
+            return
+        if method == "OPTIONS":
+            requested = dict(scope["headers"]).get(b"access-control-request-headers", b"*")
+            await _send(send, 204, CORS_HEADERS + [
+                (b"access-control-allow-methods", b"GET, POST, PUT, PATCH, DELETE, HEAD, OPTIONS"),
+                (b"access-control-allow-headers", requested),
+                (b"access-control-max-age", b"600"),
+            ], b"")
+            return
+
+        route = self.routes.resolve(method, path)
+        if route is None:
+            await _send(send, *_json_response(404, {"detail": f"No mock for {method} {path}"}))
+            return
+
+        if route.latency or route.jitter:
+            await asyncio.sleep(route.latency + random.uniform(0, route.jitter))
+        if route.error_rate and random.random() < route.error_rate:
+            status, headers, body = _json_response(route.error_status, {"detail": "Injected mock error"})
+            await _send(send, status, headers + [(b"x-mock-request-id", route.request_id.encode())], body)
+            return
+        await _send(send, route.status, route.headers, b"" if method == "HEAD" else route.body)
+
+
+app = MockApp()
+
+
+def main():
+    import uvicorn
+    from dotenv import load_dotenv
+    from pathlib import Path
+
+    load_dotenv(Path(__file__).parent / ".env")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    workers = int(os.environ.get("MOCK_WORKERS", "1"))
+    uvicorn.run(
+        "mock_server:app",
+        host=os.environ.get("MOCK_HOST", "127.0.0.1"),
+        port=int(os.environ.get("MOCK_PORT", "8001")),
+        workers=workers,
+        access_log=False,  # per-request logging would dominate the serving cost
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -49,6 +49,20 @@ class SsoAllowlistUpdate(BaseModel):
     emails: List[str] = []
 
 
+# Execution Policy Models
+# Unset fields inherit: execute override > saved request > collection > server defaults
+class ExecutionPolicy(BaseModel):
+    connect_timeout: Optional[float] = Field(None, gt=0, le=60)  # seconds
+    read_timeout: Optional[float] = Field(None, gt=0, le=300)  # seconds
+    retries: Optional[int] = Field(None, ge=0, le=5)  # Only applied to idempotent methods by default
+    backoff_base_ms: Optional[int] = Field(None, ge=0, le=10000)
+    backoff_max_ms: Optional[int] = Field(None, ge=0, le=60000)
+    retry_on_status: Optional[List[int]] = None
+    retry_non_idempotent: Optional[bool] = None
+    circuit_breaker: Optional[bool] = None
+    circuit_breaker_on_5xx: Optional[bool] = None  # Count 5xx responses as breaker failures
+
+
 # Collection Models
 class Collection(BaseModel):
     collection_id: str
@@ -61,6 +75,7 @@ class Collection(BaseModel):
     pre_request_script: Optional[str] = None
     post_request_script: Optional[str] = None
     folders: Optional[List[str]] = []
+    execution_policy: Optional[ExecutionPolicy] = None
 
 
 class CollectionCreate(BaseModel):
@@ -70,6 +85,7 @@ class CollectionCreate(BaseModel):
     pre_request_script: Optional[str] = None
     post_request_script: Optional[str] = None
     folders: Optional[List[str]] = []
+    execution_policy: Optional[ExecutionPolicy] = None
 
 
 class CollectionUpdate(BaseModel):
@@ -79,6 +95,7 @@ class CollectionUpdate(BaseModel):
     pre_request_script: Optional[str] = None
     post_request_script: Optional[str] = None
     folders: Optional[List[str]] = None
+    execution_policy: Optional[ExecutionPolicy] = None
 
 
 # Request Models
@@ -88,9 +105,48 @@ class KeyValue(BaseModel):
     enabled: bool = True
 
 
+class MultipartPart(BaseModel):
+    key: str
+    type: str = "text"  # "text", "file"
+    value: str = ""
+    blob_id: Optional[str] = None  # file parts reference an uploaded blob
+    filename: Optional[str] = None
+    content_type: Optional[str] = None
+    enabled: bool = True
+
+
 class RequestBody(BaseModel):
-    type: str  # "none", "json", "form", "raw"
+    type: str  # "none", "json", "form", "raw", "binary", "multipart"
     content: str = ""
+    blob_id: Optional[str] = None  # binary bodies
+    filename: Optional[str] = None
+    parts: Optional[List[MultipartPart]] = None  # multipart bodies
+
+
+# Example response the mock server returns for a saved request
+class MockResponse(BaseModel):
+    enabled: bool = True
+    status: int = Field(200, ge=100, le=599)
+    headers: List[KeyValue] = []
+    body: str = ""
+    content_type: Optional[str] = None  # Guessed from the body when unset
+    latency_ms: int = Field(0, ge=0, le=60000)
+    latency_jitter_ms: int = Field(0, ge=0, le=60000)
+    error_rate: float = Field(0, ge=0, le=1)  # Fraction of calls answered with error_status
+    error_status: int = Field(500, ge=100, le=599)
+
+
+# Uploaded request body files, stored out of line
+class Blob(BaseModel):
+    blob_id: str
+    org_id: str
+    sha256: str
+    size: int
+    filename: Optional[str] = None
+    content_type: str
+    created_by: str
+    created_at: datetime
+    expires_at: Optional[datetime] = None
 
 
 class RequestAuth(BaseModel):
@@ -114,6 +170,8 @@ class Request(BaseModel):
     body: RequestBody
     auth: RequestAuth
     folder_path: Optional[List[str]] = []
+    execution_policy: Optional[ExecutionPolicy] = None
+    mock_response: Optional[MockResponse] = None
     created_by: str
     created_at: datetime
     updated_at: datetime
@@ -129,6 +187,8 @@ class RequestCreate(BaseModel):
     body: RequestBody = RequestBody(type="none", content="")
     auth: RequestAuth = RequestAuth(type="none")
     folder_path: Optional[List[str]] = []
+    execution_policy: Optional[ExecutionPolicy] = None
+    mock_response: Optional[MockResponse] = None
 
 
 class RequestUpdate(BaseModel):
@@ -141,6 +201,41 @@ class RequestUpdate(BaseModel):
     body: Optional[RequestBody] = None
     auth: Optional[RequestAuth] = None
     folder_path: Optional[List[str]] = None
+    execution_policy: Optional[ExecutionPolicy] = None
+    mock_response: Optional[MockResponse] = None
+
+
+class BulkRequestOperation(BaseModel):
+    action: str  # "move", "copy", "delete", "update"
+    request_ids: List[str] = []
+    # Alternatively select a whole folder (and its subfolders)
+    source_collection_id: Optional[str] = None
+    source_folder_path: Optional[List[str]] = None
+    # move/copy destination; a selected folder is placed inside folder_path
+    collection_id: Optional[str] = None
+    folder_path: Optional[List[str]] = None
+    fields: Optional[RequestUpdate] = None  # update
+
+
+class BulkItemResult(BaseModel):
+    request_id: str
+    status: str  # "ok", "not_found", "forbidden", "error"
+    detail: Optional[str] = None
+    new_request_id: Optional[str] = None  # copy
+
+
+class BulkResult(BaseModel):
+    action: str
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+class ResponseFilter(BaseModel):
+    type: str = "jq"  # "jq" or "jsonpath"
+    expression: str  # e.g. ".items[:20] | map({id, name})" or "$.items[0:20]"
+    fields: Optional[List[str]] = None  # keep only these keys (dotted paths allowed) of each result object
+    limit: Optional[int] = None  # max array items / jq outputs returned; jq also stops at JQ_TIMEOUT_SECONDS and JQ_MAX_OUTPUT_BYTES
 
 
 class RequestExecute(BaseModel):
@@ -150,6 +245,13 @@ class RequestExecute(BaseModel):
     params: List[KeyValue] = []
     body: RequestBody = RequestBody(type="none", content="")
     auth: RequestAuth = RequestAuth(type="none")
+    org_id: Optional[str] = None  # When set, the execution is recorded in org history
+    request_id: Optional[str] = None
+    policy: Optional[ExecutionPolicy] = None  # Overrides the saved request/collection policy
+    env_id: Optional[str] = None  # Selects the snapshot baseline
+    snapshot: Optional[str] = None  # "compare" or "save"; needs org_id and request_id
+    filter: Optional[ResponseFilter] = None  # Applied to JSON responses before they are returned
+    har_capture_id: Optional[str] = None  # Appends a HAR entry to this capture; needs org_id
 
 
 # History Models
@@ -163,6 +265,47 @@ class History(BaseModel):
     status: int
     time: int  # milliseconds
     timestamp: datetime
+    size: Optional[int] = None  # bytes
+    body_hash: Optional[str] = None  # Set when the response body was stored
+    monitor_id: Optional[str] = None  # Set for entries recorded by a monitor run
+    passed: Optional[bool] = None  # Monitor assertion outcome
+
+
+class HistoryRetention(BaseModel):
+    org_id: str
+    raw_days: int
+    hourly_days: int
+    daily_days: int
+    store_bodies: bool
+    max_body_bytes: int
+
+
+class HistoryRetentionUpdate(BaseModel):
+    raw_days: Optional[int] = Field(None, ge=1, le=365)
+    hourly_days: Optional[int] = Field(None, ge=1, le=3650)
+    daily_days: Optional[int] = Field(None, ge=1, le=3650)
+    store_bodies: Optional[bool] = None
+    max_body_bytes: Optional[int] = Field(None, ge=0, le=50 * 1024 * 1024)
+
+
+# Rate Limit Models
+class RateLimits(BaseModel):
+    user_rate: float  # requests per second per user
+    user_burst: int
+    org_rate: float  # requests per second per organization
+    org_burst: int
+    org_concurrency: int  # in-flight upstream requests per organization
+    host_concurrency: int  # in-flight upstream requests per target host, for this organization
+
+
+class RateLimitsUpdate(BaseModel):
+    # Values above the server's EXECUTE_MAX_* ceilings are capped when stored
+    user_rate: Optional[float] = Field(None, gt=0)
+    user_burst: Optional[int] = Field(None, ge=1)
+    org_rate: Optional[float] = Field(None, gt=0)
+    org_burst: Optional[int] = Field(None, ge=1)
+    org_concurrency: Optional[int] = Field(None, ge=1)
+    host_concurrency: Optional[int] = Field(None, ge=1)
 
 
 # Environment Models
@@ -191,6 +334,168 @@ class EnvironmentUpdate(BaseModel):
     variables: Optional[List[EnvironmentVariable]] = None
 
 
+# Monitor Models
+class MonitorAssertion(BaseModel):
+    type: str  # "status", "latency", or "body"
+    operator: str = "eq"  # "eq", "ne", "lt", "lte", "gt", "gte", "in", "contains", "exists"
+    value: Optional[Any] = None
+    path: Optional[str] = None  # Path into a JSON body, e.g. "data.items[0].id"
+
+
+class Monitor(BaseModel):
+    monitor_id: str
+    org_id: str
+    name: str
+    target_type: str  # "request" or "collection"
+    target_id: str
+    env_id: Optional[str] = None
+    interval_seconds: Optional[int] = None
+    cron: Optional[str] = None  # 5-field cron expression, UTC
+    assertions: List[MonitorAssertion] = []
+    enabled: bool = True
+    next_run_at: Optional[datetime] = None
+    last_run_at: Optional[datetime] = None
+    last_status: Optional[str] = None  # "passed", "failed" or "missing_target"
+    last_result: Optional[Dict[str, Any]] = None
+    created_by: str
+    created_at: datetime
+
+
+class MonitorCreate(BaseModel):
+    name: str
+    target_type: str = "request"
+    target_id: str
+    env_id: Optional[str] = None
+    interval_seconds: Optional[int] = None
+    cron: Optional[str] = None
+    assertions: List[MonitorAssertion] = []
+    enabled: bool = True
+
+
+class MonitorUpdate(BaseModel):
+    name: Optional[str] = None
+    env_id: Optional[str] = None
+    interval_seconds: Optional[int] = None
+    cron: Optional[str] = None
+    assertions: Optional[List[MonitorAssertion]] = None
+    enabled: Optional[bool] = None
+
+
+# Workflow Models
+class WorkflowExtract(BaseModel):
+    variable: str  # Variable name made available to later steps as {{variable}}
+    source: str = "body"  # "body", "header", or "status"
+    path: Optional[str] = None  # JSON path for body, header name for header
+
+
+class WorkflowStep(BaseModel):
+    step_id: str
+    request_id: str
+    depends_on: List[str] = []
+    extract: List[WorkflowExtract] = []
+    retries: int = 0  # Transport errors and 5xx only; idempotent methods unless retry_non_idempotent
+    retry_non_idempotent: bool = False
+    timeout_seconds: Optional[float] = Field(None, gt=0, le=300)  # Unset: the request's execution policy
+
+
+class Workflow(BaseModel):
+    workflow_id: str
+    org_id: str
+    name: str
+    env_id: Optional[str] = None
+    steps: List[WorkflowStep] = []
+    created_by: str
+    created_at: datetime
+    updated_at: datetime
+
+
+class WorkflowCreate(BaseModel):
+    name: str
+    env_id: Optional[str] = None
+    steps: List[WorkflowStep] = []
+
+
+class WorkflowUpdate(BaseModel):
+    name: Optional[str] = None
+    env_id: Optional[str] = None
+    steps: Optional[List[WorkflowStep]] = None
+
+
+class WorkflowRun(BaseModel):
+    env_id: Optional[str] = None  # Overrides the workflow's environment
+    variables: Dict[str, str] = {}
+
+
+# Snapshot Models
+class ResponseSnapshot(BaseModel):
+    snapshot_id: str
+    org_id: str
+    request_id: str
+    env_id: Optional[str] = None
+    status: int
+    content_type: Optional[str] = None
+    body_hash: str
+    size: int
+    ignore_paths: List[str] = []
+    created_at: datetime
+    updated_at: datetime
+    updated_by: str
+
+
+class SnapshotSettings(BaseModel):
+    env_id: Optional[str] = None
+    ignore_paths: List[str]  # e.g. "$.meta.timestamp", "$.items[*].id", "**.updated_at"
+
+
+class CollectionRun(BaseModel):
+    env_id: Optional[str] = None
+    variables: Dict[str, str] = {}
+    update_snapshots: bool = False  # Accept this run's responses as the new baselines
+    capture_har: bool = False  # Record the run into a new HAR capture
+
+
+# HAR Models
+class HarCapture(BaseModel):
+    capture_id: str
+    org_id: str
+    name: str
+    source: str  # "execute", "collection_run" or "import"
+    entry_count: int
+    size: int  # uncompressed bytes
+    created_by: str
+    created_at: datetime
+    updated_at: datetime
+
+
+class HarCaptureCreate(BaseModel):
+    name: Optional[str] = None
+
+
+class HarImport(BaseModel):
+    name: Optional[str] = None
+    har: Dict[str, Any]
+
+
+class HarReplay(BaseModel):
+    timing: str = "original"  # "original" keeps the recorded gaps, "none" sends as fast as concurrency allows
+    speed: float = Field(1.0, gt=0, le=100)  # Divides the recorded gaps
+    concurrency: int = Field(10, ge=1, le=50)
+    timeout: float = Field(30, gt=0, le=300)  # seconds per request
+
+
+# Revision Models
+class Revision(BaseModel):
+    revision_id: str
+    version: int
+    action: str  # "create", "update", "move" (bulk), "restore" or "baseline" (first edit after tracking began)
+    restored_from: Optional[int] = None
+    changed: List[str]  # top-level fields that differ from the previous version
+    author: Optional[str] = None
+    created_at: datetime
+    stored: str  # "snapshot" or "delta"
+    stored_bytes: int
+
+
 # Collection Script Models
 class CollectionScripts(BaseModel):
     pre_request: Optional[str] = None  # JavaScript code to run before requests
@@ -0,0 +1,342 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+import asyncio
+import logging
+import os
+import random
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from blobs import BlobStore
+from executor import environment_variables, resolve_request, extract_path, error_summary, response_summary
+from history_store import record_history
+from lifecycle import LeaderLease
+from policies import BreakerRegistry, saved_request_policies, send_with_policy
+from rate_limit import ExecuteLimiter
+
+logger = logging.getLogger(__name__)
+
+MONITOR_WORKERS = int(os.environ.get("MONITOR_WORKERS", "8"))
+MONITOR_TIMEOUT_SECONDS = int(os.environ.get("MONITOR_TIMEOUT", "30"))
+MIN_INTERVAL_SECONDS = 30
+TICK_SECONDS = 2
+MAX_JITTER_SECONDS = 30
+
+
+# ============= Schedules =============
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day-of-month month day-of-week), UTC"""
+
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError("Cron expression must have 5 fields")
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays}  # 0 and 7 are both Sunday
+        self.days_restricted = fields[2] != "*"
+        self.weekdays_restricted = fields[4] != "*"
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> set:
+        values = set()
+        for part in field.split(","):
+            spec, _, step = part.partition("/")
+            step = int(step) if step else 1
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(v) for v in spec.split("-", 1))
+            else:
+                start = int(spec)
+                end = high if step > 1 else start
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f"Invalid cron field: {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays  # cron: 0 = Sunday
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError("Cron expression never matches")
+
+
+def validate_schedule(interval_seconds: Optional[int], cron: Optional[str]):
+    """Raise 400 unless exactly one valid schedule is given"""
+    if bool(interval_seconds) == bool(cron):
+        raise HTTPException(status_code=400, detail="Provide either interval_seconds or cron")
+    if interval_seconds and interval_seconds < MIN_INTERVAL_SECONDS:
+        raise HTTPException(status_code=400, detail=f"interval_seconds must be at least {MIN_INTERVAL_SECONDS}")
+    if cron:
+        try:
+            # Parsing alone accepts schedules that can never fire, e.g. "0 0 31 2 *"
+            CronSchedule(cron).next_after(datetime.now(timezone.utc))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+def next_run_at(monitor: dict, after: Optional[datetime] = None) -> datetime:
+    """Next due time for a monitor, with jitter so monitors sharing a schedule spread out"""
+    after = after or datetime.now(timezone.utc)
+    if monitor.get("cron"):
+        due = CronSchedule(monitor["cron"]).next_after(after)
+        spread = MAX_JITTER_SECONDS
+    else:
+        interval = monitor["interval_seconds"]
+        due = after + timedelta(seconds=interval)
+        spread = min(interval * 0.1, MAX_JITTER_SECONDS)
+    return due + timedelta(seconds=random.uniform(0, spread))
+
+
+# ============= Assertions =============
+
+_COMPARATORS = {
+    "eq": lambda actual, expected: actual == expected,
+    "ne": lambda actual, expected: actual != expected,
+    "lt": lambda actual, expected: actual is not None and actual < expected,
+    "lte": lambda actual, expected: actual is not None and actual <= expected,
+    "gt": lambda actual, expected: actual is not None and actual > expected,
+    "gte": lambda actual, expected: actual is not None and actual >= expected,
+    "in": lambda actual, expected: actual in (expected or []),
+    "contains": lambda actual, expected: actual is not None and str(expected) in (
+        actual if isinstance(actual, str) else str(actual)
+    ),
+}
+
+
+def evaluate_assertion(assertion: dict, result: dict) -> dict:
+    """Check one assertion against an execute result"""
+    kind = assertion.get("type")
+    operator = assertion.get("operator", "eq")
+    expected = assertion.get("value")
+
+    if kind == "status":
+        actual = result["status"]
+    elif kind == "latency":
+        actual = result["time"]
+    elif kind == "body":
+        try:
+            actual = extract_path(result["body"], assertion["path"]) if assertion.get("path") else result["body"]
+        except (KeyError, IndexError):
+            return {**assertion, "passed": operator == "exists" and expected is False, "actual": None}
+    else:
+        return {**assertion, "passed": False, "actual": None, "message": f"Unknown assertion type: {kind}"}
+
+    if operator == "exists":
+        passed = expected is not False
+    elif operator in _COMPARATORS:
+        try:
+            passed = bool(_COMPARATORS[operator](actual, expected))
+        except TypeError:
+            passed = False
+    else:
+        return {**assertion, "passed": False, "actual": None, "message": f"Unknown operator: {operator}"}
+
+    # Keep stored results small: don't echo large bodies back
+    shown = actual if isinstance(actual, (int, float, bool)) or actual is None else str(actual)[:200]
+    return {**assertion, "passed": passed, "actual": shown}
+
+
+# ============= Running =============
+
+async def monitor_targets(db: AsyncIOMotorDatabase, monitor: dict) -> List[dict]:
+    """Saved requests a monitor runs, in stable order"""
+    if monitor["target_type"] == "collection":
+        return await db.requests.find(
+            {"collection_id": monitor["target_id"], "org_id": monitor["org_id"]},
+            {"_id": 0}
+        ).sort([("folder_path", 1), ("name", 1)]).to_list(length=None)
+    request_doc = await db.requests.find_one(
+        {"request_id": monitor["target_id"], "org_id": monitor["org_id"]},
+        {"_id": 0}
+    )
+    return [request_doc] if request_doc else []
+
+
+async def run_monitor(
+    db: AsyncIOMotorDatabase,
+    session,
+    monitor: dict,
+    pool: Optional[Executor] = None,
+    blob_store: Optional[BlobStore] = None,
+    breakers: Optional[BreakerRegistry] = None,
+    limiter: Optional[ExecuteLimiter] = None,
+    user_id: Optional[str] = None
+) -> dict:
+    """Run a monitor once, record each call in history and store the outcome on the monitor.
+
+    Calls count against `user_id`'s execute quotas (the monitor's creator by default).
+    """
+    user_id = user_id or monitor["created_by"]
+    variables = {}
+    if monitor.get("env_id"):
+        environment = await db.environments.find_one(
+            {"env_id": monitor["env_id"], "org_id": monitor["org_id"]},
+            {"_id": 0, "variables": 1}
+        )
+        variables = environment_variables(environment)
+
+    started_at = datetime.now(timezone.utc)
+    runs = []
+    targets = await monitor_targets(db, monitor)
+    # MONITOR_TIMEOUT is the monitor default; collection and request policies still apply on top
+    policies = await saved_request_policies(db, targets, base={"read_timeout": MONITOR_TIMEOUT_SECONDS})
+    breakers = breakers or BreakerRegistry()
+    for request_doc in targets:
+        spec = resolve_request(request_doc, variables)
+        try:
+            open_blob = await blob_store.opener_for(monitor["org_id"], spec["body"]) if blob_store else None
+            async with limiter.guard(user_id, monitor["org_id"], spec["url"]) if limiter else nullcontext():
+                response, elapsed_time, _ = await send_with_policy(
+                    session, spec, policies[request_doc["request_id"]], breakers, open_blob,
+                    pool=pool, org_id=monitor["org_id"]
+                )
+            result = response_summary(response, elapsed_time)
+            content = response.content
+        except Exception as e:
+            result, content = error_summary(e), None
+
+        checks = [evaluate_assertion(a, result) for a in monitor.get("assertions", [])]
+        passed = all(check["passed"] for check in checks) and result["status"] != 0
+        runs.append({
+            "request_id": request_doc["request_id"],
+            "name": request_doc.get("name"),
+            "status": result["status"],
+            "time": result["time"],
+            "passed": passed,
+            "assertions": checks
+        })
+        await record_history(
+            db, monitor["org_id"], monitor["created_by"], spec["method"], spec["url"],
+            result["status"], result["time"], request_id=request_doc["request_id"],
+            body=content, size=len(content) if content is not None else None,
+            extra={"monitor_id": monitor["monitor_id"], "passed": passed}
+        )
+
+    outcome = {
+        "started_at": started_at,
+        "finished_at": datetime.now(timezone.utc),
+        "passed": bool(runs) and all(run["passed"] for run in runs),
+        "requests": runs
+    }
+    await db.monitors.update_one(
+        {"monitor_id": monitor["monitor_id"]},
+        {"$set": {
+            "last_run_at": started_at,
+            "last_status": "passed" if outcome["passed"] else ("failed" if runs else "missing_target"),
+            "last_result": outcome
+        }}
+    )
+    return outcome
+
+
+class MonitorScheduler:
+    """Claims due monitors on the leader instance and runs them on a bounded worker pool.
+
+    Upstream calls go through the execution scheduler's lowest priority lane (or,
+    without one, a dedicated thread pool) so a large monitor sweep never delays
+    interactive sends or competes with API requests for the default threadpool.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, get_session, tracker, blob_store: Optional[BlobStore] = None, workers: int = MONITOR_WORKERS, dispatcher=None, breakers: Optional[BreakerRegistry] = None, limiter: Optional[ExecuteLimiter] = None):
+        self.db = db
+        self.breakers = breakers
+        self.limiter = limiter
+        self.dispatcher = dispatcher  # ExecutionScheduler; monitor calls queue behind interactive ones
+        self.get_session = get_session
+        self.tracker = tracker
+        self.blob_store = blob_store
+        self.workers = workers
+        self.lease = LeaderLease(db, "monitor-scheduler")
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 4)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="monitor")
+        self.tasks: List[asyncio.Task] = []
+
+    async def ensure_indexes(self):
+        await self.lease.ensure_indexes()
+        await self.db.monitors.create_index("monitor_id", unique=True)
+        await self.db.monitors.create_index([("enabled", 1), ("next_run_at", 1)])
+        await self.db.monitors.create_index("org_id")
+        await self.db.request_history.create_index([("monitor_id", 1), ("timestamp", -1)], sparse=True)
+
+    async def start(self):
+        self.tasks = [asyncio.create_task(self._schedule_loop())]
+        self.tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+        try:
+            await self.lease.release()
+        except Exception:
+            pass
+        self.pool.shutdown(wait=False)
+
+    async def _schedule_loop(self):
+        while True:
+            try:
+                if await self.lease.acquire():
+                    await self._claim_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Monitor scheduling error: {e}")
+            await asyncio.sleep(TICK_SECONDS)
+
+    async def _claim_due(self):
+        now = datetime.now(timezone.utc)
+        free = self.queue.maxsize - self.queue.qsize()
+        if free <= 0:
+            return
+        due = await self.db.monitors.find(
+            {"enabled": True, "next_run_at": {"$lte": now}},
+            {"_id": 0}
+        ).sort("next_run_at", 1).limit(free).to_list(free)
+        for monitor in due:
+            claimed = await self.db.monitors.update_one(
+                {"monitor_id": monitor["monitor_id"], "next_run_at": monitor["next_run_at"]},
+                {"$set": {"next_run_at": next_run_at(monitor, now)}}
+            )
+            if claimed.modified_count:
+                self.queue.put_nowait(monitor)
+
+    async def _worker(self):
+        while True:
+            monitor = await self.queue.get()
+            try:
+                async with self.tracker.track():
+                    pool = self.dispatcher.lane("monitor", monitor["org_id"]) if self.dispatcher else self.pool
+                    await run_monitor(
+                        self.db, self.get_session(), monitor, pool, self.blob_store, self.breakers, self.limiter
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Monitor {monitor.get('monitor_id')} failed: {e}")
+            finally:
+                self.queue.task_done()
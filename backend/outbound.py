@@ -0,0 +1,325 @@
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, List, Optional, Tuple
+import ipaddress
+import os
+import socket
+import ssl
+import threading
+import time
+import certifi
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from dispatch import OUTBOUND_WORKERS
+
+try:
+    import dns.exception
+    import dns.resolver
+except ImportError:  # pragma: no cover - falls back to getaddrinfo with a fixed TTL
+    dns = None
+
+POOL_CONNECTIONS = int(os.environ.get("OUTBOUND_POOL_HOSTS", "100"))
+# One keep-alive connection per outbound worker, so a busy host never drops connections back to handshakes
+POOL_MAXSIZE = int(os.environ.get("OUTBOUND_POOL_SIZE", str(OUTBOUND_WORKERS)))
+DNS_MIN_TTL = float(os.environ.get("DNS_CACHE_MIN_TTL", "5"))
+DNS_MAX_TTL = float(os.environ.get("DNS_CACHE_MAX_TTL", "300"))
+DNS_FALLBACK_TTL = 30.0  # getaddrinfo results (hosts file, no resolver) carry no TTL
+DNS_NEGATIVE_TTL = float(os.environ.get("DNS_CACHE_NEGATIVE_TTL", "10"))
+TLS_SESSION_CACHE_SIZE = 1024
+
+
+# ============= DNS =============
+
+def _hosts_file(path: str = "/etc/hosts") -> Dict[str, List[str]]:
+    """Static host entries, which take precedence over DNS as they do for the system resolver"""
+    hosts: Dict[str, List[str]] = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                fields = line.split("#", 1)[0].split()
+                for name in fields[1:]:
+                    hosts.setdefault(name.lower(), []).append(fields[0])
+    except OSError:
+        pass
+    return hosts
+
+
+class DnsCache:
+    """Thread-safe hostname -> addresses cache honoring record TTLs, with a negative cache.
+
+    Lookups run on the outbound worker threads (never the event loop); concurrent
+    misses for one host share a single lookup.
+    """
+
+    def __init__(self, min_ttl: float = DNS_MIN_TTL, max_ttl: float = DNS_MAX_TTL, negative_ttl: float = DNS_NEGATIVE_TTL):
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.entries: Dict[str, Tuple[float, List[str], Optional[str]]] = {}  # host -> (expires, addresses, error)
+        self.lock = threading.Lock()
+        self.host_locks: Dict[str, threading.Lock] = {}
+        self.hosts = _hosts_file()
+        self.resolver = None
+        if dns is not None:
+            try:
+                self.resolver = dns.resolver.Resolver()
+                self.resolver.lifetime = 5.0
+            except dns.exception.DNSException:
+                pass  # no resolv.conf; getaddrinfo only
+
+    def _lookup(self, host: str) -> Tuple[List[str], float]:
+        """(addresses, ttl); raises socket.gaierror"""
+        if host.lower() in self.hosts:
+            return self.hosts[host.lower()], DNS_FALLBACK_TTL
+        if self.resolver is not None:
+            addresses, ttls = [], []
+            for record_type in ("A", "AAAA"):
+                try:
+                    answer = self.resolver.resolve(host, record_type, search=True)
+                except dns.resolver.NXDOMAIN:
+                    break
+                except dns.exception.DNSException:
+                    continue
+                addresses += [record.address for record in answer]
+                ttls.append(answer.rrset.ttl)
+            if addresses:
+                return addresses, min(self.max_ttl, max(self.min_ttl, min(ttls)))
+        # Hosts file entries, container aliases, or no resolver configuration
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+        return list(dict.fromkeys(info[4][0] for info in infos)), DNS_FALLBACK_TTL
+
+    def resolve(self, host: str) -> Tuple[List[str], bool]:
+        """(addresses, from_cache); raises socket.gaierror, also for cached failures"""
+        entry = self.entries.get(host)
+        if entry is None or entry[0] <= time.monotonic():
+            with self.lock:
+                host_lock = self.host_locks.setdefault(host, threading.Lock())
+            with host_lock:
+                entry = self.entries.get(host)
+                if entry is None or entry[0] <= time.monotonic():
+                    try:
+                        addresses, ttl = self._lookup(host)
+                        entry = (time.monotonic() + ttl, addresses, None)
+                    except socket.gaierror as e:
+                        entry = (time.monotonic() + self.negative_ttl, [], str(e))
+                    self.entries[host] = entry
+                    return self._result(entry, False)
+        return self._result(entry, True)
+
+    def _result(self, entry, cached: bool) -> Tuple[List[str], bool]:
+        if entry[2] is not None:
+            raise socket.gaierror(socket.EAI_NONAME, entry[2])
+        return entry[1], cached
+
+    def forget(self, host: str):
+        self.entries.pop(host, None)
+
+
+# ============= TLS =============
+
+class ResumingSSLContext(ssl.SSLContext):
+    """Client context that offers the last session seen for a host:port, so repeat
+    connections skip the full handshake. Settings match urllib3's defaults except
+    that session tickets stay enabled."""
+
+    def __new__(cls):
+        context = super().__new__(cls, ssl.PROTOCOL_TLS_CLIENT)
+        context.minimum_version = ssl.TLSVersion.TLSv1_2
+        context.options |= ssl.OP_NO_COMPRESSION
+        context.load_verify_locations(certifi.where())
+        context.set_alpn_protocols(["http/1.1"])
+        context.sessions = {}
+        context.sessions_lock = threading.Lock()
+        return context
+
+    def wrap_socket(self, sock, *args, server_hostname=None, session=None, **kwargs):
+        if session is None and server_hostname:
+            session = self.sessions.get(self._key(sock, server_hostname))
+        return super().wrap_socket(sock, *args, server_hostname=server_hostname, session=session, **kwargs)
+
+    @staticmethod
+    def _key(sock, server_hostname: str) -> Tuple[str, int]:
+        try:
+            return server_hostname, sock.getpeername()[1]
+        except OSError:
+            return server_hostname, 0
+
+    def remember(self, sock, server_hostname: str):
+        """Store the socket's session; called after a response so TLS 1.3 tickets have arrived"""
+        session = getattr(sock, "session", None)
+        if session is None:
+            return
+        with self.sessions_lock:
+            if len(self.sessions) >= TLS_SESSION_CACHE_SIZE:
+                self.sessions.pop(next(iter(self.sessions)))
+            self.sessions[self._key(sock, server_hostname)] = session
+
+
+# ============= Connections =============
+
+_trace = threading.local()
+
+
+def _record(**fields):
+    trace = getattr(_trace, "current", None)
+    if trace is not None:
+        trace.update(fields)
+
+
+class TransportStats:
+    """Cumulative connection reuse counters for a session"""
+
+    FIELDS = ("requests", "reused", "new_connections", "dns_cached", "dns_resolved", "tls_resumed", "tls_full")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, trace: dict):
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts["reused" if trace["reused"] else "new_connections"] += 1
+            if trace.get("dns") in ("cached", "resolved"):
+                self.counts[f"dns_{trace['dns']}"] += 1
+            if trace.get("tls") in ("resumed", "full"):
+                self.counts[f"tls_{trace['tls']}"] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            counts = dict(self.counts)
+        counts["reuse_ratio"] = round(counts["reused"] / counts["requests"], 3) if counts["requests"] else None
+        return counts
+
+
+class CachedDnsConnection(HTTPConnection):
+    """Connects through the DNS cache, trying each cached address in turn"""
+
+    dns_cache: DnsCache = None
+
+    def _new_conn(self):
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            ipaddress.ip_address(host.strip("[]"))
+            addresses, dns_state = [host], "ip"
+        except ValueError:
+            try:
+                addresses, cached = self.dns_cache.resolve(host)
+            except socket.gaierror:
+                addresses, cached = [host], False  # let urllib3 raise its usual NameResolutionError
+            dns_state = "cached" if cached else "resolved"
+        resolved = time.perf_counter()
+        last_error = None
+        try:
+            for address in addresses:
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    last_error = e
+            else:
+                self.dns_cache.forget(host)
+                raise last_error
+        finally:
+            self._dns_host = host
+        _record(
+            reused=False, dns=dns_state, dns_ms=round((resolved - started) * 1000, 3),
+            connect_ms=round((time.perf_counter() - resolved) * 1000, 3)
+        )
+        return sock
+
+
+class CachedDnsHTTPSConnection(CachedDnsConnection, HTTPSConnection):
+    """HTTPS with the DNS cache and TLS session resumption"""
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        trace = getattr(_trace, "current", None)
+        if trace is not None and "connect_ms" in trace:
+            tls_ms = (time.perf_counter() - started) * 1000 - trace["dns_ms"] - trace["connect_ms"]
+            _record(tls="resumed" if getattr(self.sock, "session_reused", False) else "full", tls_ms=round(max(0.0, tls_ms), 3))
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        context = self.ssl_context
+        if isinstance(context, ResumingSSLContext) and self.sock is not None:
+            context.remember(self.sock, self.server_hostname or self.host)
+        return response
+
+
+class CachedDnsPool(HTTPConnectionPool):
+    ConnectionCls = CachedDnsConnection
+
+
+class CachedDnsHTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = CachedDnsHTTPSConnection
+
+
+class TransportAdapter(HTTPAdapter):
+    """Keep-alive pools with cached DNS, TLS session reuse and per-request connection stats"""
+
+    def __init__(self, dns_cache: DnsCache, **kwargs):
+        self.dns_cache = dns_cache
+        self.tls_context = ResumingSSLContext()
+        self.stats = TransportStats()
+        self.connection_classes = (
+            type("Connection", (CachedDnsConnection,), {"dns_cache": dns_cache}),
+            type("HTTPSConnection", (CachedDnsHTTPSConnection,), {"dns_cache": dns_cache}),
+        )
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        http_conn, https_conn = self.connection_classes
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type("Pool", (CachedDnsPool,), {"ConnectionCls": http_conn}),
+            "https": type("HTTPSPool", (CachedDnsHTTPSPool,), {"ConnectionCls": https_conn}),
+        }
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        # Custom CA bundles and client certs keep urllib3's per-pool contexts
+        if verify is True and cert is None and not os.environ.get("REQUESTS_CA_BUNDLE"):
+            pool_kwargs["ssl_context"] = self.tls_context
+        return host_params, pool_kwargs
+
+    def cert_verify(self, conn, url, verify, cert):
+        super().cert_verify(conn, url, verify, cert)
+        if conn.conn_kw.get("ssl_context") is self.tls_context:
+            conn.ca_certs = None  # already loaded into the shared context; don't re-read it per connection
+
+    def send(self, request, *args, **kwargs):
+        _trace.current = trace = {"reused": True}
+        try:
+            response = super().send(request, *args, **kwargs)
+        finally:
+            _trace.current = None
+        response.transport = trace
+        self.stats.add(trace)
+        return response
+
+
+def create_session(dns_cache: Optional[DnsCache] = None) -> requests.Session:
+    """Shared keep-alive session for proxied upstream calls.
+
+    Cookies are never persisted: the session is shared by every user of the
+    worker, so Set-Cookie from one upstream response must not leak into another
+    user's request. Each response carries `.transport` (reused, dns, tls and
+    their timings) and the adapter keeps cumulative reuse stats.
+    """
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = TransportAdapter(dns_cache or DnsCache(), pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def transport_stats(session: requests.Session) -> Optional[dict]:
+    adapter = session.get_adapter("https://")
+    return adapter.stats.snapshot() if isinstance(adapter, TransportAdapter) else None
@@ -1,13 +1,28 @@
+from typing import List
 from fastapi import HTTPException
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 async def get_user_role_in_org(db: AsyncIOMotorDatabase, user_id: str, org_id: str) -> str:
     """Get user's role in an organization"""
-    org = await db.organizations.find_one({"org_id": org_id}, {"_id": 0})
+    # Project only the caller's member_roles entry rather than loading every member
+    org = await db.organizations.find_one(
+        {"org_id": org_id},
+        {"_id": 0, "owner_id": 1, "member_roles": {"$elemMatch": {"user_id": user_id}}}
+    )
     
     if not org:
         raise HTTPException(status_code=404, detail="Organization not found")
     
+    if org.get("owner_id") != user_id and not org.get("member_roles"):
+        # Old-format members have no member_roles entry
+        if await db.organizations.find_one({"org_id": org_id, "members": user_id}, {"_id": 1}):
+            org["members"] = [user_id]
+    
+    return role_in_org(org, user_id)
+
+
+def role_in_org(org: dict, user_id: str) -> str:
+    """Get user's role from an already loaded organization document"""
     # Check if user is owner (always admin)
     if org.get("owner_id") == user_id:
         return "admin"
@@ -90,6 +105,43 @@ async def add_user_to_org(db: AsyncIOMotorDatabase, org_id: str, user_id: str, r
     )
 
 
+async def add_user_to_orgs(db: AsyncIOMotorDatabase, org_ids: List[str], user_id: str, role: str = "view"):
+    """Add one user to several organizations in a single update; orgs they already belong to are skipped"""
+    from datetime import datetime, timezone
+    
+    if not org_ids:
+        return
+    await db.organizations.update_many(
+        {"org_id": {"$in": org_ids}, "members": {"$ne": user_id}, "member_roles.user_id": {"$ne": user_id}},
+        {
+            "$push": {"member_roles": {"user_id": user_id, "role": role, "added_at": datetime.now(timezone.utc)}},
+            "$addToSet": {"members": user_id}
+        }
+    )
+
+
+async def add_users_to_org(db: AsyncIOMotorDatabase, org_id: str, user_ids: List[str], role: str = "view"):
+    """Add several users to one organization in a single update; existing members are skipped"""
+    from datetime import datetime, timezone
+    
+    org = await db.organizations.find_one({"org_id": org_id}, {"_id": 0, "members": 1, "member_roles.user_id": 1})
+    if not org:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    
+    existing = set(org.get("members") or []) | {m.get("user_id") for m in org.get("member_roles") or []}
+    new_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in existing]
+    if not new_ids:
+        return
+    now = datetime.now(timezone.utc)
+    await db.organizations.update_one(
+        {"org_id": org_id},
+        {
+            "$push": {"member_roles": {"$each": [{"user_id": user_id, "role": role, "added_at": now} for user_id in new_ids]}},
+            "$addToSet": {"members": {"$each": new_ids}}
+        }
+    )
+
+
 async def remove_user_from_org(db: AsyncIOMotorDatabase, org_id: str, user_id: str):
     """Remove user from organization"""
     org = await db.organizations.find_one({"org_id": org_id})
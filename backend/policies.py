@@ -0,0 +1,217 @@
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import os
+import random
+import time
+import requests
+from starlette.concurrency import run_in_threadpool
+
+from executor import send
+
+DEFAULT_POLICY = {
+    "connect_timeout": float(os.environ.get("EXECUTE_CONNECT_TIMEOUT", "5")),
+    "read_timeout": float(os.environ.get("EXECUTE_READ_TIMEOUT", "30")),
+    "retries": 0,
+    "backoff_base_ms": 200,
+    "backoff_max_ms": 5000,
+    "retry_on_status": [502, 503, 504],
+    "retry_non_idempotent": False,
+    "circuit_breaker": True,
+    "circuit_breaker_on_5xx": False,  # a 5xx proves the host is reachable; only count it when asked to
+}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"}
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.environ.get("BREAKER_RESET_SECONDS", "30"))
+
+
+def resolve_policy(*layers: Optional[dict]) -> dict:
+    """Merge policy layers over the defaults; later layers win, unset fields fall through"""
+    policy = dict(DEFAULT_POLICY)
+    for layer in layers:
+        for key, value in (layer or {}).items():
+            if key in policy and value is not None:
+                policy[key] = value
+    return policy
+
+
+async def saved_request_policies(db, request_docs: List[dict], base: Optional[dict] = None) -> Dict[str, dict]:
+    """Resolved policy per saved request, keyed by request_id: `base`, then collection, then request layer"""
+    collection_ids = list({doc["collection_id"] for doc in request_docs if doc.get("collection_id")})
+    collection_policies = {}
+    if collection_ids:
+        collection_policies = {
+            collection["collection_id"]: collection.get("execution_policy")
+            for collection in await db.collections.find(
+                {"collection_id": {"$in": collection_ids}}, {"_id": 0, "collection_id": 1, "execution_policy": 1}
+            ).to_list(length=None)
+        }
+    return {
+        doc["request_id"]: resolve_policy(
+            base, collection_policies.get(doc.get("collection_id")), doc.get("execution_policy")
+        )
+        for doc in request_docs
+    }
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Per-org, per-host breaker: opens after consecutive failures, half-opens after a cool-down"""
+
+    def __init__(self, threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probing:
+            # Let a single probe through; everyone else keeps failing fast
+            self.probing = True
+            return True
+        return False
+
+    def release_probe(self):
+        """The probe ended without telling us anything about the upstream; let the next call probe"""
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+
+class BreakerRegistry:
+    """Circuit breakers keyed by (org, upstream host), per worker, so one tenant's
+    failing calls never make another tenant's calls fail fast"""
+
+    def __init__(self):
+        self.breakers: Dict[Tuple[Optional[str], str], CircuitBreaker] = {}
+
+    def for_url(self, url: str, org_id: Optional[str] = None) -> Tuple[str, CircuitBreaker]:
+        host = urlsplit(url).netloc.lower()
+        breaker = self.breakers.get((org_id, host))
+        if breaker is None:
+            breaker = self.breakers[(org_id, host)] = CircuitBreaker()
+        return host, breaker
+
+    def snapshot(self, org_id: Optional[str] = None) -> List[dict]:
+        return [
+            {"host": host, "state": breaker.state, "failures": breaker.failures}
+            for (owner, host), breaker in self.breakers.items()
+            if owner == org_id and (breaker.state != "closed" or breaker.failures)
+        ]
+
+
+def _backoff_seconds(policy: dict, attempt: int) -> float:
+    """Exponential backoff with full jitter"""
+    ceiling = min(policy["backoff_max_ms"], policy["backoff_base_ms"] * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling) / 1000
+
+
+async def send_with_policy(
+    session,
+    spec: dict,
+    policy: dict,
+    breakers: BreakerRegistry,
+    open_blob: Optional[Callable] = None,
+    pool: Optional[Executor] = None,
+    org_id: Optional[str] = None
+) -> Tuple[requests.Response, int, dict]:
+    """Send with timeouts, retries and the org's breaker for the host; returns response, ms, and a policy report.
+
+    Raises CircuitOpenError when failing fast, or the last transport error once
+    retries are exhausted. The report is attached to the exception as `.report`.
+    """
+    method = spec["method"].upper()
+    retryable_method = method in IDEMPOTENT_METHODS or policy["retry_non_idempotent"]
+    max_attempts = 1 + (policy["retries"] if retryable_method else 0)
+    use_breaker = policy["circuit_breaker"]
+    host, breaker = breakers.for_url(spec["url"], org_id)
+    report = {
+        "connect_timeout": policy["connect_timeout"],
+        "read_timeout": policy["read_timeout"],
+        "max_attempts": max_attempts,
+        "attempts": 0,
+        "retries": [],
+        "circuit": breaker.state if use_breaker else "disabled",
+    }
+    if policy["retries"] and not retryable_method:
+        report["retries_skipped"] = f"{method} is not idempotent"
+
+    attempt = 0
+    while True:
+        attempt += 1
+        probe = use_breaker and breaker.state == "half_open"
+        if use_breaker and not breaker.allow():
+            report["circuit"] = "open"
+            error = CircuitOpenError(
+                f"Circuit open for {host}; retry in {breaker.retry_after():.0f}s"
+            )
+            error.report = report
+            raise error
+
+        report["attempts"] = attempt
+        reason = None
+        try:
+            timeout = (policy["connect_timeout"], policy["read_timeout"])
+            if pool is None:
+                response, elapsed_time = await run_in_threadpool(send, session, spec, timeout, open_blob)
+            else:
+                response, elapsed_time = await asyncio.get_running_loop().run_in_executor(
+                    pool, send, session, spec, timeout, open_blob
+                )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if use_breaker:
+                breaker.record_failure()
+            reason = type(e).__name__
+            if attempt >= max_attempts:
+                report["circuit"] = breaker.state if use_breaker else "disabled"
+                e.report = report
+                raise
+        except BaseException:
+            # Redirect loops, bad headers, body errors, cancellation: never leave the probe slot taken
+            if probe:
+                breaker.release_probe()
+            raise
+        else:
+            if use_breaker:
+                if response.status_code >= 500 and policy["circuit_breaker_on_5xx"]:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if response.status_code not in policy["retry_on_status"] or attempt >= max_attempts:
+                report["circuit"] = breaker.state if use_breaker else "disabled"
+                return response, elapsed_time, report
+            reason = f"status {response.status_code}"
+
+        delay = _backoff_seconds(policy, attempt)
+        report["retries"].append({"attempt": attempt, "reason": reason, "delay_ms": int(delay * 1000)})
+        await asyncio.sleep(delay)
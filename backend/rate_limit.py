@@ -0,0 +1,276 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import math
+import os
+import time
+import uuid
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+DEFAULT_LIMITS = {
+    "user_rate": float(os.environ.get("EXECUTE_USER_RATE", "5")),  # requests per second
+    "user_burst": int(os.environ.get("EXECUTE_USER_BURST", "20")),
+    "org_rate": float(os.environ.get("EXECUTE_ORG_RATE", "20")),
+    "org_burst": int(os.environ.get("EXECUTE_ORG_BURST", "60")),
+    "org_concurrency": int(os.environ.get("EXECUTE_ORG_CONCURRENCY", "20")),
+    "host_concurrency": int(os.environ.get("EXECUTE_HOST_CONCURRENCY", "10")),
+}
+# Ceilings for org overrides: any user can create an org and administer it, so the
+# operator, not the org admin, decides how far limits can be raised
+MAX_LIMITS = {
+    key: max(DEFAULT_LIMITS[key], type(DEFAULT_LIMITS[key])(os.environ.get(f"EXECUTE_MAX_{key.upper()}", default)))
+    for key, default in (
+        ("user_rate", "20"), ("user_burst", "100"), ("org_rate", "100"), ("org_burst", "300"),
+        ("org_concurrency", "100"), ("host_concurrency", "50"),
+    )
+}
+LIMITS_CACHE_SECONDS = 30
+# A shared concurrency slot is reclaimed after this long even if its holder died
+SLOT_TTL_SECONDS = int(os.environ.get("EXECUTE_SLOT_TTL_SECONDS", "600"))
+
+
+def clamp_limits(limits: dict) -> dict:
+    """Cap limit values at the server-configured MAX_LIMITS"""
+    return {k: min(v, MAX_LIMITS[k]) if k in MAX_LIMITS else v for k, v in limits.items()}
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, rate: float, burst: int) -> float:
+        """Consume one token; return 0 if allowed, else seconds until a token is available"""
+        self.rate, self.burst = rate, burst
+        now = time.monotonic()
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate if rate > 0 else 60.0
+
+
+class LocalBucketBackend:
+    """In-process token buckets; limits are per worker"""
+
+    def __init__(self):
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(rate, burst)
+        return bucket.take(rate, burst)
+
+
+class MongoBucketBackend:
+    """Token buckets shared by all workers, updated atomically in Mongo"""
+
+    def __init__(self, db: AsyncIOMotorDatabase, collection: str = "rate_limit_buckets"):
+        self.collection = db[collection]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("key", unique=True)
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        now = time.time()
+        refilled = {"$min": [burst, {"$add": [
+            {"$ifNull": ["$tokens", burst]},
+            {"$multiply": [{"$subtract": [now, {"$ifNull": ["$updated", now]}]}, rate]}
+        ]}]}
+        doc = await self.collection.find_one_and_update(
+            {"key": key},
+            [
+                {"$set": {"tokens": refilled, "updated": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": datetime.now(timezone.utc) + timedelta(hours=1)
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if doc["allowed"]:
+            return 0.0
+        return (1 - doc["tokens"]) / rate if rate > 0 else 60.0
+
+
+class ConcurrencyGate:
+    """Non-blocking in-flight counters keyed by org, or by org and host; per worker"""
+
+    def __init__(self):
+        self.in_flight: Dict[str, int] = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def try_acquire(self, key: str, limit: int) -> Optional[str]:
+        """A slot token, or None when `limit` calls are already in flight"""
+        current = self.in_flight.get(key, 0)
+        if current >= limit:
+            return None
+        self.in_flight[key] = current + 1
+        return key
+
+    async def release(self, key: str, slot: str):
+        current = self.in_flight.get(key, 0) - 1
+        if current <= 0:
+            self.in_flight.pop(key, None)
+        else:
+            self.in_flight[key] = current
+
+
+class MongoConcurrencyGate:
+    """In-flight counters shared by all workers and nodes.
+
+    Each key's document holds the live slots; taking one drops expired slots and
+    appends a new one in a single atomic update, so a crashed worker's slots are
+    reclaimed after SLOT_TTL_SECONDS.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, collection: str = "rate_limit_slots"):
+        self.collection = db[collection]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("key", unique=True)
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def try_acquire(self, key: str, limit: int) -> Optional[str]:
+        now = time.time()
+        slot = uuid.uuid4().hex
+        live = {"$filter": {"input": {"$ifNull": ["$slots", []]}, "cond": {"$gt": ["$$this.expires", now]}}}
+        doc = await self.collection.find_one_and_update(
+            {"key": key},
+            [
+                {"$set": {"slots": live}},
+                {"$set": {"admitted": {"$lt": [{"$size": "$slots"}, limit]}}},
+                {"$set": {
+                    "slots": {"$cond": [
+                        "$admitted",
+                        {"$concatArrays": ["$slots", [{"id": slot, "expires": now + SLOT_TTL_SECONDS}]]},
+                        "$slots"
+                    ]},
+                    "expires_at": datetime.now(timezone.utc) + timedelta(seconds=SLOT_TTL_SECONDS)
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return slot if doc["admitted"] else None
+
+    async def release(self, key: str, slot: str):
+        await self.collection.update_one({"key": key}, {"$pull": {"slots": {"id": slot}}})
+
+
+def _too_many(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class ExecuteLimiter:
+    """Rate limits and in-flight quotas for the execute proxy"""
+
+    def __init__(self, db: AsyncIOMotorDatabase, backend=None, gate=None):
+        self.db = db
+        self.backend = backend or LocalBucketBackend()
+        self.gate = gate or ConcurrencyGate()
+        self._limits_cache: Dict[str, Tuple[float, dict]] = {}
+
+    async def ensure_indexes(self):
+        await self.db.org_rate_limits.create_index("org_id", unique=True)
+        await self.backend.ensure_indexes()
+        await self.gate.ensure_indexes()
+
+    async def get_limits(self, org_id: Optional[str]) -> dict:
+        """Get an organization's execute limits merged over the defaults, capped at MAX_LIMITS"""
+        if not org_id:
+            return dict(DEFAULT_LIMITS)
+        cached = self._limits_cache.get(org_id)
+        if cached and time.monotonic() - cached[0] < LIMITS_CACHE_SECONDS:
+            return cached[1]
+        record = await self.db.org_rate_limits.find_one({"org_id": org_id}, {"_id": 0}) or {}
+        limits = dict(DEFAULT_LIMITS)
+        limits.update({k: v for k, v in record.items() if k in DEFAULT_LIMITS and v is not None})
+        limits = clamp_limits(limits)
+        self._limits_cache[org_id] = (time.monotonic(), limits)
+        return limits
+
+    def invalidate(self, org_id: str):
+        """Drop cached limits for an organization"""
+        self._limits_cache.pop(org_id, None)
+
+    async def set_limits(self, org_id: str, updates: dict, user_id: str) -> dict:
+        """Store limit overrides for an organization (capped at MAX_LIMITS)"""
+        fields = clamp_limits({k: v for k, v in updates.items() if v is not None})
+        await self.db.org_rate_limits.update_one(
+            {"org_id": org_id},
+            {"$set": {
+                **fields,
+                "org_id": org_id,
+                "updated_by": user_id,
+                "updated_at": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+        self._limits_cache.pop(org_id, None)
+        return await self.get_limits(org_id)
+
+    @asynccontextmanager
+    async def guard(self, user_id: str, org_id: Optional[str], url: str):
+        """Admit one execute call or raise 429; holds org/host slots while the body runs"""
+        limits = await self.get_limits(org_id)
+        # Unscoped executes share the default org quota under the user's own key
+        scope = f"org:{org_id}" if org_id else f"solo:{user_id}"
+
+        # The user bucket is per org too: its limits are the org's, so one org with
+        # loose limits must not raise the user's allowance everywhere else
+        wait = await self.backend.take(f"user:{scope}:{user_id}", limits["user_rate"], limits["user_burst"])
+        if wait:
+            raise _too_many("Rate limit exceeded for user", wait)
+        wait = await self.backend.take(scope, limits["org_rate"], limits["org_burst"])
+        if wait:
+            raise _too_many("Rate limit exceeded for organization", wait)
+
+        # Per org as well as per host: the limit is the org's own setting, so a shared key
+        # would let one org (possibly with a raised limit) take every slot for a popular host
+        host_key = f"host:{scope}:{urlsplit(url).netloc.lower()}"
+        org_slot = await self.gate.try_acquire(scope, limits["org_concurrency"])
+        if org_slot is None:
+            raise _too_many("Too many in-flight requests for organization", 1)
+        try:
+            host_slot = await self.gate.try_acquire(host_key, limits["host_concurrency"])
+            if host_slot is None:
+                raise _too_many("Too many in-flight requests to target host", 1)
+            try:
+                yield
+            finally:
+                await self.gate.release(host_key, host_slot)
+        finally:
+            await self.gate.release(scope, org_slot)
+
+
+def create_limiter(db: AsyncIOMotorDatabase) -> ExecuteLimiter:
+    """Build the execute limiter for the configured RATE_LIMIT_BACKEND.
+
+    Defaults to mongo so limits hold across workers and nodes; `local` keeps buckets
+    and slots in-process, which is only correct for a lone process.
+    """
+    if os.environ.get("RATE_LIMIT_BACKEND", "mongo").lower() == "local":
+        return ExecuteLimiter(db)
+    return ExecuteLimiter(db, MongoBucketBackend(db), MongoConcurrencyGate(db))
@@ -0,0 +1,86 @@
+from typing import Optional
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from permissions import check_org_permission
+
+ROLE_LEVELS = {"view": 1, "edit": 2, "admin": 3}
+
+
+def permission_filter(org_id: str, user_id: str, required_role: str) -> dict:
+    """Organization filter that only matches when user_id holds at least required_role"""
+    roles = [role for role, level in ROLE_LEVELS.items() if level >= ROLE_LEVELS[required_role]]
+    if "view" in roles:
+        roles.append(None)  # member_roles entries without a role are viewers
+    allowed = [
+        {"owner_id": user_id},
+        {"member_roles": {"$elemMatch": {"user_id": user_id, "role": {"$in": roles}}}}
+    ]
+    if "edit" in roles:
+        # Old-format members without a member_roles entry are editors
+        allowed.append({"members": user_id, "member_roles.user_id": {"$ne": user_id}})
+    return {"org_id": org_id, "$or": allowed}
+
+
+async def require_member(db: AsyncIOMotorDatabase, org_id: str, user_id: str):
+    """Membership check that reads nothing but the document id"""
+    if not await db.organizations.find_one({"org_id": org_id, "members": user_id}, {"_id": 1}):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+
+class Repository:
+    """Reads and writes for a collection keyed by a string id, one round-trip each"""
+
+    def __init__(self, collection: str, id_field: str, label: str):
+        self.collection = collection
+        self.id_field = id_field
+        self.label = label
+
+    def not_found(self) -> HTTPException:
+        return HTTPException(status_code=404, detail=f"{self.label} not found")
+
+    async def get(self, db: AsyncIOMotorDatabase, doc_id: str, projection: Optional[dict] = None) -> dict:
+        doc = await db[self.collection].find_one({self.id_field: doc_id}, projection or {"_id": 0})
+        if not doc:
+            raise self.not_found()
+        return doc
+
+    async def update(self, db: AsyncIOMotorDatabase, doc_id: str, fields: dict, guard: Optional[dict] = None) -> dict:
+        """$set fields and return the updated document; guard narrows the match (e.g. to the org checked)"""
+        query = {self.id_field: doc_id, **(guard or {})}
+        if not fields:
+            doc = await db[self.collection].find_one(query, {"_id": 0})
+        else:
+            doc = await db[self.collection].find_one_and_update(
+                query, {"$set": fields}, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+            )
+        if not doc:
+            raise self.not_found()
+        return doc
+
+    async def delete(self, db: AsyncIOMotorDatabase, doc_id: str, guard: Optional[dict] = None, projection: Optional[dict] = None) -> dict:
+        """Delete and return the removed document (projected)"""
+        doc = await db[self.collection].find_one_and_delete(
+            {self.id_field: doc_id, **(guard or {})}, projection=projection or {"_id": 0}
+        )
+        if not doc:
+            raise self.not_found()
+        return doc
+
+
+organization_repo = Repository("organizations", "org_id", "Organization")
+collection_repo = Repository("collections", "collection_id", "Collection")
+request_repo = Repository("requests", "request_id", "Request")
+environment_repo = Repository("environments", "env_id", "Environment")
+monitor_repo = Repository("monitors", "monitor_id", "Monitor")
+workflow_repo = Repository("workflows", "workflow_id", "Workflow")
+
+
+async def update_organization_as(db: AsyncIOMotorDatabase, org_id: str, user_id: str, required_role: str, fields: dict) -> dict:
+    """Permission check and update in a single round-trip; only a refused update pays for an explanation"""
+    try:
+        return await organization_repo.update(db, org_id, fields, guard=permission_filter(org_id, user_id, required_role))
+    except HTTPException:
+        await check_org_permission(db, user_id, org_id, required_role)  # raises the usual 404/403
+        raise
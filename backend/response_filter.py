@@ -0,0 +1,424 @@
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Iterator, List, Optional, Tuple
+import json
+import multiprocessing
+import os
+import queue
+import re
+import threading
+from fastapi import HTTPException
+
+try:
+    import jq
+except ImportError:  # pragma: no cover - jq needs a native build
+    jq = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+FILTER_CACHE_ENTRIES = 256
+MAX_FILTER_OUTPUTS = 100000
+FILTER_TYPES = ("jq", "jsonpath")
+# jq is Turing complete (`last(range(infinite))` validates fine), so programs run in
+# worker processes that are killed after JQ_TIMEOUT_SECONDS, with capped memory and output
+JQ_TIMEOUT_SECONDS = float(os.environ.get("JQ_TIMEOUT_SECONDS", "2"))
+JQ_WORKERS = int(os.environ.get("JQ_WORKERS", "2"))
+JQ_MEMORY_LIMIT_MB = int(os.environ.get("JQ_MEMORY_LIMIT_MB", "1024"))
+JQ_MAX_OUTPUT_BYTES = int(os.environ.get("JQ_MAX_OUTPUT_BYTES", str(16 * 1024 * 1024)))
+JQ_STARTUP_SECONDS = 30
+# Builtins that reach outside the response body: the server's environment, further
+# inputs and modules on disk
+JQ_BLOCKED_BUILTINS = re.compile(r"(?<![\w$.])(\$ENV|env|input|inputs|input_filename|import|include)\b")
+
+# A compiled JSONPath step: (recursive, kind, value) with kind in key/wild/index/slice/union
+Step = Tuple[bool, str, Any]
+
+
+# ============= JSONPath =============
+
+def _bracket_step(inner: str, recursive: bool) -> Step:
+    inner = inner.strip()
+    if inner == "*":
+        return (recursive, "wild", None)
+    if inner.startswith("?") or inner.startswith("("):
+        raise ValueError("JSONPath filter and script expressions are not supported; use jq instead")
+    if ":" in inner and not inner.startswith(("'", '"')):
+        parts = [part.strip() for part in inner.split(":")]
+        if len(parts) > 3:
+            raise ValueError(f"Invalid slice: [{inner}]")
+        start, stop, step = (parts + [""] * 3)[:3]
+        return (recursive, "slice", slice(
+            int(start) if start else None, int(stop) if stop else None, int(step) if step else None
+        ))
+    members = []
+    for part in inner.split(","):
+        part = part.strip()
+        if len(part) >= 2 and part[0] == part[-1] and part[0] in "'\"":
+            members.append(part[1:-1])
+        else:
+            try:
+                members.append(int(part))
+            except ValueError:
+                raise ValueError(f"Invalid selector: [{inner}]")
+    if len(members) == 1:
+        return (recursive, "index" if isinstance(members[0], int) else "key", members[0])
+    return (recursive, "union", tuple(members))
+
+
+@lru_cache(maxsize=FILTER_CACHE_ENTRIES)
+def compile_jsonpath(expression: str) -> Tuple[Step, ...]:
+    """`$.items[0:10].name`, `$..id`, `$['a','b']` -> steps; filter expressions are not supported"""
+    path = expression.strip()
+    if not path.startswith("$"):
+        raise ValueError("JSONPath must start with $")
+    steps, i = [], 1
+    while i < len(path):
+        recursive = path.startswith("..", i)
+        if recursive:
+            i += 2
+        elif path[i] == ".":
+            i += 1
+        elif path[i] != "[":
+            raise ValueError(f"Unexpected {path[i]!r} at position {i}")
+
+        if i < len(path) and path[i] == "[":
+            end, quote = i + 1, None
+            while end < len(path) and (quote or path[end] != "]"):
+                if path[end] in "'\"":
+                    quote = None if quote == path[end] else quote or path[end]
+                end += 1
+            if end >= len(path):
+                raise ValueError("Unclosed [")
+            steps.append(_bracket_step(path[i + 1:end], recursive))
+            i = end + 1
+        else:
+            end = i
+            while end < len(path) and path[end] not in ".[":
+                end += 1
+            name = path[i:end]
+            if not name:
+                raise ValueError(f"Missing name at position {i}")
+            steps.append((recursive, "wild", None) if name == "*" else (recursive, "key", name))
+            i = end
+    return tuple(steps)
+
+
+def _descendants(node: Any) -> Iterator[Any]:
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        yield current
+        if isinstance(current, dict):
+            stack.extend(reversed(list(current.values())))
+        elif isinstance(current, list):
+            stack.extend(reversed(current))
+
+
+def _select(node: Any, kind: str, value: Any) -> Iterator[Any]:
+    if kind == "key":
+        if isinstance(node, dict) and value in node:
+            yield node[value]
+    elif kind == "wild":
+        if isinstance(node, dict):
+            yield from node.values()
+        elif isinstance(node, list):
+            yield from node
+    elif kind == "index":
+        if isinstance(node, list) and -len(node) <= value < len(node):
+            yield node[value]
+    elif kind == "slice":
+        if isinstance(node, list):
+            yield from node[value]
+    else:
+        for member in value:
+            yield from _select(node, "index" if isinstance(member, int) else "key", member)
+
+
+def _step(nodes: Iterator[Any], recursive: bool, kind: str, value: Any) -> Iterator[Any]:
+    for node in nodes:
+        for inner in _descendants(node) if recursive else (node,):
+            yield from _select(inner, kind, value)
+
+
+def evaluate_jsonpath(steps: Tuple[Step, ...], document: Any) -> Iterator[Any]:
+    """Lazily yield matches, so a limit stops the walk early"""
+    nodes: Iterator[Any] = iter([document])
+    for recursive, kind, value in steps:
+        nodes = _step(nodes, recursive, kind, value)
+    return nodes
+
+
+# ============= Filtering =============
+
+def _jq_code(expression: str) -> str:
+    """The program with string literals and comments blanked out (interpolations are kept)"""
+    code, interpolations, in_string, i = [], [], False, 0
+    while i < len(expression):
+        char = expression[i]
+        if in_string:
+            if char == "\\" and expression[i + 1:i + 2] == "(":
+                interpolations.append(0)
+                in_string = False
+                code.append("  ")
+                i += 2
+                continue
+            if char == "\\":
+                code.append("  ")
+                i += 2
+                continue
+            in_string = char != '"'
+            code.append(" ")
+        elif char == '"':
+            in_string = True
+            code.append(" ")
+        elif char == "#":
+            end = expression.find("\n", i)
+            i = len(expression) if end < 0 else end
+            continue
+        elif interpolations and char == ")" and interpolations[-1] == 0:
+            interpolations.pop()
+            in_string = True
+            code.append(" ")
+        else:
+            if interpolations and char in "()":
+                interpolations[-1] += 1 if char == "(" else -1
+            code.append(char)
+        i += 1
+    return "".join(code)
+
+
+@lru_cache(maxsize=FILTER_CACHE_ENTRIES)
+def _jq_program(expression: str):
+    return jq.compile(expression)
+
+
+@lru_cache(maxsize=FILTER_CACHE_ENTRIES)
+def compile_jq(expression: str):
+    """Compile a user jq program; builtins in JQ_BLOCKED_BUILTINS are rejected"""
+    if jq is None:
+        raise ValueError("jq filters are not available on this server")
+    blocked = JQ_BLOCKED_BUILTINS.search(_jq_code(expression))
+    if blocked:
+        raise ValueError(f"{blocked.group(1)} is not allowed in filters")
+    return _jq_program(expression)
+
+
+def _jq_worker_main(conn, memory_limit_mb: int, max_output_bytes: int = JQ_MAX_OUTPUT_BYTES):
+    """Child process loop: run (expression, text, cap) jobs until the pipe closes"""
+    # The child inherits the server's environment (database URL, OAuth secrets);
+    # drop it before any program runs so `$ENV` and `env` see nothing
+    os.environ.clear()
+    try:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):  # pragma: no cover - not Linux/macOS
+        pass
+    conn.send(("ready", None))
+    while True:
+        try:
+            expression, text, cap = conn.recv()
+        except EOFError:
+            return
+        try:
+            outputs, size, oversized = [], 0, False
+            for output in islice(_jq_program(expression).input_text(text), cap):
+                size += len(json.dumps(output))
+                if size > max_output_bytes:
+                    oversized = True
+                    break
+                outputs.append(output)
+            conn.send(("ok", (outputs, oversized)))
+        except MemoryError:
+            conn.send(("error", f"jq filter exceeded the {memory_limit_mb} MB memory limit"))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class _JqWorker:
+    def __init__(self, max_output_bytes: int = JQ_MAX_OUTPUT_BYTES):
+        context = multiprocessing.get_context("spawn")  # forking a threaded server is unsafe
+        self.conn, child = context.Pipe()
+        self.process = context.Process(
+            target=_jq_worker_main, args=(child, JQ_MEMORY_LIMIT_MB, max_output_bytes),
+            name="jq-filter", daemon=True
+        )
+        self.process.start()
+        child.close()
+        # Startup (interpreter + imports) must not eat into the first job's time budget
+        if not self.conn.poll(JQ_STARTUP_SECONDS):
+            self.kill()
+            raise OSError("jq worker failed to start")
+        self.conn.recv()
+
+    def run(self, expression: str, text: str, cap: int, timeout: float) -> Tuple[list, bool]:
+        self.conn.send((expression, text, cap))
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"jq filter exceeded {timeout:g}s")
+        status, payload = self.conn.recv()
+        if status == "error":
+            raise ValueError(payload)
+        return payload
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+
+class JqPool:
+    """JQ_WORKERS reusable jq processes; a job that overruns kills its worker, which is replaced lazily"""
+
+    def __init__(
+        self,
+        workers: int = JQ_WORKERS,
+        timeout: float = JQ_TIMEOUT_SECONDS,
+        max_output_bytes: int = JQ_MAX_OUTPUT_BYTES
+    ):
+        self.timeout = timeout
+        self.max_output_bytes = max_output_bytes
+        self.idle: "queue.Queue[Optional[_JqWorker]]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.workers: List[_JqWorker] = []
+        for _ in range(workers):
+            self.idle.put(None)  # a free slot; the process starts on first use
+
+    def run(self, expression: str, text: str, cap: int) -> Tuple[list, bool]:
+        """(outputs, oversized); raises TimeoutError or ValueError. Blocking."""
+        try:
+            worker = self.idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError("All jq workers are busy")
+        try:
+            if worker is None:
+                worker = _JqWorker(self.max_output_bytes)
+                with self.lock:
+                    self.workers.append(worker)
+            result = worker.run(expression, text, cap, self.timeout)
+        except ValueError:
+            self.idle.put(worker)  # the program failed; the process is fine
+            raise
+        except (TimeoutError, EOFError, OSError) as e:
+            # Stuck or died (e.g. killed for memory): never reuse it
+            if worker is not None:
+                worker.kill()
+                with self.lock:
+                    self.workers.remove(worker)
+            self.idle.put(None)
+            if isinstance(e, TimeoutError):
+                raise
+            raise ValueError("jq filter was aborted")
+        self.idle.put(worker)
+        return result
+
+    def shutdown(self):
+        with self.lock:
+            workers, self.workers = self.workers, []
+        for worker in workers:
+            worker.kill()
+
+
+_jq_pool: Optional[JqPool] = None
+_jq_pool_lock = threading.Lock()
+
+
+def jq_pool() -> JqPool:
+    global _jq_pool
+    with _jq_pool_lock:
+        if _jq_pool is None:
+            _jq_pool = JqPool()
+        return _jq_pool
+
+
+def shutdown_jq_pool():
+    global _jq_pool
+    with _jq_pool_lock:
+        pool, _jq_pool = _jq_pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def validate_filter(spec: dict):
+    """Compile (and cache) a filter before the upstream call so bad expressions fail fast"""
+    if spec.get("type") not in FILTER_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown filter type: {spec.get('type')}")
+    if spec.get("limit") is not None and spec["limit"] < 0:
+        raise HTTPException(status_code=400, detail="Filter limit must not be negative")
+    try:
+        if spec["type"] == "jq":
+            compile_jq(spec["expression"])
+        else:
+            compile_jsonpath(spec["expression"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid {spec['type']} expression: {e}")
+
+
+def _project_one(value: Any, fields: List[str]) -> Any:
+    if not isinstance(value, dict):
+        return value
+    projected = {}
+    for field in fields:
+        parts = field.split(".")
+        current = value
+        for part in parts:
+            if not isinstance(current, dict) or part not in current:
+                break
+            current = current[part]
+        else:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = current
+    return projected
+
+
+def project(value: Any, fields: List[str]) -> Any:
+    """Keep only `fields` (dotted paths allowed) of an object or of each object in a list"""
+    if isinstance(value, list):
+        return [_project_one(item, fields) for item in value]
+    return _project_one(value, fields)
+
+
+def _loads(content: bytes) -> Any:
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+
+def apply_filter(spec: dict, content: bytes) -> Tuple[Optional[Any], dict]:
+    """Filter a raw JSON body; returns (body, report). Blocking, run it in the threadpool.
+
+    jq runs in a worker process bounded by JQ_TIMEOUT_SECONDS, JQ_MEMORY_LIMIT_MB and
+    JQ_MAX_OUTPUT_BYTES; overruns come back as a report error, output over the byte cap
+    is truncated.
+    """
+    limit = spec.get("limit")
+    cap = (limit if limit is not None else MAX_FILTER_OUTPUTS) + 1
+    report = {"type": spec["type"], "expression": spec["expression"], "truncated": False}
+    try:
+        if spec["type"] == "jq":
+            compile_jq(spec["expression"])  # fail fast in-process when jq is missing
+            # jq parses the raw text itself, which skips building the full document in Python
+            outputs, oversized = jq_pool().run(spec["expression"], content.decode("utf-8"), cap)
+            if oversized:
+                report["truncated"] = True
+                report["output_limit_bytes"] = jq_pool().max_output_bytes
+            body = outputs[0] if len(outputs) == 1 and not oversized else outputs
+        else:
+            body = list(islice(evaluate_jsonpath(compile_jsonpath(spec["expression"]), _loads(content)), cap))
+    except UnicodeDecodeError:
+        report["error"] = "Response body is not UTF-8 text"
+        return None, report
+    except (ValueError, TimeoutError) as e:
+        report["error"] = str(e)
+        return None, report
+
+    if spec.get("fields"):
+        body = project(body, spec["fields"])
+    if isinstance(body, list):
+        if len(body) >= cap:
+            body = body[:cap - 1]
+            report["truncated"] = True
+        report["count"] = len(body)
+    return body, report
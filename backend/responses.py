@@ -0,0 +1,251 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple, Type, Union, get_args, get_origin
+import copy
+import json
+import zlib
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional speedup
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/problem+json",
+    "image/svg+xml",
+)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when available"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            jsonable_encoder(content),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+
+
+def model_projection(model: Type[BaseModel]) -> dict:
+    """Mongo projection that returns exactly the fields of a response model"""
+    projection = {"_id": 0}
+    projection.update({name: 1 for name in model.model_fields})
+    return projection
+
+
+def _nested_model(annotation) -> Tuple[Any, bool]:
+    """(model, is_list) for a field typed as a model, Optional[model] or List[model]"""
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            return None, False
+        annotation = args[0]
+    is_list = get_origin(annotation) in (list, List)
+    if is_list:
+        annotation = (get_args(annotation) or (None,))[0]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, is_list
+    return None, False
+
+
+@lru_cache(maxsize=None)
+def _model_shape(model: Type[BaseModel]) -> Tuple[Dict[str, Any], Dict[str, Tuple[Any, bool]]]:
+    """(JSON defaults of optional fields, nested model fields) of a model"""
+    defaults, nested = {}, {}
+    for name, field in model.model_fields.items():
+        if not field.is_required():
+            defaults[name] = jsonable_encoder(field.get_default(call_default_factory=True))
+        sub, is_list = _nested_model(field.annotation)
+        if sub is not None:
+            nested[name] = (sub, is_list)
+    return defaults, nested
+
+
+def fill_defaults(model: Type[BaseModel], doc: dict) -> dict:
+    """Add the model's defaults for fields a stored document predates, at every nesting level"""
+    defaults, nested = _model_shape(model)
+    for name, default in defaults.items():
+        if name not in doc:
+            doc[name] = copy.deepcopy(default)
+    for name, (sub, is_list) in nested.items():
+        value = doc.get(name)
+        if is_list and isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    fill_defaults(sub, item)
+        elif isinstance(value, dict):
+            fill_defaults(sub, value)
+    return doc
+
+
+def trusted_response(model: Type[BaseModel], docs: Iterable[dict]) -> FastJSONResponse:
+    """Return documents already in response-model shape without re-validating them.
+
+    Only use with documents read through model_projection() from collections that
+    this server writes in model shape; FastAPI skips response_model validation for
+    Response instances. Documents written before a field existed get its default.
+    """
+    return FastJSONResponse(content=[fill_defaults(model, doc) for doc in docs])
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check that also accepts the tags CompressionMiddleware derives from `etag`"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    accepted = {etag} | {f'{etag[:-1]}-{coding}"' for coding in ("br", "gzip")}
+    return any(tag.strip() in accepted for tag in if_none_match.split(","))
+
+
+def _accepted_encoding(accept_encoding: str) -> str:
+    """Pick the best supported content coding from an Accept-Encoding header"""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding.strip()] = quality
+
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = "", 0.0
+    for coding in candidates:
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class _Compressor:
+    """Incremental gzip/brotli compressor with a common interface"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self._flush = self._compressor.finish
+            self._process = self._compressor.process
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._flush = self._compressor.flush
+            self._process = self._compressor.compress
+
+    def compress(self, data: bytes) -> bytes:
+        return self._process(data)
+
+    def finish(self) -> bytes:
+        return self._flush()
+
+
+class CompressionMiddleware:
+    """Negotiated brotli/gzip response compression above a size threshold.
+
+    Like Starlette's GZipMiddleware, but prefers brotli when the client accepts it
+    and the brotli package is installed, and leaves non-text payloads untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = _accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message: Message = {}
+        self.compressor = None
+        self.passthrough = False
+        self.started = False
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                self.passthrough = True
+            return
+
+        if message["type"] != "http.response.body":
+            await self.downstream(message)
+            return
+
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.downstream(self.start_message)
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Small single-chunk response: not worth compressing
+                await self.downstream(self.start_message)
+                await self.downstream(message)
+                self.passthrough = True
+                return
+
+            self.compressor = _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and etag.startswith('"'):
+                # Each content coding is its own representation and needs its own strong validator
+                headers["ETag"] = f'{etag[:-1]}-{self.encoding}"'
+            if more_body:
+                del headers["Content-Length"]
+                await self.downstream(self.start_message)
+            else:
+                compressed = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(compressed))
+                await self.downstream(self.start_message)
+                await self.downstream({"type": "http.response.body", "body": compressed})
+                return
+
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
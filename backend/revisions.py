@@ -0,0 +1,397 @@
+"""Revision history for requests, collections and environments.
+
+Each edit appends a revision holding a forward delta from the previous version
+(zlib-compressed JSON ops). Every REVISION_SNAPSHOT_EVERY versions, or once the
+deltas since the last snapshot outweigh it, a full snapshot is stored instead, so
+rebuilding any version replays a bounded chain from one query.
+
+Delta ops: ["set", path, value], ["del", path], ["trunc", path, length] and
+["splice", path, start, end, text] for edits inside long strings (a large body
+with a one-line change stores only that line).
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import copy
+import json
+import os
+import uuid
+import zlib
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from repository import collection_repo, environment_repo, request_repo
+
+REVISION_SNAPSHOT_EVERY = int(os.environ.get("REVISION_SNAPSHOT_EVERY", "25"))
+SPLICE_MIN_CHARS = 64  # shorter strings are simply replaced
+MAX_REVISIONS_LISTED = 200
+WRITE_ATTEMPTS = 5
+BATCH_SIZE = 500  # documents per query/insert in the bulk helpers
+DUPLICATE_KEY = 11000
+
+TRACKED_FIELDS = {
+    "request": (
+        "collection_id", "name", "method", "url", "headers", "params", "body", "auth",
+        "folder_path", "execution_policy", "mock_response",
+    ),
+    "collection": (
+        "name", "description", "color", "pre_request_script", "post_request_script", "folders", "execution_policy",
+    ),
+    "environment": ("name", "variables"),
+}
+REPOS = {"request": request_repo, "collection": collection_repo, "environment": environment_repo}
+
+Path = List[Any]
+
+
+# ============= Deltas =============
+
+def _encode(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":"), default=str).encode())
+
+
+def _decode(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(bytes(blob)))
+
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value, separators=(",", ":"), default=str))
+
+
+def _splice(path: Path, a: str, b: str) -> list:
+    """Replace only the changed middle of a long string"""
+    start = 0
+    limit = min(len(a), len(b))
+    while start < limit and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    return ["splice", path, start, end_a, b[start:end_b]]
+
+
+def make_delta(a: Any, b: Any, path: Optional[Path] = None) -> List[list]:
+    """Ops turning `a` into `b`; lists diff by position and fall back to a replacement when that is smaller"""
+    path = path or []
+    if isinstance(a, dict) and isinstance(b, dict):
+        ops = [["del", path + [key]] for key in a if key not in b]
+        for key, value in b.items():
+            if key in a:
+                ops += make_delta(a[key], value, path + [key])
+            else:
+                ops.append(["set", path + [key], value])
+        return ops
+    if isinstance(a, list) and isinstance(b, list):
+        ops = []
+        for i in range(min(len(a), len(b))):
+            ops += make_delta(a[i], b[i], path + [i])
+        if len(a) > len(b):
+            ops.append(["trunc", path, len(b)])
+        ops += [["set", path + [i], b[i]] for i in range(len(a), len(b))]
+        return ops if not ops or _size(ops) < _size(b) else [["set", path, b]]
+    if type(a) is type(b) and a == b:  # strict, so True -> 1 still counts as a change
+        return []
+    if isinstance(a, str) and isinstance(b, str) and len(b) >= SPLICE_MIN_CHARS:
+        return [_splice(path, a, b)]
+    return [["set", path, b]]
+
+
+def _parent(doc: Any, path: Path) -> Tuple[Any, Any]:
+    for key in path[:-1]:
+        doc = doc[key]
+    return doc, path[-1]
+
+
+def apply_delta(doc: dict, ops: List[list]) -> dict:
+    """Apply ops to a copy of doc"""
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        kind, path = op[0], op[1]
+        if kind == "set" and not path:
+            doc = copy.deepcopy(op[2])
+            continue
+        if kind == "trunc":
+            target = doc
+            for key in path:
+                target = target[key]
+            del target[op[2]:]
+            continue
+        parent, key = _parent(doc, path)
+        if kind == "set":
+            if isinstance(parent, list) and key == len(parent):
+                parent.append(op[2])
+            else:
+                parent[key] = op[2]
+        elif kind == "del":
+            del parent[key]
+        elif kind == "splice":
+            text = parent[key]
+            parent[key] = text[:op[2]] + op[4] + text[op[3]:]
+        else:
+            raise ValueError(f"Unknown delta op: {kind}")
+    return doc
+
+
+def tracked_state(kind: str, doc: dict) -> dict:
+    return json.loads(json.dumps({field: doc.get(field) for field in TRACKED_FIELDS[kind]}, default=str))
+
+
+# ============= Storage =============
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    await db.revisions.create_index([("kind", 1), ("doc_id", 1), ("version", -1)], unique=True)
+
+
+@dataclass
+class RevisionHead:
+    """Latest version of a document and the replay cost of its delta chain"""
+    kind: str
+    doc_id: str
+    org_id: str
+    version: int = 0
+    state: Optional[dict] = None
+    snapshot_version: int = 0
+    snapshot_bytes: int = 0
+    chain_bytes: int = 0
+
+
+def _replay(revisions: List[dict], version: Optional[int] = None) -> Tuple[dict, int, int, int]:
+    """(state, snapshot_version, snapshot_bytes, chain_bytes) from revisions sorted oldest first,
+    starting at a snapshot and stopping at `version` (the last one for None)"""
+    state, snapshot_version, snapshot_bytes, chain_bytes = None, 0, 0, 0
+    for revision in revisions:
+        if version is not None and revision["version"] > version:
+            break
+        if revision.get("snapshot") is not None:
+            state = _decode(revision["snapshot"])
+            snapshot_version, snapshot_bytes, chain_bytes = revision["version"], revision["stored_bytes"], 0
+        else:
+            state = apply_delta(state, _decode(revision["delta"]))
+            chain_bytes += revision["stored_bytes"]
+    return state, snapshot_version, snapshot_bytes, chain_bytes
+
+
+async def _chain(db: AsyncIOMotorDatabase, kind: str, doc_id: str, version: Optional[int] = None) -> List[dict]:
+    """Revisions from the nearest snapshot at or before `version` (latest for None) up to it, oldest first"""
+    query = {"kind": kind, "doc_id": doc_id, "snapshot": {"$ne": None}}
+    if version is not None:
+        query["version"] = {"$lte": version}
+    start = await db.revisions.find_one(query, {"_id": 0, "version": 1}, sort=[("version", -1)])
+    if not start:
+        return []
+    window = {"$gte": start["version"]}
+    if version is not None:
+        window["$lte"] = version
+    return await db.revisions.find(
+        {"kind": kind, "doc_id": doc_id, "version": window}, {"_id": 0}
+    ).sort("version", 1).to_list(length=None)
+
+
+async def load_head(db: AsyncIOMotorDatabase, kind: str, doc_id: str, org_id: str) -> RevisionHead:
+    revisions = await _chain(db, kind, doc_id)
+    if not revisions:
+        return RevisionHead(kind, doc_id, org_id)
+    state, snapshot_version, snapshot_bytes, chain_bytes = _replay(revisions)
+    return RevisionHead(kind, doc_id, org_id, revisions[-1]["version"], state, snapshot_version, snapshot_bytes, chain_bytes)
+
+
+async def track_revision(db: AsyncIOMotorDatabase, kind: str, doc_id: str, org_id: str) -> RevisionHead:
+    """Call before an update: loads the head, recording the current document as a baseline
+    when it has no history yet (documents that predate revision tracking)"""
+    head = await load_head(db, kind, doc_id, org_id)
+    if head.version == 0:
+        doc = await REPOS[kind].get(db, doc_id)
+        await record_revision(db, head, doc, doc.get("created_by"), action="baseline")
+    return head
+
+
+async def record_revision(
+    db: AsyncIOMotorDatabase,
+    head: RevisionHead,
+    doc: dict,
+    user_id: Optional[str],
+    action: str = "update",
+    restored_from: Optional[int] = None
+) -> Optional[dict]:
+    """Append the document's new state after `head`; returns the revision, or None when nothing changed.
+
+    Concurrent edits race for the next version number; the loser reloads the
+    head and diffs against what actually won.
+    """
+    state = tracked_state(head.kind, doc)
+    for _ in range(WRITE_ATTEMPTS):
+        revision = _next_revision(head, state, user_id, action, restored_from)
+        if revision is None:
+            return None
+        try:
+            await db.revisions.insert_one(revision)
+        except DuplicateKeyError:
+            head = await load_head(db, head.kind, head.doc_id, head.org_id)
+            continue
+        _advance(head, revision, state)
+        return _summary(revision)
+    raise HTTPException(status_code=409, detail="Document is being edited concurrently; retry")
+
+
+def _next_revision(
+    head: RevisionHead, state: dict, user_id: Optional[str], action: str, restored_from: Optional[int] = None
+) -> Optional[dict]:
+    """The revision that follows `head` for `state`, unsaved; None when nothing changed"""
+    ops = make_delta(head.state, state) if head.state is not None else None
+    if ops == []:
+        return None
+    version = head.version + 1
+    revision = {
+        "revision_id": f"rev_{uuid.uuid4().hex[:12]}",
+        "kind": head.kind,
+        "doc_id": head.doc_id,
+        "org_id": head.org_id,
+        "version": version,
+        "action": action,
+        "restored_from": restored_from,
+        "changed": sorted({op[1][0] for op in ops} if ops else state),
+        "author": user_id,
+        "created_at": datetime.now(timezone.utc),
+        "snapshot": None,
+        "delta": None,
+    }
+    delta = _encode(ops) if ops else None
+    if delta is None or version - head.snapshot_version >= REVISION_SNAPSHOT_EVERY or (
+        head.chain_bytes + len(delta) > head.snapshot_bytes
+    ):
+        revision["snapshot"] = _encode(state)
+        revision["stored"], revision["stored_bytes"] = "snapshot", len(revision["snapshot"])
+    else:
+        revision["delta"] = delta
+        revision["stored"], revision["stored_bytes"] = "delta", len(delta)
+    return revision
+
+
+def _advance(head: RevisionHead, revision: dict, state: dict):
+    revision.pop("_id", None)
+    head.version, head.state = revision["version"], state
+    if revision["snapshot"] is not None:
+        head.snapshot_version, head.snapshot_bytes, head.chain_bytes = revision["version"], revision["stored_bytes"], 0
+    else:
+        head.chain_bytes += revision["stored_bytes"]
+
+
+# ============= Bulk =============
+
+def _batches(items: list) -> List[list]:
+    return [items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
+
+
+async def load_heads(db: AsyncIOMotorDatabase, kind: str, docs: List[dict]) -> Dict[str, RevisionHead]:
+    """load_head for many documents (each needs its id field and org_id), a few queries per batch"""
+    id_field = REPOS[kind].id_field
+    heads = {doc[id_field]: RevisionHead(kind, doc[id_field], doc["org_id"]) for doc in docs}
+    for batch in _batches(list(heads)):
+        starts = {
+            group["_id"]: group["version"]
+            async for group in db.revisions.aggregate([
+                {"$match": {"kind": kind, "doc_id": {"$in": batch}, "snapshot": {"$ne": None}}},
+                {"$group": {"_id": "$doc_id", "version": {"$max": "$version"}}},
+            ])
+        }
+        if not starts:
+            continue
+        chains: Dict[str, List[dict]] = {}
+        async for revision in db.revisions.find(
+            {"kind": kind, "$or": [{"doc_id": doc_id, "version": {"$gte": version}} for doc_id, version in starts.items()]},
+            {"_id": 0}
+        ).sort([("doc_id", 1), ("version", 1)]):
+            chains.setdefault(revision["doc_id"], []).append(revision)
+        for doc_id, revisions in chains.items():
+            head = heads[doc_id]
+            head.state, head.snapshot_version, head.snapshot_bytes, head.chain_bytes = _replay(revisions)
+            head.version = revisions[-1]["version"]
+    return heads
+
+
+async def track_revisions(db: AsyncIOMotorDatabase, kind: str, docs: List[dict]) -> Dict[str, RevisionHead]:
+    """track_revision for a bulk write: call before it, with the documents it will touch"""
+    heads = await load_heads(db, kind, docs)
+    untracked = [doc_id for doc_id, head in heads.items() if head.version == 0]
+    id_field = REPOS[kind].id_field
+    for batch in _batches(untracked):
+        current = await db[REPOS[kind].collection].find({id_field: {"$in": batch}}, {"_id": 0}).to_list(length=None)
+        await record_revisions(db, kind, heads, current, None, action="baseline")
+    return heads
+
+
+async def record_revisions(
+    db: AsyncIOMotorDatabase,
+    kind: str,
+    heads: Dict[str, RevisionHead],
+    docs: List[dict],
+    user_id: Optional[str],
+    action: str = "update"
+) -> int:
+    """record_revision for many documents with batched inserts; returns how many were recorded.
+
+    Documents without a head start a new history. A None user_id attributes each
+    revision to the document's creator (baselines). Inserts that lose a race with a
+    concurrent edit fall back to record_revision, which reloads the head.
+    """
+    id_field = REPOS[kind].id_field
+    pending = []
+    for doc in docs:
+        head = heads.setdefault(doc[id_field], RevisionHead(kind, doc[id_field], doc["org_id"]))
+        head.org_id = doc["org_id"]  # moves can change the organization
+        state = tracked_state(kind, doc)
+        revision = _next_revision(head, state, user_id if user_id is not None else doc.get("created_by"), action)
+        if revision is not None:
+            pending.append((head, state, revision, doc))
+
+    recorded = 0
+    for batch in _batches(pending):
+        failed = set()
+        try:
+            await db.revisions.insert_many([revision for _, _, revision, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY for error in errors):
+                raise
+            failed = {error["index"] for error in errors}
+        for index, (head, state, revision, doc) in enumerate(batch):
+            if index in failed:
+                retried = await record_revision(db, head, doc, revision["author"], action)
+                recorded += retried is not None
+            else:
+                _advance(head, revision, state)
+                recorded += 1
+    return recorded
+
+
+async def record_created(db: AsyncIOMotorDatabase, kind: str, doc: dict, user_id: str) -> Optional[dict]:
+    head = RevisionHead(kind, doc[REPOS[kind].id_field], doc["org_id"])
+    return await record_revision(db, head, doc, user_id, action="create")
+
+
+SUMMARY_FIELDS = ("revision_id", "version", "action", "restored_from", "changed", "author", "created_at", "stored", "stored_bytes")
+
+
+def _summary(revision: dict) -> dict:
+    return {key: revision.get(key) for key in SUMMARY_FIELDS}
+
+
+async def list_revisions(db: AsyncIOMotorDatabase, kind: str, doc_id: str, limit: int = MAX_REVISIONS_LISTED) -> List[dict]:
+    """Newest first, without payloads"""
+    return await db.revisions.find(
+        {"kind": kind, "doc_id": doc_id}, {"_id": 0, **{key: 1 for key in SUMMARY_FIELDS}}
+    ).sort("version", -1).to_list(min(limit, MAX_REVISIONS_LISTED))
+
+
+async def revision_state(db: AsyncIOMotorDatabase, kind: str, doc_id: str, version: int) -> dict:
+    """Tracked fields as of `version`; 404 when it does not exist"""
+    revisions = await _chain(db, kind, doc_id, version)
+    if not revisions or revisions[-1]["version"] != version:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return _replay(revisions, version)[0]
+
+
+async def purge_revisions(db: AsyncIOMotorDatabase, kind: str, *doc_ids: str):
+    await db.revisions.delete_many({"kind": kind, "doc_id": {"$in": list(doc_ids)}})
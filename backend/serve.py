@@ -0,0 +1,25 @@
+"""Production entrypoint: runs server:app with auto-sized uvicorn workers.
+
+Usage: python serve.py  (HOST, PORT, WEB_CONCURRENCY, DRAIN_TIMEOUT from env)
+"""
+import os
+import uvicorn
+
+from lifecycle import worker_count, DRAIN_TIMEOUT_SECONDS
+
+
+def main():
+    workers = worker_count()
+
+    uvicorn.run(
+        "server:app",
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", "8000")),
+        workers=workers,
+        proxy_headers=True,
+        timeout_graceful_shutdown=DRAIN_TIMEOUT_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    main()
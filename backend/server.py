@@ -1,23 +1,26 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Request, Depends
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from typing import List
+from typing import List, Literal, Optional
 import uuid
 from datetime import datetime, timezone
-import requests as http_requests
-import time
-import json
+import asyncio
 
 from models import (
     User, Organization, OrganizationCreate, OrganizationUpdate, AddMember, UpdateMemberRole,
     Collection, CollectionCreate, CollectionUpdate,
-    Request as RequestModel, RequestCreate, RequestUpdate, RequestExecute,
-    History, Environment, EnvironmentCreate, EnvironmentUpdate, SsoAllowlistUpdate,
+    Request as RequestModel, RequestCreate, RequestUpdate, RequestExecute, Blob,
+    BulkRequestOperation, BulkResult, HarCapture, HarCaptureCreate, HarImport, HarReplay,
+    ResponseSnapshot, SnapshotSettings, CollectionRun, Revision,
+    History, HistoryRetention, HistoryRetentionUpdate, RateLimits, RateLimitsUpdate,
+    Monitor, MonitorCreate, MonitorUpdate, Workflow, WorkflowCreate, WorkflowUpdate, WorkflowRun, Environment, EnvironmentCreate, EnvironmentUpdate, SsoAllowlistUpdate,
     SessionExchange, GoogleAuth, KeyValue
 )
 from auth import (
@@ -26,26 +29,51 @@ from auth import (
 )
 from permissions import (
     get_user_role_in_org, check_org_permission, is_org_admin,
-    add_user_to_org, remove_user_from_org, update_user_role_in_org
+    add_user_to_org, add_user_to_orgs, add_users_to_org, remove_user_from_org, update_user_role_in_org
+)
+from analytics import history_analytics, ensure_indexes as ensure_analytics_indexes
+from rate_limit import create_limiter
+from events import create_event_bus
+from lifecycle import InFlightTracker, LeaderLease, Readiness, FAST_STARTUP
+from dispatch import ExecutionScheduler
+from monitors import MonitorScheduler, validate_schedule, next_run_at, run_monitor
+from workflows import validate_steps, run_workflow
+from outbound import create_session as create_http_session, transport_stats
+from blobs import RESPONSE_BLOB_TTL_SECONDS, BlobStore, iter_bytes
+from sso_allowlist import AllowlistIndex
+from bulk import apply_bulk
+from folder_tree import (
+    get_tree, parse_folder, record_moves, sync_declared_folders, ensure_indexes as ensure_tree_indexes
+)
+from snapshots import (
+    compare_snapshot, save_snapshot, list_snapshots, set_ignore_paths, run_collection, diff_json,
+    ensure_indexes as ensure_snapshot_indexes
+)
+from executor import response_summary, error_summary, decode_text, response_filename, RESPONSE_PREVIEW_MAX_BYTES
+from har import (
+    HarWriter, har_entry, create_capture, get_capture, import_har, export_har, iter_entries, replay_entries,
+    MAX_REPLAY_ENTRIES, ensure_indexes as ensure_har_indexes
+)
+from revisions import (
+    track_revision, record_revision, record_created, list_revisions, revision_state, purge_revisions,
+    ensure_indexes as ensure_revision_indexes
+)
+from policies import BreakerRegistry, resolve_policy, send_with_policy
+from response_filter import apply_filter, validate_filter, shutdown_jq_pool
+from responses import FastJSONResponse, CompressionMiddleware, etag_matches, model_projection, trusted_response
+from workspace import bump_workspace_version, load_workspace, workspace_version
+from repository import (
+    collection_repo, request_repo, environment_repo, monitor_repo, workflow_repo,
+    require_member, update_organization_as
+)
+from history_store import (
+    record_history, compaction_loop, get_retention_policy, set_retention_policy,
+    invalidate_retention_policy, load_body, ensure_indexes as ensure_history_indexes
 )
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
-# Create the main app without a prefix
-app = FastAPI()
-
-# Store db in app state for auth middleware
-app.state.db = db
-
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
-
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -53,27 +81,116 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Per-worker resources, created in lifespan() and read by handlers at call time
+client = None
+db = None
+limiter = None  # Rate limits and in-flight quotas for the execute proxy
+bus = None  # Cross-worker cache invalidation
+http_session = None  # Pooled keep-alive session for upstream calls
+scheduler = None  # Monitor scheduler (runs monitors on the leader only)
+dispatcher = None  # Priority thread pool for upstream calls: interactive > runner > monitor
+blob_store = None  # GridFS storage for file request bodies
+sso_allowlists = None  # In-memory email -> org index for the login path
+in_flight = InFlightTracker()
+readiness = Readiness()
+breakers = BreakerRegistry()  # Per-org, per-host circuit breakers shared by executes, runs and monitors
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client, db, limiter, bus, http_session, scheduler, dispatcher, blob_store, sso_allowlists, readiness
+
+    # MongoDB connection; minPoolSize keeps that many connections open ahead of traffic
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], minPoolSize=int(os.environ.get("MONGO_MIN_POOL_SIZE", "0")))
+    db = client[os.environ['DB_NAME']]
+    readiness = Readiness()
+
+    # Store db in app state for auth middleware
+    app.state.db = db
+
+    limiter = create_limiter(db)
+    http_session = create_http_session()
+    bus = create_event_bus(db)
+    bus.subscribe("history_retention", invalidate_retention_policy)
+    bus.subscribe("rate_limits", limiter.invalidate)
+    sso_allowlists = AllowlistIndex(db)
+    bus.subscribe("sso_allowlist", sso_allowlists.refresh_org)
+
+    blob_store = BlobStore(db)
+    dispatcher = ExecutionScheduler()
+    scheduler = MonitorScheduler(db, lambda: http_session, in_flight, blob_store, dispatcher=dispatcher, breakers=breakers, limiter=limiter)
+    compaction_lease = LeaderLease(db, "history-compaction")
+    blob_expiry_lease = LeaderLease(db, "blob-expiry")
+
+    async def warm_up():
+        await readiness.step("mongo", client.admin.command("ping"))
+        # Independent collections; one round-trip of latency instead of one per collection
+        await readiness.step("indexes", asyncio.gather(
+            ensure_analytics_indexes(db), ensure_history_indexes(db), limiter.ensure_indexes(),
+            scheduler.ensure_indexes(), blob_store.ensure_indexes(), ensure_snapshot_indexes(db),
+            ensure_tree_indexes(db), ensure_har_indexes(db), ensure_revision_indexes(db),
+            sso_allowlists.ensure_indexes()
+        ))
+        await readiness.step("sso_allowlists", sso_allowlists.load())
+        await readiness.step("event_bus", bus.start())
+        if os.environ.get("MONITORS_ENABLED", "true").lower() in ["1", "true", "yes"]:
+            await readiness.step("monitors", scheduler.start())
+        readiness.finish()
+        logger.info(f"Ready after {readiness.steps['total']}ms")
+
+    async def warm_up_in_background():
+        try:
+            await warm_up()
+        except Exception as e:
+            logger.error(f"Startup warm-up failed: {e}")
+
+    background_tasks = []
+    if FAST_STARTUP:
+        background_tasks.append(asyncio.create_task(warm_up_in_background()))
+    else:
+        await warm_up()
+    background_tasks.append(asyncio.create_task(compaction_loop(db, compaction_lease)))
+    background_tasks.append(asyncio.create_task(blob_store.expiry_loop(blob_expiry_lease)))
+
+    try:
+        yield
+    finally:
+        # uvicorn has already drained HTTP requests; let background upstream calls
+        # (monitor runs) finish before tearing down pools
+        if not await in_flight.drain():
+            logger.warning(f"Shutting down with {in_flight.count} upstream calls still in flight")
+        await scheduler.stop()
+        for task in background_tasks:
+            task.cancel()
+        await bus.stop()
+        dispatcher.shutdown()
+        shutdown_jq_pool()
+        http_session.close()
+        client.close()
+
+
+# Create the main app without a prefix
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
+
+# Create a router with the /api prefix
+api_router = APIRouter(prefix="/api")
+
 
 # ============= Authentication Endpoints =============
 
-async def get_allowlisted_orgs_or_raise(email: str):
-    """Return allowlisted orgs or raise if SSO allowlist blocks this email."""
-    allowlist_count = await db.org_sso_allowlists.count_documents({"emails": {"$exists": True, "$ne": []}})
-    if allowlist_count == 0:
+async def get_allowlisted_orgs_or_raise(email: str) -> List[str]:
+    """Return allowlisted org ids or raise if SSO allowlist blocks this email."""
+    if not await sso_allowlists.has_allowlists():
         return []
 
-    allowed_orgs = await db.org_sso_allowlists.find(
-        {"emails": email},
-        {"_id": 0, "org_id": 1}
-    ).to_list(length=None)
-
-    if allowed_orgs:
-        return allowed_orgs
+    allowed_org_ids = await sso_allowlists.orgs_for(email)
+    if allowed_org_ids:
+        return allowed_org_ids
 
     # Allow org owners/admins to avoid lockout
     existing_user = await db.users.find_one({"email": email}, {"_id": 0, "user_id": 1})
     if existing_user:
-        allowlisted_org_ids = await db.org_sso_allowlists.distinct("org_id")
+        allowlisted_org_ids = await sso_allowlists.allowlisted_org_ids()
         admin_org = await db.organizations.find_one(
             {
                 "org_id": {"$in": allowlisted_org_ids},
@@ -98,28 +215,13 @@ async def auth_session(session_data: SessionExchange):
         if not email:
             raise HTTPException(status_code=400, detail="Email not found in auth response")
 
-        allowed_orgs = await get_allowlisted_orgs_or_raise(email)
+        allowed_org_ids = await get_allowlisted_orgs_or_raise(email)
 
         # Create or update user
         user = await create_or_update_user(db, user_data)
 
         # Auto-join user to allowlisted orgs (view role) if needed
-        for entry in allowed_orgs:
-            org_id = entry.get("org_id")
-            if not org_id:
-                continue
-            org = await db.organizations.find_one(
-                {"org_id": org_id},
-                {"_id": 0, "members": 1}
-            )
-            if not org:
-                continue
-            if user["user_id"] in (org.get("members") or []):
-                continue
-            try:
-                await add_user_to_org(db, org_id, user["user_id"], role="view")
-            except HTTPException:
-                pass
+        await add_user_to_orgs(db, allowed_org_ids, user["user_id"], role="view")
         
         # Create session
         session_token = user_data.get("session_token")
@@ -162,7 +264,7 @@ async def auth_google(payload: GoogleAuth):
         if not email:
             raise HTTPException(status_code=400, detail="Email not found in Google response")
 
-        allowed_orgs = await get_allowlisted_orgs_or_raise(email)
+        allowed_org_ids = await get_allowlisted_orgs_or_raise(email)
 
         user = await create_or_update_user(db, {
             "email": email,
@@ -171,22 +273,7 @@ async def auth_google(payload: GoogleAuth):
         })
 
         # Auto-join user to allowlisted orgs (view role) if needed
-        for entry in allowed_orgs:
-            org_id = entry.get("org_id")
-            if not org_id:
-                continue
-            org = await db.organizations.find_one(
-                {"org_id": org_id},
-                {"_id": 0, "members": 1}
-            )
-            if not org:
-                continue
-            if user["user_id"] in (org.get("members") or []):
-                continue
-            try:
-                await add_user_to_org(db, org_id, user["user_id"], role="view")
-            except HTTPException:
-                pass
+        await add_user_to_orgs(db, allowed_org_ids, user["user_id"], role="view")
 
         session_token = f"session_{uuid.uuid4().hex}"
         await create_session(db, user["user_id"], session_token)
@@ -299,18 +386,10 @@ async def update_organization(org_id: str, org_data: OrganizationUpdate, request
     """Update organization (Admin only)"""
     user = await get_current_user(request)
     
-    # Check admin permission
-    await check_org_permission(db, user["user_id"], org_id, "admin")
-    
     update_fields = {k: v for k, v in org_data.dict().items() if v is not None}
     
-    await db.organizations.update_one(
-        {"org_id": org_id},
-        {"$set": update_fields}
-    )
-    
-    updated_org = await db.organizations.find_one({"org_id": org_id}, {"_id": 0})
-    return updated_org
+    # Admin check is part of the update filter
+    return await update_organization_as(db, org_id, user["user_id"], "admin", update_fields)
 
 
 @api_router.delete("/organizations/{org_id}")
@@ -360,6 +439,7 @@ async def add_member(org_id: str, member_data: AddMember, request: Request):
          }},
         upsert=True
     )
+    await bus.publish("sso_allowlist", org_id)
 
     # Find or create user by email (invite flow)
     member = await db.users.find_one({"email": email}, {"_id": 0})
@@ -449,21 +529,14 @@ async def update_sso_allowlist(org_id: str, payload: SsoAllowlistUpdate, request
         upsert=True
     )
 
+    await bus.publish("sso_allowlist", org_id)
+
     # Auto-add allowlisted users (if they already exist) as view members
     if cleaned_emails:
-        org = await db.organizations.find_one({"org_id": org_id}, {"_id": 0, "members": 1, "member_roles": 1})
-        existing_member_ids = set(org.get("members") or [])
-        for email in cleaned_emails:
-            member = await db.users.find_one({"email": email}, {"_id": 0, "user_id": 1})
-            if not member:
-                continue
-            user_id = member["user_id"]
-            if user_id in existing_member_ids:
-                continue
-            try:
-                await add_user_to_org(db, org_id, user_id, role="view")
-            except HTTPException:
-                pass
+        existing_users = await db.users.find(
+            {"email": {"$in": cleaned_emails}}, {"_id": 0, "user_id": 1}
+        ).to_list(length=None)
+        await add_users_to_org(db, org_id, [u["user_id"] for u in existing_users], role="view")
     return {"emails": cleaned_emails}
 
 
@@ -509,6 +582,21 @@ async def get_my_role(org_id: str, request: Request):
     return {"role": role, "user_id": user["user_id"]}
 
 
+@api_router.get("/organizations/{org_id}/bootstrap")
+async def get_workspace_bootstrap(org_id: str, request: Request):
+    """Role, collections, requests and environments in one call (supports If-None-Match)"""
+    user = await get_current_user(request)
+    
+    # The version is read before the data, so the payload is never older than its tag
+    role, etag = await workspace_version(db, org_id, user["user_id"])
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    workspace = await load_workspace(db, org_id)
+    return FastJSONResponse(content={"role": role, "user_id": user["user_id"], **workspace}, headers=headers)
+
+
 # ============= Collection Endpoints =============
 
 @api_router.get("/organizations/{org_id}/collections", response_model=List[Collection])
@@ -517,16 +605,14 @@ async def get_collections(org_id: str, request: Request):
     user = await get_current_user(request)
     
     # Verify access
-    org = await db.organizations.find_one({"org_id": org_id, "members": user["user_id"]})
-    if not org:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_member(db, org_id, user["user_id"])
     
     collections = await db.collections.find(
         {"org_id": org_id},
-        {"_id": 0}
+        model_projection(Collection)
     ).to_list(100)
     
-    return collections
+    return trusted_response(Collection, collections)
 
 
 @api_router.post("/organizations/{org_id}/collections", response_model=Collection)
@@ -547,11 +633,14 @@ async def create_collection(org_id: str, coll_data: CollectionCreate, request: R
         "pre_request_script": coll_data.pre_request_script,
         "post_request_script": coll_data.post_request_script,
         "folders": coll_data.folders or [],
+        "execution_policy": coll_data.execution_policy.dict() if coll_data.execution_policy else None,
         "created_by": user["user_id"],
         "created_at": datetime.now(timezone.utc)
     }
     
     await db.collections.insert_one(new_collection)
+    await record_created(db, "collection", new_collection, user["user_id"])
+    await bump_workspace_version(db, [org_id])
     return new_collection
 
 
@@ -560,20 +649,10 @@ async def get_collection(collection_id: str, request: Request):
     """Get collection details"""
     user = await get_current_user(request)
     
-    collection = await db.collections.find_one(
-        {"collection_id": collection_id},
-        {"_id": 0}
-    )
-    
-    if not collection:
-        raise HTTPException(status_code=404, detail="Collection not found")
+    collection = await collection_repo.get(db, collection_id)
     
     # Verify access
-    org = await db.organizations.find_one(
-        {"org_id": collection["org_id"], "members": user["user_id"]}
-    )
-    if not org:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_member(db, collection["org_id"], user["user_id"])
     
     return collection
 
@@ -583,21 +662,19 @@ async def update_collection(collection_id: str, coll_data: CollectionUpdate, req
     """Update collection (Edit or Admin required)"""
     user = await get_current_user(request)
     
-    collection = await db.collections.find_one({"collection_id": collection_id})
-    if not collection:
-        raise HTTPException(status_code=404, detail="Collection not found")
+    collection = await collection_repo.get(db, collection_id, {"_id": 0, "org_id": 1})
     
     # Check edit permission
     await check_org_permission(db, user["user_id"], collection["org_id"], "edit")
     
     update_fields = {k: v for k, v in coll_data.dict().items() if v is not None}
     
-    await db.collections.update_one(
-        {"collection_id": collection_id},
-        {"$set": update_fields}
-    )
-    
-    updated_coll = await db.collections.find_one({"collection_id": collection_id}, {"_id": 0})
+    head = await track_revision(db, "collection", collection_id, collection["org_id"])
+    updated_coll = await collection_repo.update(db, collection_id, update_fields, guard={"org_id": collection["org_id"]})
+    await record_revision(db, head, updated_coll, user["user_id"])
+    await bump_workspace_version(db, [collection["org_id"]])
+    if "folders" in update_fields:
+        await sync_declared_folders(db, updated_coll)
     return updated_coll
 
 
@@ -606,17 +683,67 @@ async def delete_collection(collection_id: str, request: Request):
     """Delete collection (Edit or Admin required)"""
     user = await get_current_user(request)
     
-    collection = await db.collections.find_one({"collection_id": collection_id})
-    if not collection:
-        raise HTTPException(status_code=404, detail="Collection not found")
+    collection = await collection_repo.get(db, collection_id, {"_id": 0, "org_id": 1})
     
     # Check edit permission
     await check_org_permission(db, user["user_id"], collection["org_id"], "edit")
     
-    await db.collections.delete_one({"collection_id": collection_id})
+    await collection_repo.delete(db, collection_id, guard={"org_id": collection["org_id"]}, projection={"_id": 1})
+    await db.folder_nodes.delete_many({"collection_id": collection_id})
+    await purge_revisions(db, "collection", collection_id)
+    await bump_workspace_version(db, [collection["org_id"]])
     return {"message": "Collection deleted successfully"}
 
 
+@api_router.get("/collections/{collection_id}/tree")
+async def get_collection_tree(
+    collection_id: str,
+    request: Request,
+    path: Optional[str] = None,
+    depth: int = 1,
+    limit: int = 200,
+    skip: int = 0
+):
+    """Folder tree of a collection, expanded `depth` levels below `path` ("Users / Admin"), with counts"""
+    user = await get_current_user(request)
+    
+    collection = await db.collections.find_one({"collection_id": collection_id}, {"_id": 0})
+    if not collection:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    
+    await check_org_permission(db, user["user_id"], collection["org_id"], "view")
+    
+    return await get_tree(db, collection, parse_folder(path), depth, min(max(limit, 1), 1000), max(skip, 0))
+
+
+@api_router.post("/collections/{collection_id}/run")
+async def run_collection_now(collection_id: str, run_data: CollectionRun, request: Request):
+    """Run all requests in a collection and diff each response against its snapshot baseline"""
+    user = await get_current_user(request)
+    
+    collection = await db.collections.find_one({"collection_id": collection_id}, {"_id": 0})
+    if not collection:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    
+    # Replacing baselines changes shared state, so it needs edit permission
+    await check_org_permission(db, user["user_id"], collection["org_id"], "edit" if run_data.update_snapshots else "view")
+    
+    har = None
+    if run_data.capture_har:
+        capture = await create_capture(
+            db, collection["org_id"], user["user_id"], f"{collection['name']} run", source="collection_run"
+        )
+        har = HarWriter(db, capture["capture_id"])
+    
+    async with in_flight.track():
+        return await run_collection(
+            db, http_session, collection, user["user_id"],
+            env_id=run_data.env_id, variables=run_data.variables,
+            update_snapshots=run_data.update_snapshots, blob_store=blob_store, har=har,
+            pool=dispatcher.lane("runner", collection["org_id"]), breakers=breakers, limiter=limiter
+        )
+
+
 # ============= Request Endpoints =============
 
 @api_router.get("/organizations/{org_id}/requests", response_model=List[RequestModel])
@@ -625,16 +752,14 @@ async def get_org_requests(org_id: str, request: Request):
     user = await get_current_user(request)
     
     # Verify access
-    org = await db.organizations.find_one({"org_id": org_id, "members": user["user_id"]})
-    if not org:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_member(db, org_id, user["user_id"])
     
     requests = await db.requests.find(
         {"org_id": org_id},
-        {"_id": 0}
+        model_projection(RequestModel)
     ).to_list(length=None)
     
-    return requests
+    return trusted_response(RequestModel, requests)
 
 
 @api_router.post("/requests", response_model=RequestModel)
@@ -645,13 +770,13 @@ async def create_request(req_data: RequestCreate, request: Request):
     # Get org_id from collection or require it
     org_id = None
     if req_data.collection_id:
-        collection = await db.collections.find_one({"collection_id": req_data.collection_id})
+        collection = await db.collections.find_one({"collection_id": req_data.collection_id}, {"_id": 0, "org_id": 1})
         if collection:
             org_id = collection["org_id"]
     
     if not org_id:
         # Get user's first organization
-        org = await db.organizations.find_one({"members": user["user_id"]}, {"_id": 0})
+        org = await db.organizations.find_one({"members": user["user_id"]}, {"_id": 0, "org_id": 1})
         if not org:
             raise HTTPException(status_code=400, detail="No organization found")
         org_id = org["org_id"]
@@ -674,12 +799,19 @@ async def create_request(req_data: RequestCreate, request: Request):
         "body": req_data.body.dict(),
         "auth": req_data.auth.dict(),
         "folder_path": req_data.folder_path or [],
+        "execution_policy": req_data.execution_policy.dict() if req_data.execution_policy else None,
+        "mock_response": req_data.mock_response.dict() if req_data.mock_response else None,
         "created_by": user["user_id"],
         "created_at": now,
         "updated_at": now
     }
     
     await db.requests.insert_one(new_request)
+    await record_created(db, "request", new_request, user["user_id"])
+    await record_moves(db, [(None, (new_request["collection_id"], new_request["folder_path"]))])
+    await bump_workspace_version(db, [org_id])
+    if new_request["mock_response"]:
+        await bus.publish("mock_routes", [new_request["collection_id"]])
     return new_request
 
 
@@ -688,20 +820,10 @@ async def get_request(request_id: str, request: Request):
     """Get request details"""
     user = await get_current_user(request)
     
-    req = await db.requests.find_one(
-        {"request_id": request_id},
-        {"_id": 0}
-    )
-    
-    if not req:
-        raise HTTPException(status_code=404, detail="Request not found")
+    req = await request_repo.get(db, request_id)
     
     # Verify access
-    org = await db.organizations.find_one(
-        {"org_id": req["org_id"], "members": user["user_id"]}
-    )
-    if not org:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_member(db, req["org_id"], user["user_id"])
     
     return req
 
@@ -711,9 +833,9 @@ async def update_request(request_id: str, req_data: RequestUpdate, request: Requ
     """Update request (Edit or Admin required)"""
     user = await get_current_user(request)
     
-    req = await db.requests.find_one({"request_id": request_id})
-    if not req:
-        raise HTTPException(status_code=404, detail="Request not found")
+    req = await request_repo.get(
+        db, request_id, {"_id": 0, "org_id": 1, "collection_id": 1, "folder_path": 1, "mock_response": 1}
+    )
     
     # Check edit permission
     await check_org_permission(db, user["user_id"], req["org_id"], "edit")
@@ -730,12 +852,17 @@ async def update_request(request_id: str, req_data: RequestUpdate, request: Requ
     
     update_fields["updated_at"] = datetime.now(timezone.utc)
     
-    await db.requests.update_one(
-        {"request_id": request_id},
-        {"$set": update_fields}
-    )
-    
-    updated_req = await db.requests.find_one({"request_id": request_id}, {"_id": 0})
+    head = await track_revision(db, "request", request_id, req["org_id"])
+    updated_req = await request_repo.update(db, request_id, update_fields, guard={"org_id": req["org_id"]})
+    await record_revision(db, head, updated_req, user["user_id"])
+    await record_moves(db, [(
+        (req.get("collection_id"), req.get("folder_path")),
+        (updated_req.get("collection_id"), updated_req.get("folder_path"))
+    )])
+    await bump_workspace_version(db, [req["org_id"]])
+    if req.get("mock_response") or updated_req.get("mock_response"):
+        # Method, URL or collection changes move the route too
+        await bus.publish("mock_routes", [req.get("collection_id"), updated_req.get("collection_id")])
     return updated_req
 
 
@@ -744,103 +871,356 @@ async def delete_request(request_id: str, request: Request):
     """Delete request (Edit or Admin required)"""
     user = await get_current_user(request)
     
-    req = await db.requests.find_one({"request_id": request_id})
-    if not req:
-        raise HTTPException(status_code=404, detail="Request not found")
+    req = await request_repo.get(db, request_id, {"_id": 0, "org_id": 1})
     
     # Check edit permission
     await check_org_permission(db, user["user_id"], req["org_id"], "edit")
     
-    await db.requests.delete_one({"request_id": request_id})
+    # The deleted document still says where it was, for the folder counts
+    req = await request_repo.delete(
+        db, request_id, guard={"org_id": req["org_id"]},
+        projection={"_id": 0, "org_id": 1, "collection_id": 1, "folder_path": 1, "mock_response": 1}
+    )
+    await record_moves(db, [((req.get("collection_id"), req.get("folder_path")), None)])
+    await purge_revisions(db, "request", request_id)
+    await bump_workspace_version(db, [req["org_id"]])
+    if req.get("mock_response"):
+        await bus.publish("mock_routes", [req.get("collection_id")])
     return {"message": "Request deleted successfully"}
 
 
+@api_router.post("/requests/bulk", response_model=BulkResult)
+async def bulk_requests(op: BulkRequestOperation, request: Request):
+    """Move, copy, delete or update many requests at once (Edit or Admin required)"""
+    user = await get_current_user(request)
+    result = await apply_bulk(db, user["user_id"], op)
+    collection_ids = result.pop("collection_ids")
+    if collection_ids:
+        await bus.publish("mock_routes", collection_ids)
+    return result
+
+
+async def stored_execution_policies(request_id: str, org_id: str) -> list:
+    """Collection and request policy layers for a saved request, lowest precedence first"""
+    if not request_id or not org_id:
+        return []
+    req = await db.requests.find_one(
+        {"request_id": request_id, "org_id": org_id},
+        {"_id": 0, "execution_policy": 1, "collection_id": 1}
+    )
+    if not req:
+        return []
+    layers = []
+    if req.get("collection_id"):
+        collection = await db.collections.find_one(
+            {"collection_id": req["collection_id"]},
+            {"_id": 0, "execution_policy": 1}
+        )
+        layers.append((collection or {}).get("execution_policy"))
+    layers.append(req.get("execution_policy"))
+    return layers
+
+
 @api_router.post("/requests/execute")
 async def execute_request(exec_data: RequestExecute, request: Request):
     """Execute HTTP request as proxy"""
     user = await get_current_user(request)
     
+    # Recording into org history requires membership
+    role = None
+    if exec_data.org_id:
+        role = await check_org_permission(db, user["user_id"], exec_data.org_id, "view")
+    
+    if exec_data.snapshot and not (exec_data.org_id and exec_data.request_id):
+        raise HTTPException(status_code=400, detail="Snapshots require org_id and request_id")
+    if exec_data.snapshot == "save":
+        await check_org_permission(db, user["user_id"], exec_data.org_id, "edit")
+    response_filter = exec_data.filter.dict() if exec_data.filter else None
+    if response_filter:
+        validate_filter(response_filter)
+    if exec_data.har_capture_id:
+        if not exec_data.org_id:
+            raise HTTPException(status_code=400, detail="HAR capture requires org_id")
+        await get_har_capture_or_404(exec_data.har_capture_id, exec_data.org_id, user["user_id"], "edit")
+    
+    policy = resolve_policy(
+        *await stored_execution_policies(exec_data.request_id, exec_data.org_id),
+        exec_data.policy.dict() if exec_data.policy else None
+    )
+    open_blob = await blob_store.opener_for(exec_data.org_id, exec_data.body.dict())
+    
     try:
-        # Build headers
-        headers = {}
-        for h in exec_data.headers:
-            if h.enabled:
-                headers[h.key] = h.value
-        
-        # Build params
-        params = {}
-        for p in exec_data.params:
-            if p.enabled:
-                params[p.key] = p.value
-        
-        # Build auth
-        auth = None
-        if exec_data.auth.type == "basic":
-            auth = (exec_data.auth.username, exec_data.auth.password)
-        elif exec_data.auth.type == "bearer":
-            headers["Authorization"] = f"Bearer {exec_data.auth.token}"
-        elif exec_data.auth.type == "apikey":
-            headers[exec_data.auth.key] = exec_data.auth.value
+        # Execute request off the event loop, within the caller's quotas
+        async with in_flight.track(), limiter.guard(user["user_id"], exec_data.org_id, exec_data.url):
+            response, elapsed_time, policy_report = await send_with_policy(
+                http_session, exec_data.dict(), policy, breakers, open_blob,
+                pool=dispatcher.lane("interactive", exec_data.org_id), org_id=exec_data.org_id
+            )
         
-        # Build body
-        data = None
-        json_data = None
-        if exec_data.body.type == "json" and exec_data.body.content:
-            try:
-                json_data = json.loads(exec_data.body.content)
-            except:
-                pass
-        elif exec_data.body.type in ["form", "raw"] and exec_data.body.content:
-            data = exec_data.body.content
+        if exec_data.org_id:
+            await record_history(
+                db, exec_data.org_id, user["user_id"], exec_data.method, exec_data.url,
+                response.status_code, elapsed_time, request_id=exec_data.request_id,
+                body=response.content, size=len(response.content)
+            )
         
-        # Execute request
-        start_time = time.time()
-        response = http_requests.request(
-            method=exec_data.method,
-            url=exec_data.url,
-            headers=headers,
-            params=params,
-            json=json_data,
-            data=data,
-            auth=auth,
-            timeout=30
+        # A filtered body is parsed by the filter itself; skip decoding the whole document here
+        result = response_summary(
+            response, elapsed_time, parse_body=response_filter is None, max_bytes=RESPONSE_PREVIEW_MAX_BYTES
         )
-        elapsed_time = int((time.time() - start_time) * 1000)  # ms
-        
-        # Parse response
-        try:
-            response_body = response.json()
-        except:
-            response_body = response.text
-        
-        # Calculate size
-        size_bytes = len(response.content)
-        if size_bytes < 1024:
-            size = f"{size_bytes} B"
-        elif size_bytes < 1024 * 1024:
-            size = f"{size_bytes / 1024:.1f} KB"
-        else:
-            size = f"{size_bytes / (1024 * 1024):.1f} MB"
-        
-        return {
-            "status": response.status_code,
-            "statusText": response.reason,
-            "time": elapsed_time,
-            "size": size,
-            "headers": dict(response.headers),
-            "body": response_body
-        }
+        result["policy"] = policy_report
+        result["connection"] = getattr(response, "transport", None)
+        if response_filter and result["content"]["kind"] != "binary":
+            result["body"], result["filter"] = await run_in_threadpool(apply_filter, response_filter, response.content)
+            if "error" in result["filter"] and result["content"]["kind"] != "json":
+                result["body"] = decode_text(response.content, result["content"]["charset"], RESPONSE_PREVIEW_MAX_BYTES)
+        if result["content"]["kind"] == "binary" and result["body"] is None and role in ("edit", "admin"):
+            # Too large to inline: keep it as a temporary org file the browser can download
+            blob = await blob_store.put(
+                exec_data.org_id, user["user_id"], iter_bytes(response.content),
+                filename=response_filename(response), content_type=result["content"]["mime_type"],
+                expires_in=RESPONSE_BLOB_TTL_SECONDS
+            )
+            result["content"]["blob_id"] = blob["blob_id"]
+            result["content"]["blob_expires_at"] = blob.get("expires_at")
+        if exec_data.snapshot == "save":
+            await save_snapshot(
+                db, exec_data.org_id, exec_data.request_id, exec_data.env_id,
+                response.status_code, result["headers"], response.content, user["user_id"]
+            )
+        elif exec_data.snapshot == "compare":
+            result["diff"] = await compare_snapshot(
+                db, exec_data.org_id, exec_data.request_id, exec_data.env_id,
+                response.status_code, response.content
+            )
+        if exec_data.har_capture_id:
+            writer = HarWriter(db, exec_data.har_capture_id)
+            await writer.add(await run_in_threadpool(har_entry, response, elapsed_time, exec_data.request_id))
+            await writer.flush()
+            result["har_capture_id"] = exec_data.har_capture_id
+        return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Request execution error: {e}")
-        return {
-            "status": 0,
-            "statusText": "Error",
-            "time": 0,
-            "size": "0 B",
-            "headers": {},
-            "body": {"error": str(e)}
-        }
+        if exec_data.org_id:
+            try:
+                await record_history(
+                    db, exec_data.org_id, user["user_id"], exec_data.method, exec_data.url,
+                    0, 0, request_id=exec_data.request_id
+                )
+            except Exception as history_error:
+                logger.error(f"History recording error: {history_error}")
+        result = error_summary(e)
+        if hasattr(e, "report"):
+            result["policy"] = e.report
+        return result
+
+
+@api_router.get("/organizations/{org_id}/rate-limits", response_model=RateLimits)
+async def get_rate_limits(org_id: str, request: Request):
+    """Get execute rate limits for organization"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "view")
+
+    return await limiter.get_limits(org_id)
+
+
+@api_router.put("/organizations/{org_id}/rate-limits", response_model=RateLimits)
+async def update_rate_limits(org_id: str, payload: RateLimitsUpdate, request: Request):
+    """Update execute rate limits for organization (Admin only)"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "admin")
+
+    limits = await limiter.set_limits(org_id, payload.dict(), user["user_id"])
+    await bus.publish("rate_limits", org_id)
+    return limits
+
+
+@api_router.get("/executions/metrics")
+async def get_execution_metrics(request: Request):
+    """Upstream call queue depth, wait times and connection reuse, for this worker"""
+    await get_current_user(request)
+
+    return {"worker": bus.worker_id, **dispatcher.metrics(), "transport": transport_stats(http_session)}
+
+
+# ============= Snapshot Endpoints =============
+
+async def get_request_or_404(request_id: str) -> dict:
+    return await request_repo.get(db, request_id, {"_id": 0, "request_id": 1, "org_id": 1})
+
+
+@api_router.get("/requests/{request_id}/snapshots", response_model=List[ResponseSnapshot])
+async def get_request_snapshots(request_id: str, request: Request):
+    """List response baselines for a request (one per environment)"""
+    user = await get_current_user(request)
+    req = await get_request_or_404(request_id)
+    await check_org_permission(db, user["user_id"], req["org_id"], "view")
+
+    return await list_snapshots(db, req["org_id"], request_id)
+
+
+@api_router.put("/requests/{request_id}/snapshots/settings", response_model=ResponseSnapshot)
+async def update_snapshot_settings(request_id: str, settings: SnapshotSettings, request: Request):
+    """Set the paths ignored when diffing against a baseline (Edit or Admin required)"""
+    user = await get_current_user(request)
+    req = await get_request_or_404(request_id)
+    await check_org_permission(db, user["user_id"], req["org_id"], "edit")
+
+    snapshot = await set_ignore_paths(db, req["org_id"], request_id, settings.env_id, settings.ignore_paths)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return snapshot
+
+
+@api_router.delete("/requests/{request_id}/snapshots")
+async def delete_snapshot(request_id: str, request: Request, env_id: Optional[str] = None):
+    """Delete the baseline for a request and environment (Edit or Admin required)"""
+    user = await get_current_user(request)
+    req = await get_request_or_404(request_id)
+    await check_org_permission(db, user["user_id"], req["org_id"], "edit")
+
+    result = await db.response_snapshots.delete_one(
+        {"org_id": req["org_id"], "request_id": request_id, "env_id": env_id}
+    )
+    if not result.deleted_count:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return {"message": "Snapshot deleted successfully"}
+
+
+# ============= HAR Endpoints =============
+
+async def get_har_capture_or_404(capture_id: str, org_id: Optional[str], user_id: str, required_role: str) -> dict:
+    """Load a capture and check the caller's role in its org; org_id, when given, must match"""
+    capture = await get_capture(db, capture_id)
+    if org_id is not None and capture["org_id"] != org_id:
+        raise HTTPException(status_code=404, detail="HAR capture not found")
+    await check_org_permission(db, user_id, capture["org_id"], required_role)
+    return capture
+
+
+@api_router.post("/organizations/{org_id}/har-captures", response_model=HarCapture)
+async def create_har_capture(org_id: str, payload: HarCaptureCreate, request: Request):
+    """Start an empty HAR capture that executes can append to (Edit or Admin required)"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "edit")
+
+    return await create_capture(db, org_id, user["user_id"], payload.name)
+
+
+@api_router.post("/organizations/{org_id}/har-captures/import", response_model=HarCapture)
+async def import_har_capture(org_id: str, payload: HarImport, request: Request):
+    """Store an uploaded HAR document as a capture (Edit or Admin required)"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "edit")
+
+    return await import_har(db, org_id, user["user_id"], payload.har, payload.name)
+
+
+@api_router.get("/organizations/{org_id}/har-captures", response_model=List[HarCapture])
+async def list_har_captures(org_id: str, request: Request):
+    """List an organization's HAR captures, newest first"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "view")
+
+    return await db.har_captures.find({"org_id": org_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
+
+
+@api_router.get("/har-captures/{capture_id}/har")
+async def download_har_capture(capture_id: str, request: Request, redact: bool = True):
+    """Download a capture as a HAR 1.2 file; credentials are masked unless redact=false (Edit or Admin)"""
+    user = await get_current_user(request)
+    capture = await get_har_capture_or_404(capture_id, None, user["user_id"], "view" if redact else "edit")
+
+    return StreamingResponse(
+        export_har(db, capture, redacted=redact),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{capture_id}.har"'}
+    )
+
+
+@api_router.delete("/har-captures/{capture_id}")
+async def delete_har_capture(capture_id: str, request: Request):
+    """Delete a capture and its stored entries (Edit or Admin required)"""
+    user = await get_current_user(request)
+    await get_har_capture_or_404(capture_id, None, user["user_id"], "edit")
+
+    await db.har_captures.delete_one({"capture_id": capture_id})
+    await db.har_chunks.delete_many({"capture_id": capture_id})
+    return {"message": "HAR capture deleted successfully"}
+
+
+@api_router.post("/har-captures/{capture_id}/replay")
+async def replay_har_capture(capture_id: str, replay: HarReplay, request: Request):
+    """Re-issue a capture's requests and report latency deltas against the recording (Edit or Admin required)"""
+    user = await get_current_user(request)
+    # Replay re-sends the stored credentials, which only editors may read unredacted
+    capture = await get_har_capture_or_404(capture_id, None, user["user_id"], "edit")
+    if replay.timing not in ("original", "none"):
+        raise HTTPException(status_code=400, detail="timing must be 'original' or 'none'")
+    if capture["entry_count"] > MAX_REPLAY_ENTRIES:
+        raise HTTPException(status_code=400, detail=f"Cannot replay more than {MAX_REPLAY_ENTRIES} entries")
+
+    entries = [entry async for entry in iter_entries(db, capture_id)]
+    async with in_flight.track():
+        report = await replay_entries(
+            entries, http_session,
+            lambda url: limiter.guard(user["user_id"], capture["org_id"], url),
+            timing=replay.timing, speed=replay.speed, concurrency=replay.concurrency, timeout=replay.timeout,
+            pool=dispatcher.lane("runner", capture["org_id"])
+        )
+    return {"capture_id": capture_id, **report}
+
+
+# ============= Blob Endpoints =============
+
+@api_router.post("/organizations/{org_id}/blobs", response_model=Blob)
+async def upload_blob(org_id: str, request: Request, filename: Optional[str] = None):
+    """Upload a file for binary/multipart request bodies; the raw request body is streamed to storage"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "edit")
+
+    return await blob_store.put(
+        org_id, user["user_id"], request.stream(),
+        filename=filename, content_type=request.headers.get("content-type")
+    )
+
+
+@api_router.get("/organizations/{org_id}/blobs", response_model=List[Blob])
+async def get_blobs(org_id: str, request: Request):
+    """List uploaded body files in organization"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "view")
+
+    return await blob_store.list(org_id)
+
+
+@api_router.get("/organizations/{org_id}/blobs/{blob_id}/content")
+async def download_blob(org_id: str, blob_id: str, request: Request):
+    """Download a stored file (uploaded body or saved binary response)"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "view")
+
+    blob, chunks = await blob_store.open(org_id, blob_id)
+    filename = (blob.get("filename") or blob_id).replace('"', "")
+    return StreamingResponse(
+        chunks,
+        media_type=blob["content_type"],
+        headers={"Content-Length": str(blob["size"]), "Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@api_router.delete("/organizations/{org_id}/blobs/{blob_id}")
+async def delete_blob(org_id: str, blob_id: str, request: Request):
+    """Delete an uploaded body file (Edit or Admin required)"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "edit")
+
+    if not await blob_store.delete(org_id, blob_id):
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return {"message": "Blob deleted successfully"}
 
 
 # ============= History Endpoints =============
@@ -851,9 +1231,7 @@ async def get_history(org_id: str, request: Request):
     user = await get_current_user(request)
     
     # Verify access
-    org = await db.organizations.find_one({"org_id": org_id, "members": user["user_id"]})
-    if not org:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_member(db, org_id, user["user_id"])
     
     history = await db.request_history.find(
         {"org_id": org_id},
@@ -863,6 +1241,295 @@ async def get_history(org_id: str, request: Request):
     return history
 
 
+@api_router.get("/organizations/{org_id}/history/analytics")
+async def get_history_analytics(
+    org_id: str,
+    request: Request,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    interval: str = "hour",
+    limit: int = 50
+):
+    """Get aggregated request history stats (counts, error rates, latency percentiles, series)"""
+    user = await get_current_user(request)
+
+    await check_org_permission(db, user["user_id"], org_id, "view")
+
+    # Rollups are maintained by compaction_loop; the uncompacted tail is read from raw history
+    return await history_analytics(db, org_id, start, end, interval, min(max(limit, 1), 500))
+
+
+@api_router.get("/organizations/{org_id}/history/retention", response_model=HistoryRetention)
+async def get_history_retention(org_id: str, request: Request):
+    """Get history retention policy for organization"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "view")
+
+    return await get_retention_policy(db, org_id)
+
+
+@api_router.put("/organizations/{org_id}/history/retention", response_model=HistoryRetention)
+async def update_history_retention(org_id: str, payload: HistoryRetentionUpdate, request: Request):
+    """Update history retention policy for organization (Admin only)"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "admin")
+
+    policy = await set_retention_policy(db, org_id, payload.dict(), user["user_id"])
+    await bus.publish("history_retention", org_id)
+    return policy
+
+
+@api_router.get("/organizations/{org_id}/history/{history_id}/body")
+async def get_history_body(org_id: str, history_id: str, request: Request):
+    """Get the stored response body of a history entry"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "view")
+
+    entry = await db.request_history.find_one(
+        {"org_id": org_id, "history_id": history_id},
+        {"_id": 0, "body_hash": 1}
+    )
+    if not entry:
+        raise HTTPException(status_code=404, detail="History entry not found")
+    if not entry.get("body_hash"):
+        raise HTTPException(status_code=404, detail="No body stored for this entry")
+
+    body = await load_body(db, entry["body_hash"])
+    if body is None:
+        raise HTTPException(status_code=404, detail="Stored body has expired")
+    return Response(content=body, media_type="application/octet-stream")
+
+
+# ============= Monitor Endpoints =============
+
+async def get_monitor_or_404(monitor_id: str) -> dict:
+    return await monitor_repo.get(db, monitor_id)
+
+
+@api_router.get("/organizations/{org_id}/monitors", response_model=List[Monitor])
+async def get_monitors(org_id: str, request: Request):
+    """Get all monitors in organization"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "view")
+
+    monitors = await db.monitors.find({"org_id": org_id}, {"_id": 0}).to_list(1000)
+    return monitors
+
+
+@api_router.post("/organizations/{org_id}/monitors", response_model=Monitor)
+async def create_monitor(org_id: str, monitor_data: MonitorCreate, request: Request):
+    """Create a scheduled monitor for a saved request or collection (Edit or Admin required)"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "edit")
+
+    validate_schedule(monitor_data.interval_seconds, monitor_data.cron)
+    if monitor_data.target_type == "request":
+        target = await db.requests.find_one({"request_id": monitor_data.target_id, "org_id": org_id}, {"_id": 1})
+    elif monitor_data.target_type == "collection":
+        target = await db.collections.find_one({"collection_id": monitor_data.target_id, "org_id": org_id}, {"_id": 1})
+    else:
+        raise HTTPException(status_code=400, detail="target_type must be 'request' or 'collection'")
+    if not target:
+        raise HTTPException(status_code=404, detail="Monitor target not found")
+
+    new_monitor = {
+        "monitor_id": f"mon_{uuid.uuid4().hex[:12]}",
+        "org_id": org_id,
+        "name": monitor_data.name,
+        "target_type": monitor_data.target_type,
+        "target_id": monitor_data.target_id,
+        "env_id": monitor_data.env_id,
+        "interval_seconds": monitor_data.interval_seconds,
+        "cron": monitor_data.cron,
+        "assertions": [a.dict() for a in monitor_data.assertions],
+        "enabled": monitor_data.enabled,
+        "last_run_at": None,
+        "last_status": None,
+        "last_result": None,
+        "created_by": user["user_id"],
+        "created_at": datetime.now(timezone.utc)
+    }
+    new_monitor["next_run_at"] = next_run_at(new_monitor)
+
+    await db.monitors.insert_one(new_monitor)
+    new_monitor.pop("_id", None)
+    return new_monitor
+
+
+@api_router.get("/monitors/{monitor_id}", response_model=Monitor)
+async def get_monitor(monitor_id: str, request: Request):
+    """Get monitor details"""
+    user = await get_current_user(request)
+    monitor = await get_monitor_or_404(monitor_id)
+    await check_org_permission(db, user["user_id"], monitor["org_id"], "view")
+
+    return monitor
+
+
+@api_router.put("/monitors/{monitor_id}", response_model=Monitor)
+async def update_monitor(monitor_id: str, monitor_data: MonitorUpdate, request: Request):
+    """Update monitor (Edit or Admin required)"""
+    user = await get_current_user(request)
+    monitor = await get_monitor_or_404(monitor_id)
+    await check_org_permission(db, user["user_id"], monitor["org_id"], "edit")
+
+    update_fields = {k: v for k, v in monitor_data.dict().items() if v is not None}
+    if "interval_seconds" in update_fields or "cron" in update_fields:
+        # A new schedule replaces the old one entirely
+        update_fields.setdefault("interval_seconds", None)
+        update_fields.setdefault("cron", None)
+        validate_schedule(update_fields["interval_seconds"], update_fields["cron"])
+        update_fields["next_run_at"] = next_run_at({**monitor, **update_fields})
+
+    return await monitor_repo.update(db, monitor_id, update_fields, guard={"org_id": monitor["org_id"]})
+
+
+@api_router.delete("/monitors/{monitor_id}")
+async def delete_monitor(monitor_id: str, request: Request):
+    """Delete monitor (Edit or Admin required)"""
+    user = await get_current_user(request)
+    monitor = await get_monitor_or_404(monitor_id)
+    await check_org_permission(db, user["user_id"], monitor["org_id"], "edit")
+
+    await db.monitors.delete_one({"monitor_id": monitor_id})
+    return {"message": "Monitor deleted successfully"}
+
+
+@api_router.post("/monitors/{monitor_id}/run")
+async def run_monitor_now(monitor_id: str, request: Request):
+    """Run a monitor immediately (Edit or Admin required)"""
+    user = await get_current_user(request)
+    monitor = await get_monitor_or_404(monitor_id)
+    await check_org_permission(db, user["user_id"], monitor["org_id"], "edit")
+
+    async with in_flight.track():
+        return await run_monitor(
+            db, http_session, monitor, dispatcher.lane("runner", monitor["org_id"]), blob_store, breakers,
+            limiter, user["user_id"]
+        )
+
+
+@api_router.get("/monitors/{monitor_id}/results", response_model=List[History])
+async def get_monitor_results(monitor_id: str, request: Request):
+    """Get recent history entries recorded by a monitor"""
+    user = await get_current_user(request)
+    monitor = await get_monitor_or_404(monitor_id)
+    await check_org_permission(db, user["user_id"], monitor["org_id"], "view")
+
+    results = await db.request_history.find(
+        {"monitor_id": monitor_id},
+        {"_id": 0}
+    ).sort("timestamp", -1).limit(100).to_list(100)
+
+    return results
+
+
+# ============= Workflow Endpoints =============
+
+async def get_workflow_or_404(workflow_id: str) -> dict:
+    return await workflow_repo.get(db, workflow_id)
+
+
+async def validate_workflow_steps(org_id: str, steps: list):
+    validate_steps(steps)
+    request_ids = {step["request_id"] for step in steps}
+    found = await db.requests.count_documents({"org_id": org_id, "request_id": {"$in": list(request_ids)}})
+    if found != len(request_ids):
+        raise HTTPException(status_code=400, detail="Workflow references requests outside this organization")
+
+
+@api_router.get("/organizations/{org_id}/workflows", response_model=List[Workflow])
+async def get_workflows(org_id: str, request: Request):
+    """Get all workflows in organization"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "view")
+
+    workflows = await db.workflows.find({"org_id": org_id}, {"_id": 0}).to_list(1000)
+    return workflows
+
+
+@api_router.post("/organizations/{org_id}/workflows", response_model=Workflow)
+async def create_workflow(org_id: str, workflow_data: WorkflowCreate, request: Request):
+    """Create a workflow chaining saved requests (Edit or Admin required)"""
+    user = await get_current_user(request)
+    await check_org_permission(db, user["user_id"], org_id, "edit")
+
+    steps = [step.dict() for step in workflow_data.steps]
+    await validate_workflow_steps(org_id, steps)
+
+    now = datetime.now(timezone.utc)
+    new_workflow = {
+        "workflow_id": f"wf_{uuid.uuid4().hex[:12]}",
+        "org_id": org_id,
+        "name": workflow_data.name,
+        "env_id": workflow_data.env_id,
+        "steps": steps,
+        "created_by": user["user_id"],
+        "created_at": now,
+        "updated_at": now
+    }
+
+    await db.workflows.insert_one(new_workflow)
+    new_workflow.pop("_id", None)
+    return new_workflow
+
+
+@api_router.get("/workflows/{workflow_id}", response_model=Workflow)
+async def get_workflow(workflow_id: str, request: Request):
+    """Get workflow details"""
+    user = await get_current_user(request)
+    workflow = await get_workflow_or_404(workflow_id)
+    await check_org_permission(db, user["user_id"], workflow["org_id"], "view")
+
+    return workflow
+
+
+@api_router.put("/workflows/{workflow_id}", response_model=Workflow)
+async def update_workflow(workflow_id: str, workflow_data: WorkflowUpdate, request: Request):
+    """Update workflow (Edit or Admin required)"""
+    user = await get_current_user(request)
+    workflow = await get_workflow_or_404(workflow_id)
+    await check_org_permission(db, user["user_id"], workflow["org_id"], "edit")
+
+    update_fields = {}
+    if workflow_data.name is not None:
+        update_fields["name"] = workflow_data.name
+    if workflow_data.env_id is not None:
+        update_fields["env_id"] = workflow_data.env_id
+    if workflow_data.steps is not None:
+        update_fields["steps"] = [step.dict() for step in workflow_data.steps]
+        await validate_workflow_steps(workflow["org_id"], update_fields["steps"])
+    update_fields["updated_at"] = datetime.now(timezone.utc)
+
+    return await workflow_repo.update(db, workflow_id, update_fields, guard={"org_id": workflow["org_id"]})
+
+
+@api_router.delete("/workflows/{workflow_id}")
+async def delete_workflow(workflow_id: str, request: Request):
+    """Delete workflow (Edit or Admin required)"""
+    user = await get_current_user(request)
+    workflow = await get_workflow_or_404(workflow_id)
+    await check_org_permission(db, user["user_id"], workflow["org_id"], "edit")
+
+    await db.workflows.delete_one({"workflow_id": workflow_id})
+    return {"message": "Workflow deleted successfully"}
+
+
+@api_router.post("/workflows/{workflow_id}/run")
+async def run_workflow_now(workflow_id: str, run_data: WorkflowRun, request: Request):
+    """Run a workflow server-side and return the step timeline"""
+    user = await get_current_user(request)
+    workflow = await get_workflow_or_404(workflow_id)
+    await check_org_permission(db, user["user_id"], workflow["org_id"], "view")
+
+    async with in_flight.track():
+        return await run_workflow(
+            db, http_session, workflow, user["user_id"],
+            env_id=run_data.env_id, variables=run_data.variables, blob_store=blob_store,
+            pool=dispatcher.lane("runner", workflow["org_id"]), breakers=breakers, limiter=limiter
+        )
+
+
 # ============= Environment Endpoints =============
 
 @api_router.get("/organizations/{org_id}/environments", response_model=List[Environment])
@@ -871,16 +1538,14 @@ async def get_environments(org_id: str, request: Request):
     user = await get_current_user(request)
     
     # Verify access
-    org = await db.organizations.find_one({"org_id": org_id, "members": user["user_id"]})
-    if not org:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_member(db, org_id, user["user_id"])
     
     environments = await db.environments.find(
         {"org_id": org_id},
-        {"_id": 0}
+        model_projection(Environment)
     ).to_list(100)
     
-    return environments
+    return trusted_response(Environment, environments)
 
 
 @api_router.post("/organizations/{org_id}/environments", response_model=Environment)
@@ -889,9 +1554,7 @@ async def create_environment(org_id: str, env_data: EnvironmentCreate, request:
     user = await get_current_user(request)
     
     # Verify access
-    org = await db.organizations.find_one({"org_id": org_id, "members": user["user_id"]})
-    if not org:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_member(db, org_id, user["user_id"])
     
     env_id = f"env_{uuid.uuid4().hex[:12]}"
     new_env = {
@@ -904,6 +1567,8 @@ async def create_environment(org_id: str, env_data: EnvironmentCreate, request:
     }
     
     await db.environments.insert_one(new_env)
+    await record_created(db, "environment", new_env, user["user_id"])
+    await bump_workspace_version(db, [org_id])
     return new_env
 
 
@@ -912,16 +1577,10 @@ async def update_environment(env_id: str, env_data: EnvironmentUpdate, request:
     """Update environment"""
     user = await get_current_user(request)
     
-    environment = await db.environments.find_one({"env_id": env_id})
-    if not environment:
-        raise HTTPException(status_code=404, detail="Environment not found")
+    environment = await environment_repo.get(db, env_id, {"_id": 0, "org_id": 1})
     
     # Verify access
-    org = await db.organizations.find_one(
-        {"org_id": environment["org_id"], "members": user["user_id"]}
-    )
-    if not org:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_member(db, environment["org_id"], user["user_id"])
     
     update_fields = {}
     if env_data.name is not None:
@@ -929,12 +1588,10 @@ async def update_environment(env_id: str, env_data: EnvironmentUpdate, request:
     if env_data.variables is not None:
         update_fields["variables"] = [v.dict() for v in env_data.variables]
     
-    await db.environments.update_one(
-        {"env_id": env_id},
-        {"$set": update_fields}
-    )
-    
-    updated_env = await db.environments.find_one({"env_id": env_id}, {"_id": 0})
+    head = await track_revision(db, "environment", env_id, environment["org_id"])
+    updated_env = await environment_repo.update(db, env_id, update_fields, guard={"org_id": environment["org_id"]})
+    await record_revision(db, head, updated_env, user["user_id"])
+    await bump_workspace_version(db, [environment["org_id"]])
     return updated_env
 
 
@@ -943,26 +1600,120 @@ async def delete_environment(env_id: str, request: Request):
     """Delete environment"""
     user = await get_current_user(request)
     
-    environment = await db.environments.find_one({"env_id": env_id})
-    if not environment:
-        raise HTTPException(status_code=404, detail="Environment not found")
+    environment = await environment_repo.get(db, env_id, {"_id": 0, "org_id": 1})
     
     # Verify access
-    org = await db.organizations.find_one(
-        {"org_id": environment["org_id"], "members": user["user_id"]}
-    )
-    if not org:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await require_member(db, environment["org_id"], user["user_id"])
     
-    await db.environments.delete_one({"env_id": env_id})
+    await environment_repo.delete(db, env_id, guard={"org_id": environment["org_id"]}, projection={"_id": 1})
+    await purge_revisions(db, "environment", env_id)
+    await bump_workspace_version(db, [environment["org_id"]])
     return {"message": "Environment deleted successfully"}
 
 
+# ============= Revision Endpoints =============
+
+RevisionResource = Literal["requests", "collections", "environments"]
+REVISION_KINDS = {"requests": "request", "collections": "collection", "environments": "environment"}
+REVISION_REPOS = {"requests": request_repo, "collections": collection_repo, "environments": environment_repo}
+
+
+async def get_revision_target(resource: str, doc_id: str, user_id: str, role: str) -> dict:
+    """The tracked document's location, after the same access check its own endpoints use"""
+    doc = await REVISION_REPOS[resource].get(
+        db, doc_id, {"_id": 0, "org_id": 1, "collection_id": 1, "folder_path": 1, "mock_response": 1}
+    )
+    if resource == "environments":
+        await require_member(db, doc["org_id"], user_id)
+    else:
+        await check_org_permission(db, user_id, doc["org_id"], role)
+    return doc
+
+
+@api_router.get("/{resource}/{doc_id}/revisions", response_model=List[Revision])
+async def get_revisions(resource: RevisionResource, doc_id: str, request: Request, limit: int = 50):
+    """List revisions of a request, collection or environment, newest first"""
+    user = await get_current_user(request)
+    await get_revision_target(resource, doc_id, user["user_id"], "view")
+
+    return await list_revisions(db, REVISION_KINDS[resource], doc_id, limit)
+
+
+@api_router.get("/{resource}/{doc_id}/revisions/{version}")
+async def get_revision(resource: RevisionResource, doc_id: str, version: int, request: Request):
+    """The tracked fields as they were at a revision"""
+    user = await get_current_user(request)
+    await get_revision_target(resource, doc_id, user["user_id"], "view")
+
+    return {"version": version, "state": await revision_state(db, REVISION_KINDS[resource], doc_id, version)}
+
+
+@api_router.get("/{resource}/{doc_id}/revisions/{version}/diff")
+async def diff_revisions(
+    resource: RevisionResource, doc_id: str, version: int, request: Request, against: Optional[int] = None
+):
+    """Changes from `against` (default: the previous revision) to `version`"""
+    user = await get_current_user(request)
+    await get_revision_target(resource, doc_id, user["user_id"], "view")
+
+    kind = REVISION_KINDS[resource]
+    against = version - 1 if against is None else against
+    before = await revision_state(db, kind, doc_id, against) if against > 0 else {}
+    after = await revision_state(db, kind, doc_id, version)
+    return {"version": version, "against": against, **diff_json(before, after)}
+
+
+@api_router.post("/{resource}/{doc_id}/revisions/{version}/restore")
+async def restore_revision(resource: RevisionResource, doc_id: str, version: int, request: Request):
+    """Make a revision's content current again, recorded as a new revision (Edit or Admin required)"""
+    user = await get_current_user(request)
+    doc = await get_revision_target(resource, doc_id, user["user_id"], "edit")
+
+    kind = REVISION_KINDS[resource]
+    fields = await revision_state(db, kind, doc_id, version)
+    if kind == "request":
+        fields["updated_at"] = datetime.now(timezone.utc)
+    head = await track_revision(db, kind, doc_id, doc["org_id"])
+    updated = await REVISION_REPOS[resource].update(db, doc_id, fields, guard={"org_id": doc["org_id"]})
+    revision = await record_revision(db, head, updated, user["user_id"], action="restore", restored_from=version)
+
+    if kind == "request":
+        await record_moves(db, [(
+            (doc.get("collection_id"), doc.get("folder_path")),
+            (updated.get("collection_id"), updated.get("folder_path"))
+        )])
+        if doc.get("mock_response") or updated.get("mock_response"):
+            await bus.publish("mock_routes", [doc.get("collection_id"), updated.get("collection_id")])
+    elif kind == "collection":
+        await sync_declared_folders(db, updated)
+    await bump_workspace_version(db, [doc["org_id"]])
+    return {"revision": revision, kind: updated}
+
+
+# ============= Health Endpoints =============
+
+@api_router.get("/health/live")
+async def liveness():
+    """The worker is up and serving"""
+    return {"status": "ok"}
+
+
+@api_router.get("/health/ready")
+async def readiness_check():
+    """200 once indexes, the Mongo pool and in-memory indexes are warm; 503 until then"""
+    return FastJSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+
 # Include the router in the main app
 app.include_router(api_router)
 
 frontend_url = os.environ.get("FRONTEND_URL", "http://localhost:3000")
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -970,7 +1721,3 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
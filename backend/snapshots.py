@@ -0,0 +1,373 @@
+from concurrent.futures import Executor
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import difflib
+import hashlib
+import json
+import re
+import uuid
+import zlib
+from bson import Binary
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from starlette.concurrency import run_in_threadpool
+
+from blobs import BlobStore
+from executor import environment_variables, resolve_request, response_summary, error_summary
+from har import HarWriter, har_entry
+from history_store import record_history
+from policies import BreakerRegistry, saved_request_policies, send_with_policy
+from rate_limit import ExecuteLimiter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+MAX_CHANGES = 500
+MAX_VALUE_CHARS = 200
+TEXT_DIFF_MAX_LINES = 2000  # difflib is quadratic in the worst case
+MAX_SNAPSHOT_BYTES = 15 * 1024 * 1024  # compressed; stays under the BSON document limit
+PATH_PATTERN_TOKEN = re.compile(r"([^.\[\]]+)|\[(\*|-?\d+)\]")
+
+
+# ============= Diffing =============
+
+def parse_ignore_path(pattern: str) -> Tuple:
+    """`$.data[*].id` -> ("data", "*", "id"); `**` matches any number of segments"""
+    pattern = pattern.strip()
+    if pattern.startswith("$"):
+        pattern = pattern[1:].lstrip(".")
+    tokens = []
+    for key, index in PATH_PATTERN_TOKEN.findall(pattern):
+        if index:
+            tokens.append("*" if index == "*" else int(index))
+        else:
+            tokens.append(key)
+    return tuple(tokens)
+
+
+def _matches(path: Tuple, pattern: Tuple) -> bool:
+    if not pattern:
+        return not path
+    head = pattern[0]
+    if head == "**":
+        return any(_matches(path[i:], pattern[1:]) for i in range(len(path) + 1))
+    if not path:
+        return False
+    if head != "*" and head != path[0]:
+        return False
+    return _matches(path[1:], pattern[1:])
+
+
+def format_path(path: Tuple) -> str:
+    out = "$"
+    for part in path:
+        out += f"[{part}]" if isinstance(part, int) else f".{part}"
+    return out
+
+
+def _show(value: Any) -> Any:
+    if isinstance(value, dict):
+        return f"{{object with {len(value)} keys}}"
+    if isinstance(value, list):
+        return f"[array of {len(value)}]"
+    if isinstance(value, str) and len(value) > MAX_VALUE_CHARS:
+        return value[:MAX_VALUE_CHARS] + "..."
+    return value
+
+
+def _same_kind(a: Any, b: Any) -> bool:
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b)
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return True
+    return type(a) is type(b)
+
+
+def diff_json(baseline: Any, current: Any, ignore_paths: Optional[List[str]] = None, max_changes: int = MAX_CHANGES) -> dict:
+    """Structural diff of two JSON documents.
+
+    Identical documents are detected with one equality check; otherwise both
+    trees are walked once with an explicit stack (arrays compare by position),
+    visiting each node at most once, so cost stays linear in the document size
+    and deep documents cannot hit the recursion limit.
+    """
+    counts = {"added": 0, "removed": 0, "changed": 0}
+    changes = []
+    try:
+        identical = baseline == current
+    except RecursionError:  # == recurses; the walk below does not
+        identical = False
+    stack = [] if identical else [((), baseline, current)]
+    patterns = [parse_ignore_path(p) for p in ignore_paths or [] if p.strip()]
+
+    def report(op: str, path: Tuple, before: Any = None, after: Any = None):
+        counts[op] += 1
+        if len(changes) < max_changes:
+            change = {"op": op, "path": format_path(path)}
+            if op != "added":
+                change["baseline"] = _show(before)
+            if op != "removed":
+                change["current"] = _show(after)
+            changes.append(change)
+
+    while stack:
+        path, a, b = stack.pop()
+        if patterns and any(_matches(path, pattern) for pattern in patterns):
+            continue
+        if not _same_kind(a, b):
+            report("changed", path, a, b)
+        elif isinstance(a, dict):
+            children = []
+            for key, value in a.items():
+                if key in b:
+                    children.append((path + (key,), value, b[key]))
+                elif not any(_matches(path + (key,), pattern) for pattern in patterns):
+                    report("removed", path + (key,), value)
+            for key, value in b.items():
+                if key not in a and not any(_matches(path + (key,), pattern) for pattern in patterns):
+                    report("added", path + (key,), None, value)
+            stack.extend(reversed(children))
+        elif isinstance(a, list):
+            shared = min(len(a), len(b))
+            stack.extend((path + (i,), a[i], b[i]) for i in range(shared - 1, -1, -1))
+            for i in range(shared, len(a)):
+                if not any(_matches(path + (i,), pattern) for pattern in patterns):
+                    report("removed", path + (i,), a[i])
+            for i in range(shared, len(b)):
+                if not any(_matches(path + (i,), pattern) for pattern in patterns):
+                    report("added", path + (i,), None, b[i])
+        elif a != b:
+            report("changed", path, a, b)
+
+    return {
+        "kind": "json",
+        "identical": not any(counts.values()),
+        "counts": counts,
+        "changes": changes,
+        "truncated": sum(counts.values()) > len(changes)
+    }
+
+
+def diff_text(baseline: str, current: str, max_lines: int = TEXT_DIFF_MAX_LINES) -> dict:
+    """Line diff for non-JSON bodies.
+
+    difflib is near-quadratic on dissimilar input, so bodies over `max_lines` in
+    total only report the first divergence (a single linear scan).
+    """
+    if baseline == current:
+        return {"kind": "text", "identical": True}
+    before, after = baseline.splitlines(), current.splitlines()
+    if len(before) + len(after) > max_lines:
+        first = next(
+            (i for i, (x, y) in enumerate(zip(before, after)) if x != y),
+            min(len(before), len(after))
+        )
+        return {
+            "kind": "text",
+            "identical": False,
+            "first_difference_line": first + 1,
+            "lines": {"baseline": len(before), "current": len(after)},
+            "truncated": True
+        }
+    lines = list(difflib.unified_diff(before, after, "baseline", "current", lineterm="", n=2))
+    return {
+        "kind": "text",
+        "identical": False,
+        "diff": lines[:MAX_CHANGES],
+        "truncated": len(lines) > MAX_CHANGES
+    }
+
+
+def _loads(content: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def diff_bodies(baseline: bytes, current: bytes, ignore_paths: Optional[List[str]] = None) -> dict:
+    """Diff two raw response bodies, structurally when both are JSON (CPU bound; run off the event loop)"""
+    if baseline == current:
+        return {"kind": "bytes", "identical": True}
+    try:
+        return diff_json(_loads(baseline), _loads(current), ignore_paths)
+    except ValueError:
+        return diff_text(baseline.decode("utf-8", "replace"), current.decode("utf-8", "replace"))
+
+
+# ============= Storage =============
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    await db.response_snapshots.create_index([("org_id", 1), ("request_id", 1), ("env_id", 1)], unique=True)
+
+
+async def get_snapshot(db: AsyncIOMotorDatabase, org_id: str, request_id: str, env_id: Optional[str], with_body: bool = False) -> Optional[dict]:
+    projection = {"_id": 0} if with_body else {"_id": 0, "body": 0}
+    snapshot = await db.response_snapshots.find_one(
+        {"org_id": org_id, "request_id": request_id, "env_id": env_id}, projection
+    )
+    if snapshot and with_body:
+        snapshot["body"] = zlib.decompress(bytes(snapshot["body"]))
+    return snapshot
+
+
+async def list_snapshots(db: AsyncIOMotorDatabase, org_id: str, request_id: str) -> List[dict]:
+    return await db.response_snapshots.find(
+        {"org_id": org_id, "request_id": request_id}, {"_id": 0, "body": 0}
+    ).to_list(100)
+
+
+async def save_snapshot(
+    db: AsyncIOMotorDatabase,
+    org_id: str,
+    request_id: str,
+    env_id: Optional[str],
+    status: int,
+    headers: dict,
+    body: bytes,
+    user_id: str
+) -> dict:
+    """Store (or replace) the baseline response, keeping any configured ignore paths"""
+    compressed = await run_in_threadpool(zlib.compress, body, 6)
+    if len(compressed) > MAX_SNAPSHOT_BYTES:
+        raise HTTPException(status_code=413, detail="Response too large to snapshot")
+    now = datetime.now(timezone.utc)
+    snapshot = {
+        "status": status,
+        "headers": headers,
+        "content_type": headers.get("Content-Type") or headers.get("content-type"),
+        "body": Binary(compressed),
+        "body_hash": hashlib.sha256(body).hexdigest(),
+        "size": len(body),
+        "updated_by": user_id,
+        "updated_at": now
+    }
+    await db.response_snapshots.update_one(
+        {"org_id": org_id, "request_id": request_id, "env_id": env_id},
+        {
+            "$set": snapshot,
+            "$setOnInsert": {"snapshot_id": f"snap_{uuid.uuid4().hex[:12]}", "ignore_paths": [], "created_at": now}
+        },
+        upsert=True
+    )
+    return await get_snapshot(db, org_id, request_id, env_id)
+
+
+async def set_ignore_paths(db: AsyncIOMotorDatabase, org_id: str, request_id: str, env_id: Optional[str], ignore_paths: List[str]) -> Optional[dict]:
+    await db.response_snapshots.update_one(
+        {"org_id": org_id, "request_id": request_id, "env_id": env_id},
+        {"$set": {"ignore_paths": ignore_paths}}
+    )
+    return await get_snapshot(db, org_id, request_id, env_id)
+
+
+async def compare_snapshot(
+    db: AsyncIOMotorDatabase,
+    org_id: str,
+    request_id: str,
+    env_id: Optional[str],
+    status: int,
+    body: bytes
+) -> Optional[dict]:
+    """Diff a live response against the stored baseline; None when there is no baseline"""
+    baseline = await get_snapshot(db, org_id, request_id, env_id, with_body=True)
+    if not baseline:
+        return None
+    diff = await run_in_threadpool(diff_bodies, baseline["body"], body, baseline.get("ignore_paths"))
+    if baseline["status"] != status:
+        diff["status"] = {"baseline": baseline["status"], "current": status}
+        diff["identical"] = False
+    diff["snapshot_id"] = baseline["snapshot_id"]
+    diff["baseline_at"] = baseline["updated_at"]
+    return diff
+
+
+# ============= Collection Runs =============
+
+async def run_collection(
+    db: AsyncIOMotorDatabase,
+    session,
+    collection: dict,
+    user_id: str,
+    env_id: Optional[str] = None,
+    variables: Optional[Dict[str, str]] = None,
+    update_snapshots: bool = False,
+    pool: Optional[Executor] = None,
+    blob_store: Optional[BlobStore] = None,
+    har: Optional[HarWriter] = None,
+    breakers: Optional[BreakerRegistry] = None,
+    limiter: Optional[ExecuteLimiter] = None
+) -> dict:
+    """Run every request in a collection in order and diff each response against its baseline.
+
+    With a limiter, every call counts against the caller's execute quotas; a
+    throttled call is reported as that request's error and the run continues.
+    """
+    org_id = collection["org_id"]
+    context: Dict[str, str] = {}
+    if env_id:
+        environment = await db.environments.find_one(
+            {"env_id": env_id, "org_id": org_id}, {"_id": 0, "variables": 1}
+        )
+        context.update(environment_variables(environment))
+    context.update(variables or {})
+
+    saved_requests = await db.requests.find(
+        {"collection_id": collection["collection_id"], "org_id": org_id}, {"_id": 0}
+    ).sort([("folder_path", 1), ("name", 1)]).to_list(length=None)
+    policies = await saved_request_policies(db, saved_requests)
+    breakers = breakers or BreakerRegistry()
+
+    run_id = f"run_{uuid.uuid4().hex[:12]}"
+    started_at = datetime.now(timezone.utc)
+    results = []
+    for request_doc in saved_requests:
+        spec = resolve_request(request_doc, context)
+        try:
+            open_blob = await blob_store.opener_for(org_id, spec["body"]) if blob_store else None
+            async with limiter.guard(user_id, org_id, spec["url"]) if limiter else nullcontext():
+                response, elapsed_time, _ = await send_with_policy(
+                    session, spec, policies[request_doc["request_id"]], breakers, open_blob, pool=pool, org_id=org_id
+                )
+            result = response_summary(response, elapsed_time)
+            content = response.content
+            if har:
+                await har.add(await run_in_threadpool(har_entry, response, elapsed_time, request_doc["request_id"]))
+        except Exception as e:
+            result, content = error_summary(e), None
+
+        entry = {
+            "request_id": request_doc["request_id"],
+            "name": request_doc.get("name"),
+            "status": result["status"],
+            "time": result["time"],
+            "diff": None
+        }
+        if content is not None:
+            if update_snapshots:
+                await save_snapshot(db, org_id, request_doc["request_id"], env_id, result["status"], result["headers"], content, user_id)
+                entry["snapshot"] = "saved"
+            else:
+                entry["diff"] = await compare_snapshot(db, org_id, request_doc["request_id"], env_id, result["status"], content)
+        results.append(entry)
+        await record_history(
+            db, org_id, user_id, spec["method"], spec["url"], result["status"], result["time"],
+            request_id=request_doc["request_id"], body=content, size=len(content) if content is not None else None,
+            extra={"collection_run_id": run_id}
+        )
+    if har:
+        await har.flush()
+
+    return {
+        "run_id": run_id,
+        "collection_id": collection["collection_id"],
+        "env_id": env_id,
+        "started_at": started_at,
+        "finished_at": datetime.now(timezone.utc),
+        "changed": sum(1 for r in results if r["diff"] and not r["diff"]["identical"]),
+        "missing_baseline": sum(1 for r in results if r["diff"] is None and "snapshot" not in r),
+        "requests": results,
+        "har_capture_id": har.capture_id if har else None
+    }
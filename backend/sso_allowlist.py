@@ -0,0 +1,89 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+import asyncio
+import logging
+import os
+import time
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+# Safety net for deployments without a shared event bus (EVENT_BUS=local with several workers)
+ALLOWLIST_CACHE_SECONDS = int(os.environ.get("SSO_ALLOWLIST_CACHE_SECONDS", "60"))
+
+
+class AllowlistIndex:
+    """In-memory email -> org_ids index over org_sso_allowlists.
+
+    Loaded once and patched per org when an allowlist changes (refresh_org is
+    subscribed to the "sso_allowlist" channel), so the login path reads no
+    allowlist documents at all.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, max_age: float = ALLOWLIST_CACHE_SECONDS):
+        self.db = db
+        self.max_age = max_age
+        self.emails_by_org: Dict[str, Set[str]] = {}
+        self.orgs_by_email: Dict[str, Set[str]] = defaultdict(set)
+        # Every org with an allowlist document, including emptied ones (admin lockout escape)
+        self.configured_orgs: Set[str] = set()
+        self.loaded_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+
+    async def ensure_indexes(self):
+        await self.db.org_sso_allowlists.create_index("org_id")
+
+    def _set_org(self, org_id: str, emails: Set[str]):
+        for email in self.emails_by_org.pop(org_id, set()) - emails:
+            self.orgs_by_email[email].discard(org_id)
+            if not self.orgs_by_email[email]:
+                del self.orgs_by_email[email]
+        if emails:
+            self.emails_by_org[org_id] = emails
+            for email in emails:
+                self.orgs_by_email[email].add(org_id)
+
+    async def load(self):
+        """Rebuild the whole index"""
+        emails_by_org, configured_orgs = {}, set()
+        async for record in self.db.org_sso_allowlists.find({}, {"_id": 0, "org_id": 1, "emails": 1}):
+            configured_orgs.add(record["org_id"])
+            if record.get("emails"):
+                emails_by_org[record["org_id"]] = set(record["emails"])
+        orgs_by_email = defaultdict(set)
+        for org_id, emails in emails_by_org.items():
+            for email in emails:
+                orgs_by_email[email].add(org_id)
+        self.emails_by_org, self.orgs_by_email, self.configured_orgs = emails_by_org, orgs_by_email, configured_orgs
+        self.loaded_at = time.monotonic()
+
+    async def refresh_org(self, org_id: str):
+        """Re-read one org's allowlist (called locally and on cross-worker invalidation)"""
+        if self.loaded_at is None:
+            return
+        record = await self.db.org_sso_allowlists.find_one({"org_id": org_id}, {"_id": 0, "emails": 1})
+        if record is None:
+            self.configured_orgs.discard(org_id)
+        else:
+            self.configured_orgs.add(org_id)
+        self._set_org(org_id, set((record or {}).get("emails") or []))
+
+    async def _fresh(self):
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < self.max_age:
+            return
+        async with self.lock:
+            if self.loaded_at is None or time.monotonic() - self.loaded_at >= self.max_age:
+                await self.load()
+
+    async def has_allowlists(self) -> bool:
+        await self._fresh()
+        return bool(self.emails_by_org)
+
+    async def orgs_for(self, email: str) -> List[str]:
+        await self._fresh()
+        return sorted(self.orgs_by_email.get(email, ()))
+
+    async def allowlisted_org_ids(self) -> List[str]:
+        """Orgs that have an allowlist document, even an emptied one (matches distinct("org_id"))"""
+        await self._fresh()
+        return list(self.configured_orgs)
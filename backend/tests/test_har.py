@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from har import MAX_REPLAY_GAP_SECONDS, MAX_REPLAY_SECONDS, replay_schedule
+
+START = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+
+
+def entries(*seconds):
+    return [{"startedDateTime": (START + timedelta(seconds=s)).isoformat().replace("+00:00", "Z")} for s in seconds]
+
+
+def test_original_gaps_are_kept_at_real_speed():
+    offsets, speed = replay_schedule(entries(0, 1.5, 3), 1.0)
+    assert offsets == pytest.approx([0, 1.5, 3])
+    assert speed == 1.0
+
+
+def test_long_idle_gaps_collapse():
+    # A capture appended to a day later replays right after the first part
+    offsets, _ = replay_schedule(entries(0, 2, 86400, 86401), 1.0)
+    assert offsets == pytest.approx([0, 2, 2 + MAX_REPLAY_GAP_SECONDS, 3 + MAX_REPLAY_GAP_SECONDS])
+
+
+def test_speed_divides_offsets():
+    offsets, speed = replay_schedule(entries(0, 4), 2.0)
+    assert offsets == pytest.approx([0, 2])
+    assert speed == 2.0
+
+
+def test_schedule_is_compressed_to_the_replay_cap():
+    seconds = [i * MAX_REPLAY_GAP_SECONDS for i in range(int(MAX_REPLAY_SECONDS))]
+    offsets, speed = replay_schedule(entries(*seconds), 1.0)
+    assert max(offsets) == pytest.approx(MAX_REPLAY_SECONDS)
+    assert speed > 1.0
+
+
+def test_out_of_order_and_missing_start_times():
+    items = entries(5, 0) + [{"startedDateTime": "not a date"}, {}]
+    offsets, _ = replay_schedule(items, 1.0)
+    assert offsets == pytest.approx([5, 0, 0, 0])
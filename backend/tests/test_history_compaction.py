@@ -0,0 +1,101 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from analytics import ROLLUP_GRACE
+from benchmarks.standin import StandInCollection, StandInCursor, StandInDatabase
+from history_store import compact_all
+
+HOUR = datetime(2026, 3, 1, 10, tzinfo=timezone.utc)
+
+
+class RecordingDatabase(StandInDatabase):
+    """mongomock has no $dateTrunc or $merge: record rollup pipelines instead of running them"""
+
+    def __init__(self):
+        super().__init__()
+        self.pipelines = []
+
+    def __getattr__(self, name):
+        collection = super().__getattr__(name)
+        recording = self
+
+        class Recording(StandInCollection):
+            def aggregate(self, pipeline, **kwargs):
+                recording.pipelines.append((name, pipeline))
+                return StandInCursor(iter([]))
+        return Recording(collection.collection)
+
+
+def history_row(org_id, timestamp):
+    return {"org_id": org_id, "method": "GET", "url": "http://api.test/items?page=1", "status": 200,
+            "time": 40, "timestamp": timestamp}
+
+
+def hourly_window(db, org_id):
+    for collection, pipeline in db.pipelines:
+        match = pipeline[0]["$match"]
+        if collection == "request_history" and match["org_id"] == org_id:
+            return match["timestamp"]
+    return None
+
+
+def test_grace_lag_holds_back_the_hour_that_just_closed():
+    async def scenario():
+        db = RecordingDatabase()
+        await db.request_history.insert_one(history_row("org_a", HOUR - timedelta(seconds=1)))
+
+        await compact_all(db, now=HOUR + ROLLUP_GRACE / 2)
+        assert hourly_window(db, "org_a") == {"$lt": HOUR - timedelta(hours=1)}
+
+        db.pipelines.clear()
+        await compact_all(db, now=HOUR + ROLLUP_GRACE)
+        assert hourly_window(db, "org_a") == {"$lt": HOUR, "$gte": HOUR - timedelta(hours=1)}
+        state = await db.request_history_rollup_state.find_one({"org_id": "org_a"})
+        assert state["rolled_until"].replace(tzinfo=timezone.utc) == HOUR
+    asyncio.run(scenario())
+
+
+def test_compact_all_only_visits_orgs_with_recent_history():
+    async def scenario():
+        db = RecordingDatabase()
+        await db.request_history.insert_many([
+            history_row("org_old", HOUR - timedelta(days=2)),
+            history_row("org_new", HOUR - timedelta(minutes=30)),
+        ])
+        await compact_all(db, since=HOUR - timedelta(hours=2), now=HOUR + ROLLUP_GRACE)
+        assert hourly_window(db, "org_new") is not None
+        assert hourly_window(db, "org_old") is None
+    asyncio.run(scenario())
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_MONGO_URL"), reason="set TEST_MONGO_URL to run against a real mongod")
+def test_hourly_rollups_on_mongo():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def scenario():
+        client = AsyncIOMotorClient(os.environ["TEST_MONGO_URL"])
+        db = client[f"test_compaction_{os.getpid()}"]
+        try:
+            await db.request_history.insert_many([
+                history_row("org_a", HOUR - timedelta(minutes=90)),
+                history_row("org_a", HOUR - timedelta(seconds=1)),
+                history_row("org_a", HOUR + timedelta(seconds=10)),
+            ])
+
+            async def counts():
+                rows = await db.request_history_hourly.find({"org_id": "org_a"}).to_list(None)
+                return {row["hour"].replace(tzinfo=timezone.utc): row["count"] for row in rows}
+
+            await compact_all(db, now=HOUR + ROLLUP_GRACE / 2)
+            assert await counts() == {HOUR - timedelta(hours=2): 1}
+            await compact_all(db, now=HOUR + ROLLUP_GRACE)
+            assert await counts() == {HOUR - timedelta(hours=2): 1, HOUR - timedelta(hours=1): 1}
+            rows = await db.request_history_hourly.find({"org_id": "org_a"}).to_list(None)
+            assert {row["endpoint"] for row in rows} == {"http://api.test/items"}
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+    asyncio.run(scenario())
@@ -0,0 +1,73 @@
+import asyncio
+from contextlib import nullcontext
+
+import pytest
+from fastapi import HTTPException
+
+from benchmarks.standin import StandInDatabase
+from rate_limit import (
+    DEFAULT_LIMITS, MAX_LIMITS, ExecuteLimiter, MongoBucketBackend, MongoConcurrencyGate, clamp_limits
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_clamp_limits_caps_every_field():
+    huge = {key: 10 ** 9 for key in DEFAULT_LIMITS}
+    assert clamp_limits(huge) == MAX_LIMITS
+    assert clamp_limits({"user_rate": 1}) == {"user_rate": 1}
+
+
+def test_org_overrides_are_capped():
+    async def scenario():
+        limiter = ExecuteLimiter(StandInDatabase())
+        limits = await limiter.set_limits("org_a", {key: 10 ** 9 for key in DEFAULT_LIMITS}, "user_1")
+        assert limits == MAX_LIMITS
+        # Records written before the cap existed are capped on read as well
+        await limiter.db.org_rate_limits.update_one({"org_id": "org_a"}, {"$set": {"org_rate": 10 ** 9}})
+        limiter.invalidate("org_a")
+        assert (await limiter.get_limits("org_a"))["org_rate"] == MAX_LIMITS["org_rate"]
+    run(scenario())
+
+
+def test_user_bucket_is_per_org():
+    async def scenario():
+        limiter = ExecuteLimiter(StandInDatabase())
+        await limiter.set_limits("strict", {"user_rate": 0.001, "user_burst": 1}, "user_1")
+        await limiter.set_limits("loose", {"user_rate": 20, "user_burst": 100}, "user_1")
+        for _ in range(5):
+            async with limiter.guard("user_1", "loose", "http://api.test/a"):
+                pass
+        async with limiter.guard("user_1", "strict", "http://api.test/a"):
+            pass
+        with pytest.raises(HTTPException) as raised:
+            async with limiter.guard("user_1", "strict", "http://api.test/a"):
+                pass
+        assert raised.value.status_code == 429
+    run(scenario())
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_concurrency_caps(shared):
+    async def scenario():
+        db = StandInDatabase()
+        limiters = [
+            ExecuteLimiter(db, MongoBucketBackend(db), MongoConcurrencyGate(db)) if shared else ExecuteLimiter(db)
+            for _ in range(2)
+        ]
+        await limiters[0].set_limits("org_a", {"host_concurrency": 1}, "user_1")
+        async with limiters[0].guard("user_1", "org_a", "http://api.test/a"):
+            # Another host is still admitted
+            async with limiters[0].guard("user_1", "org_a", "http://other.test/a"):
+                pass
+            # With the Mongo gate a second worker sees the held slot
+            with pytest.raises(HTTPException) if shared else nullcontext():
+                async with limiters[1].guard("user_1", "org_a", "http://api.test/b"):
+                    pass
+        # Released slots are reusable
+        async with limiters[1].guard("user_1", "org_a", "http://api.test/a"):
+            pass
+    run(scenario())
+
@@ -0,0 +1,60 @@
+import pytest
+
+import response_filter
+from response_filter import JqPool, apply_filter, compile_jq
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setenv("SECRET_TEST", "hunter2")
+    pool = JqPool(workers=1, timeout=1, max_output_bytes=1000)
+    monkeypatch.setattr(response_filter, "_jq_pool", pool)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.parametrize("expression", [
+    "$ENV.SECRET_TEST", "env", "env.SECRET_TEST", "input", "[inputs]", "input_filename",
+    'import "lib" as lib; .', 'include "lib"; .', '"\\(env)"',
+])
+def test_blocked_builtins_are_rejected(expression):
+    with pytest.raises(ValueError):
+        compile_jq(expression)
+
+
+@pytest.mark.parametrize("expression", ['.env', '.["$ENV"]', 'select(.name == "env")', '.a # env'])
+def test_names_in_fields_strings_and_comments_are_allowed(expression):
+    compile_jq(expression)
+
+
+def test_apply_filter_reports_blocked_builtins(pool):
+    body, report = apply_filter({"type": "jq", "expression": "$ENV.SECRET_TEST"}, b"{}")
+    assert body is None
+    assert "not allowed" in report["error"]
+
+
+def test_worker_environment_is_empty(pool):
+    # Bypasses the compile-time check to prove the worker itself holds no secrets
+    outputs, oversized = pool.run("[$ENV, env]", "{}", 2)
+    assert outputs == [[{}, {}]]
+    assert not oversized
+
+
+def test_runaway_program_times_out_and_worker_is_replaced(pool):
+    body, report = apply_filter({"type": "jq", "expression": "last(range(infinite))"}, b"{}")
+    assert body is None
+    assert "exceeded" in report["error"]
+    assert apply_filter({"type": "jq", "expression": ".a"}, b'{"a": 1}')[0] == 1
+
+
+def test_output_over_byte_cap_is_truncated(pool):
+    body, report = apply_filter({"type": "jq", "expression": "range(1000)"}, b"null")
+    assert report["truncated"]
+    assert report["output_limit_bytes"] == 1000
+    assert 0 < len(body) < 1000
+
+
+def test_output_count_limit():
+    body, report = apply_filter({"type": "jsonpath", "expression": "$[*]", "limit": 2}, b"[1, 2, 3]")
+    assert body == [1, 2]
+    assert report["truncated"]
@@ -0,0 +1,63 @@
+from snapshots import MAX_CHANGES, TEXT_DIFF_MAX_LINES, diff_bodies, diff_json, diff_text
+
+
+def test_identical_documents():
+    document = {"items": [{"id": i, "tags": ["a", "b"]} for i in range(100)]}
+    result = diff_json(document, {"items": [dict(item) for item in document["items"]]})
+    assert result["identical"]
+    assert result["changes"] == []
+
+
+def test_changes_are_reported_by_path():
+    result = diff_json(
+        {"a": 1, "b": {"c": [1, 2, 3]}, "gone": True},
+        {"a": 2, "b": {"c": [1, 2]}, "new": "x"}
+    )
+    assert result["counts"] == {"added": 1, "removed": 2, "changed": 1}
+    assert {change["path"] for change in result["changes"]} == {"$.a", "$.b.c[2]", "$.gone", "$.new"}
+
+
+def test_ignored_paths():
+    result = diff_json(
+        {"data": [{"id": 1, "at": "t1"}]}, {"data": [{"id": 1, "at": "t2"}]}, ignore_paths=["$.data[*].at"]
+    )
+    assert result["identical"]
+
+
+def test_change_list_is_capped_but_counted():
+    size = MAX_CHANGES * 2
+    result = diff_json(list(range(size)), [i + 1 for i in range(size)])
+    assert result["counts"]["changed"] == size
+    assert len(result["changes"]) == MAX_CHANGES
+    assert result["truncated"]
+
+
+def test_deep_documents_do_not_recurse():
+    deep_a, deep_b = 1, 2
+    for _ in range(5000):
+        deep_a, deep_b = {"x": deep_a}, {"x": deep_b}
+    result = diff_json(deep_a, deep_b)
+    assert result["counts"]["changed"] == 1
+
+
+def test_text_diff_within_the_line_limit():
+    result = diff_text("a\nb\nc", "a\nB\nc")
+    assert not result["identical"]
+    assert "-b" in result["diff"] and "+B" in result["diff"]
+    assert not result["truncated"]
+
+
+def test_text_diff_over_the_line_limit_reports_first_difference():
+    lines = [f"line {i}" for i in range(TEXT_DIFF_MAX_LINES)]
+    changed = list(lines)
+    changed[1234] = "edited"
+    result = diff_text("\n".join(lines), "\n".join(changed))
+    assert result["truncated"]
+    assert result["first_difference_line"] == 1235
+    assert "diff" not in result
+
+
+def test_non_json_bodies_fall_back_to_text():
+    assert diff_bodies(b"same", b"same") == {"kind": "bytes", "identical": True}
+    assert diff_bodies(b"<a/>", b"<b/>")["kind"] == "text"
+    assert diff_bodies(b'{"a": 1}', b'{"a": 2}')["kind"] == "json"
@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+
+import workflows
+from benchmarks.standin import StandInDatabase
+from workflows import run_workflow
+
+
+class FakeSession:
+    """Answers every call with `status` (or raises ConnectionError for 0) and counts calls"""
+
+    def __init__(self, status: int):
+        self.status = status
+        self.calls = 0
+
+    def request(self, method=None, url=None, timeout=None, **kwargs):
+        self.calls += 1
+        if self.status == 0:
+            raise requests.ConnectionError("connection refused")
+        response = requests.Response()
+        response.status_code = self.status
+        response._content = b"{}"
+        response.headers["content-type"] = "application/json"
+        response.url = url
+        response.request = requests.Request(method, url).prepare()
+        response.elapsed = timedelta(0)
+        return response
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(workflows, "RETRY_BACKOFF_SECONDS", 0)
+
+
+def run_step(method: str, status: int, retries: int = 3, **step) -> tuple:
+    async def scenario():
+        db = StandInDatabase()
+        await db.requests.insert_one({
+            "request_id": "req_1", "org_id": "org_a", "name": "call", "method": method,
+            "url": "http://api.test/items", "headers": [], "params": [], "body": {"type": "none"},
+            "auth": {"type": "none"}, "created_by": "user_1", "created_at": datetime.now(timezone.utc)
+        })
+        session = FakeSession(status)
+        workflow = {
+            "workflow_id": "wf_1", "org_id": "org_a",
+            "steps": [{"step_id": "s1", "request_id": "req_1", "retries": retries, **step}]
+        }
+        result = await run_workflow(db, session, workflow, "user_1")
+        return session.calls, result
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("status", [500, 503, 0])
+def test_idempotent_calls_retry_transient_failures(status):
+    calls, result = run_step("GET", status)
+    assert calls == 4
+    assert result["steps"][0]["attempts"] == 4
+    assert not result["passed"]
+
+
+@pytest.mark.parametrize("status", [404, 422])
+def test_client_errors_are_not_retried(status):
+    calls, _ = run_step("GET", status)
+    assert calls == 1
+
+
+def test_success_is_not_retried():
+    calls, result = run_step("PUT", 200)
+    assert calls == 1
+    assert result["passed"]
+
+
+@pytest.mark.parametrize("method", ["POST", "PATCH"])
+def test_non_idempotent_calls_are_not_retried(method):
+    calls, _ = run_step(method, 500)
+    assert calls == 1
+
+
+def test_non_idempotent_retries_on_opt_in():
+    calls, _ = run_step("POST", 500, retry_non_idempotent=True)
+    assert calls == 4
+
+
+def test_retries_default_to_none():
+    calls, _ = run_step("GET", 500, retries=0)
+    assert calls == 1
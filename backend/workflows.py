@@ -0,0 +1,218 @@
+from concurrent.futures import Executor
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import asyncio
+import json
+import time
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from blobs import BlobStore
+from executor import environment_variables, resolve_request, response_summary, error_summary, extract_path
+from history_store import record_history
+from policies import IDEMPOTENT_METHODS, BreakerRegistry, resolve_policy, saved_request_policies, send_with_policy
+from rate_limit import ExecuteLimiter
+
+MAX_RETRIES = 5
+RETRY_BACKOFF_SECONDS = 0.2
+
+
+def validate_steps(steps: List[dict]) -> List[str]:
+    """Check step ids and dependencies form a DAG; returns a topological order"""
+    ids = [step["step_id"] for step in steps]
+    if len(ids) != len(set(ids)):
+        raise HTTPException(status_code=400, detail="Step ids must be unique")
+    known = set(ids)
+    for step in steps:
+        missing = [dep for dep in step.get("depends_on", []) if dep not in known]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Step {step['step_id']} depends on unknown steps: {', '.join(missing)}")
+        if not 0 <= step.get("retries", 0) <= MAX_RETRIES:
+            raise HTTPException(status_code=400, detail=f"retries must be between 0 and {MAX_RETRIES}")
+
+    # Kahn's algorithm
+    remaining = {step["step_id"]: set(step.get("depends_on", [])) for step in steps}
+    order = []
+    ready = [step_id for step_id in ids if not remaining[step_id]]
+    while ready:
+        step_id = ready.pop(0)
+        order.append(step_id)
+        for other in ids:
+            if step_id in remaining[other]:
+                remaining[other].discard(step_id)
+                if not remaining[other] and other not in order and other not in ready:
+                    ready.append(other)
+    if len(order) != len(ids):
+        raise HTTPException(status_code=400, detail="Workflow steps contain a dependency cycle")
+    return order
+
+
+def _as_variable(value) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def extract_outputs(step: dict, result: dict) -> Dict[str, str]:
+    """Pull variables out of a step result (JSON path into body, header, or status)"""
+    outputs = {}
+    lowered_headers = {k.lower(): v for k, v in (result.get("headers") or {}).items()}
+    for rule in step.get("extract", []):
+        source = rule.get("source", "body")
+        try:
+            if source == "status":
+                value = result["status"]
+            elif source == "header":
+                value = lowered_headers[(rule.get("path") or "").lower()]
+            else:
+                value = extract_path(result["body"], rule.get("path") or "")
+        except (KeyError, IndexError):
+            continue
+        outputs[rule["variable"]] = _as_variable(value)
+    return outputs
+
+
+async def run_workflow(
+    db: AsyncIOMotorDatabase,
+    session,
+    workflow: dict,
+    user_id: str,
+    env_id: Optional[str] = None,
+    variables: Optional[Dict[str, str]] = None,
+    pool: Optional[Executor] = None,
+    blob_store: Optional[BlobStore] = None,
+    breakers: Optional[BreakerRegistry] = None,
+    limiter: Optional[ExecuteLimiter] = None
+) -> dict:
+    """Run workflow steps as a DAG: independent branches run in parallel, outputs feed later steps.
+
+    With a limiter, every attempt counts against the caller's execute quotas.
+    """
+    steps = {step["step_id"]: step for step in workflow["steps"]}
+    order = validate_steps(workflow["steps"])
+
+    env_id = env_id or workflow.get("env_id")
+    context: Dict[str, str] = {}
+    if env_id:
+        environment = await db.environments.find_one(
+            {"env_id": env_id, "org_id": workflow["org_id"]},
+            {"_id": 0, "variables": 1}
+        )
+        context.update(environment_variables(environment))
+    context.update(variables or {})
+
+    request_ids = list({step["request_id"] for step in steps.values()})
+    saved_requests = {
+        doc["request_id"]: doc
+        for doc in await db.requests.find(
+            {"request_id": {"$in": request_ids}, "org_id": workflow["org_id"]},
+            {"_id": 0}
+        ).to_list(length=None)
+    }
+    policies = await saved_request_policies(db, list(saved_requests.values()))
+    breakers = breakers or BreakerRegistry()
+
+    started = time.monotonic()
+    started_at = datetime.now(timezone.utc)
+    timeline: Dict[str, dict] = {}
+
+    async def run_step(step_id: str) -> dict:
+        step = steps[step_id]
+        entry = {"step_id": step_id, "request_id": step["request_id"], "start_ms": int((time.monotonic() - started) * 1000)}
+        request_doc = saved_requests.get(step["request_id"])
+        if not request_doc:
+            return {**entry, "state": "failed", "error": "Request not found", "attempts": 0, "duration_ms": 0}
+
+        spec = resolve_request(request_doc, dict(context))
+        # A step timeout overrides the stored policy's read timeout; retries stay with the step
+        policy = resolve_policy(
+            policies[step["request_id"]],
+            {"read_timeout": step.get("timeout_seconds"), "retries": 0}
+        )
+        # Same rule as execution policies: non-idempotent calls are only retried on opt-in
+        retryable = (
+            spec["method"].upper() in IDEMPOTENT_METHODS
+            or step.get("retry_non_idempotent") or policy["retry_non_idempotent"]
+        )
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                open_blob = await blob_store.opener_for(workflow["org_id"], spec["body"]) if blob_store else None
+                async with limiter.guard(user_id, workflow["org_id"], spec["url"]) if limiter else nullcontext():
+                    response, elapsed_time, _ = await send_with_policy(
+                        session, spec, policy, breakers, open_blob, pool=pool, org_id=workflow["org_id"]
+                    )
+                result = response_summary(response, elapsed_time)
+                content = response.content
+            except Exception as e:
+                result, content = error_summary(e), None
+            ok = 0 < result["status"] < 400
+            # 4xx answers won't change on a resend; only transport errors and 5xx are retried
+            transient = result["status"] == 0 or result["status"] >= 500
+            if ok or not (retryable and transient) or attempts > step.get("retries", 0):
+                break
+            await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1))
+
+        await record_history(
+            db, workflow["org_id"], user_id, spec["method"], spec["url"], result["status"], result["time"],
+            request_id=step["request_id"], body=content, size=len(content) if content is not None else None,
+            extra={"workflow_id": workflow["workflow_id"]}
+        )
+        outputs = extract_outputs(step, result) if ok else {}
+        return {
+            **entry,
+            "state": "passed" if ok else "failed",
+            "status": result["status"],
+            "time": result["time"],
+            "attempts": attempts,
+            "duration_ms": int((time.monotonic() - started) * 1000) - entry["start_ms"],
+            "outputs": outputs,
+            "error": None if ok else (result["body"].get("error") if isinstance(result["body"], dict) else None)
+        }
+
+    waiting = {step_id: set(steps[step_id].get("depends_on", [])) for step_id in order}
+    running: Dict[asyncio.Task, str] = {}
+
+    def launch_ready():
+        progressed = True
+        while progressed:
+            progressed = False
+            for step_id in order:
+                if step_id in timeline or step_id in running.values() or waiting[step_id]:
+                    continue
+                failed_deps = [dep for dep in steps[step_id].get("depends_on", []) if timeline[dep]["state"] != "passed"]
+                if not failed_deps:
+                    running[asyncio.create_task(run_step(step_id))] = step_id
+                    continue
+                timeline[step_id] = {
+                    "step_id": step_id,
+                    "request_id": steps[step_id]["request_id"],
+                    "state": "skipped",
+                    "error": f"Dependency failed: {', '.join(failed_deps)}"
+                }
+                for other in order:
+                    waiting[other].discard(step_id)
+                progressed = True
+
+    launch_ready()
+    while running:
+        done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            step_id = running.pop(task)
+            timeline[step_id] = task.result()
+            context.update(timeline[step_id].get("outputs", {}))
+            for other in order:
+                waiting[other].discard(step_id)
+        launch_ready()
+
+    steps_out = [timeline[step_id] for step_id in order]
+    return {
+        "workflow_id": workflow["workflow_id"],
+        "started_at": started_at,
+        "total_ms": int((time.monotonic() - started) * 1000),
+        "passed": all(step["state"] == "passed" for step in steps_out),
+        "steps": steps_out,
+        "variables": {k: v for k, v in context.items() if any(k in s.get("outputs", {}) for s in steps_out)}
+    }
@@ -0,0 +1,54 @@
+from typing import Iterable, Optional, Tuple
+import asyncio
+import hashlib
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from models import Collection, Environment, Request as RequestModel
+from permissions import role_in_org
+from responses import fill_defaults, model_projection
+
+
+async def bump_workspace_version(db: AsyncIOMotorDatabase, org_ids: Iterable[Optional[str]]):
+    """Invalidate bootstrap ETags after a write to an org's collections, requests or environments"""
+    org_ids = [org_id for org_id in set(org_ids) if org_id]
+    if org_ids:
+        await db.organizations.update_many({"org_id": {"$in": org_ids}}, {"$inc": {"workspace_version": 1}})
+
+
+def workspace_etag(org_id: str, version: int, user_id: str, role: str) -> str:
+    # Role is per user, so it's part of the tag even though the version covers the shared data
+    digest = hashlib.sha1(f"{org_id}:{user_id}:{role}".encode()).hexdigest()[:12]
+    return f'"{version}-{digest}"'
+
+
+async def workspace_version(db: AsyncIOMotorDatabase, org_id: str, user_id: str) -> Tuple[str, str]:
+    """(role, ETag) for a member; reads only the organization document"""
+    org = await db.organizations.find_one(
+        {"org_id": org_id, "members": user_id},
+        {
+            "_id": 0,
+            "owner_id": 1,
+            "workspace_version": 1,
+            "member_roles": {"$elemMatch": {"user_id": user_id}}
+        }
+    )
+    if not org:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    # Matching on members already proved membership, which is all role_in_org's legacy fallback needs
+    role = role_in_org({**org, "members": [user_id]}, user_id)
+    return role, workspace_etag(org_id, org.get("workspace_version", 0), user_id, role)
+
+
+async def load_workspace(db: AsyncIOMotorDatabase, org_id: str) -> dict:
+    """Collections, requests and environments of an org, fetched concurrently"""
+    collections, requests, environments = await asyncio.gather(
+        db.collections.find({"org_id": org_id}, model_projection(Collection)).to_list(100),
+        db.requests.find({"org_id": org_id}, model_projection(RequestModel)).to_list(length=None),
+        db.environments.find({"org_id": org_id}, model_projection(Environment)).to_list(100)
+    )
+    return {
+        "collections": [fill_defaults(Collection, doc) for doc in collections],
+        "requests": [fill_defaults(RequestModel, doc) for doc in requests],
+        "environments": [fill_defaults(Environment, doc) for doc in environments]
+    }
@@ -38,9 +38,11 @@ const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
 const RequestBuilder = ({ request }) => {
-  const { updateRequest, saveRequest, collections, refreshCollections, closeTab, activeTab, addToHistory, environments, currentEnv, setCurrentEnv } = useApp();
+  const { updateRequest, saveRequest, collections, refreshCollections, closeTab, activeTab, addToHistory, environments, currentEnv, setCurrentEnv, currentOrg } = useApp();
   const [response, setResponse] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [responseFilter, setResponseFilter] = useState('');
+  const [uploading, setUploading] = useState(false);
   const [showSaveDialog, setShowSaveDialog] = useState(false);
   const [showSaveAsDialog, setShowSaveAsDialog] = useState(false);
   const [showDeleteDialog, setShowDeleteDialog] = useState(false);
@@ -137,7 +139,13 @@ const RequestBuilder = ({ request }) => {
           headers: requestToExecute.headers,
           params: requestToExecute.params,
           body: requestToExecute.body,
-          auth: requestToExecute.auth
+          auth: requestToExecute.auth,
+          org_id: currentOrg?.org_id,
+          request_id: request.request_id.startsWith('req_new_') ? null : request.request_id,
+          // Filtered server-side so large bodies never reach the browser; `$...` is JSONPath, anything else jq
+          filter: responseFilter.trim()
+            ? { type: responseFilter.trim().startsWith('$') ? 'jsonpath' : 'jq', expression: responseFilter.trim() }
+            : null
         },
         { withCredentials: true }
       );
@@ -186,6 +194,38 @@ const RequestBuilder = ({ request }) => {
     }
   };
 
+  const handleSaveAsMock = async () => {
+    // Framing headers describe the upstream transfer, not the example body
+    const skipped = ['content-length', 'content-encoding', 'transfer-encoding', 'connection', 'set-cookie'];
+    const mockResponse = {
+      ...(request.mock_response || {}),
+      enabled: true,
+      status: response.status,
+      headers: Object.entries(response.headers || {})
+        .filter(([key]) => !skipped.includes(key.toLowerCase()))
+        .map(([key, value]) => ({ key, value: String(value), enabled: true })),
+      body: typeof response.body === 'string' ? response.body : JSON.stringify(response.body, null, 2)
+    };
+    try {
+      await axios.put(
+        `${API}/requests/${request.request_id}`,
+        { mock_response: mockResponse },
+        { withCredentials: true }
+      );
+      updateRequest(request.request_id, { mock_response: mockResponse });
+      toast({
+        title: 'Mock saved',
+        description: `Served at /${request.collection_id}/... by the mock server`,
+      });
+    } catch (error) {
+      toast({
+        title: 'Save failed',
+        description: error.response?.data?.detail || error.message,
+        variant: 'destructive'
+      });
+    }
+  };
+
   const handleSaveAs = () => {
     setSaveAsName(request.name + ' (Copy)');
     setSelectedCollection(request.collection_id);
@@ -339,6 +379,33 @@ const RequestBuilder = ({ request }) => {
     }
   };
 
+  const handleBodyFileUpload = async (e) => {
+    const file = e.target.files?.[0];
+    if (!file || !currentOrg) return;
+    setUploading(true);
+    try {
+      // Sent as the raw request body so the backend can stream it to storage
+      const uploadResponse = await axios.post(
+        `${API}/organizations/${currentOrg.org_id}/blobs`,
+        file,
+        {
+          params: { filename: file.name },
+          headers: { 'Content-Type': file.type || 'application/octet-stream' },
+          withCredentials: true
+        }
+      );
+      updateField('body', { type: 'binary', content: '', blob_id: uploadResponse.data.blob_id, filename: file.name });
+    } catch (error) {
+      toast({
+        title: 'Upload failed',
+        description: error.response?.data?.detail || error.message,
+        variant: 'destructive'
+      });
+    } finally {
+      setUploading(false);
+    }
+  };
+
   const handleBeautifyBody = () => {
     try {
       const content = request.body?.content || '';
@@ -876,10 +943,25 @@ const RequestBuilder = ({ request }) => {
                     <SelectItem value="json">JSON</SelectItem>
                     <SelectItem value="form">Form Data</SelectItem>
                     <SelectItem value="raw">Raw</SelectItem>
+                    <SelectItem value="binary">Binary File</SelectItem>
                   </SelectContent>
                 </Select>
 
-                {request.body?.type !== 'none' && (
+                {request.body?.type === 'binary' && (
+                  <div className="space-y-2">
+                    <input
+                      type="file"
+                      onChange={handleBodyFileUpload}
+                      disabled={uploading}
+                      className="block w-full text-sm text-zinc-400 file:mr-4 file:py-2 file:px-3 file:rounded file:border-0 file:bg-zinc-800 file:text-zinc-100 hover:file:bg-zinc-700"
+                    />
+                    <p className="text-xs text-zinc-500">
+                      {uploading ? 'Uploading...' : request.body?.filename ? `Attached: ${request.body.filename}` : 'No file attached'}
+                    </p>
+                  </div>
+                )}
+
+                {request.body?.type !== 'none' && request.body?.type !== 'binary' && (
                   <div className="space-y-2">
                     <div className="flex items-center justify-end">
                       <Button
@@ -925,8 +1007,35 @@ const RequestBuilder = ({ request }) => {
                     <span className="text-sm text-zinc-500">Time: {response.time}ms</span>
                     <span className="text-sm text-zinc-500">Size: {response.size}</span>
                   </div>
+                  <div className="flex items-center gap-2">
+                    {!request.request_id.startsWith('req_new_') && !response.filter && response.content?.kind !== 'binary' && !response.content?.truncated && (
+                      <Button
+                        onClick={handleSaveAsMock}
+                        variant="ghost"
+                        size="sm"
+                        className="text-zinc-400 hover:text-zinc-200"
+                      >
+                        Save as mock
+                      </Button>
+                    )}
+                    <input
+                      value={responseFilter}
+                      onChange={(e) => setResponseFilter(e.target.value)}
+                      onKeyDown={(e) => e.key === 'Enter' && handleSendRequest()}
+                      placeholder="Filter: .items[].id or $..id"
+                      className="w-56 bg-zinc-900 border border-zinc-800 rounded px-2 py-1 text-sm text-zinc-300 font-mono placeholder:text-zinc-600 focus:outline-none focus:border-zinc-600"
+                    />
+                  </div>
                 </div>
 
+                {response.filter && (
+                  <div className={`px-4 py-2 border-b border-zinc-800 text-xs font-mono ${response.filter.error ? 'text-red-400' : 'text-zinc-500'}`}>
+                    {response.filter.error
+                      ? `Filter failed: ${response.filter.error}`
+                      : `Filtered with ${response.filter.type}${response.filter.count !== undefined ? ` · ${response.filter.count} results` : ''}${response.filter.truncated ? ' (truncated)' : ''}`}
+                  </div>
+                )}
+
                 <Tabs defaultValue="body" className="flex-1">
                   <TabsList className="w-full justify-start flex-nowrap gap-2 border-b border-zinc-800 bg-zinc-900 rounded-none h-auto p-2 overflow-x-auto">
                     <TabsTrigger
@@ -944,9 +1053,42 @@ const RequestBuilder = ({ request }) => {
                   </TabsList>
 
                   <TabsContent value="body" className="p-4 flex-1">
-                    <pre className="text-sm text-zinc-300 font-mono bg-zinc-900 p-4 rounded overflow-auto">
-                      {JSON.stringify(response.body, null, 2)}
-                    </pre>
+                    {response.content?.truncated && (
+                      <div className="mb-2 text-xs text-zinc-500">
+                        {response.content.kind === 'binary'
+                          ? `Binary body (${response.size}) is too large to preview`
+                          : `Showing the first part of a ${response.size} body`}
+                      </div>
+                    )}
+                    {response.content?.kind === 'binary' ? (
+                      <div className="space-y-3">
+                        {response.body && response.content.mime_type?.startsWith('image/') && (
+                          <img
+                            src={`data:${response.content.mime_type};base64,${response.body}`}
+                            alt="Response"
+                            className="max-w-full max-h-96 rounded border border-zinc-800"
+                          />
+                        )}
+                        <pre className="text-xs text-zinc-400 font-mono bg-zinc-900 p-4 rounded overflow-auto whitespace-pre-wrap">
+                          {response.content.preview_hex}
+                        </pre>
+                        {(response.body || response.content.blob_id) && (
+                          <a
+                            href={response.content.blob_id
+                              ? `${API}/organizations/${currentOrg?.org_id}/blobs/${response.content.blob_id}/content`
+                              : `data:${response.content.mime_type || 'application/octet-stream'};base64,${response.body}`}
+                            download="response"
+                            className="text-sm text-zinc-300 underline"
+                          >
+                            Download ({response.content.mime_type || 'binary'})
+                          </a>
+                        )}
+                      </div>
+                    ) : (
+                      <pre className="text-sm text-zinc-300 font-mono bg-zinc-900 p-4 rounded overflow-auto">
+                        {typeof response.body === 'string' ? response.body : JSON.stringify(response.body, null, 2)}
+                      </pre>
+                    )}
                   </TabsContent>
 
                   <TabsContent value="headers" className="p-4">
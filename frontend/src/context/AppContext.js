@@ -96,18 +96,17 @@ export const AppProvider = ({ children }) => {
     const loadOrgData = async () => {
       if (currentOrg && user) {
         try {
-          const [roleRes, collectionsRes, requestsRes, envsRes] = await Promise.all([
-            axios.get(`${API}/organizations/${currentOrg.org_id}/my-role`, { withCredentials: true }),
-            axios.get(`${API}/organizations/${currentOrg.org_id}/collections`, { withCredentials: true }),
-            axios.get(`${API}/organizations/${currentOrg.org_id}/requests`, { withCredentials: true }),
-            axios.get(`${API}/organizations/${currentOrg.org_id}/environments`, { withCredentials: true })
-          ]);
+          // One call for the whole workspace; the browser revalidates it with its ETag
+          const { data } = await axios.get(
+            `${API}/organizations/${currentOrg.org_id}/bootstrap`,
+            { withCredentials: true }
+          );
 
-          setCurrentOrgRole(roleRes.data.role);
-          setCollections(collectionsRes.data);
-          setRequests(requestsRes.data);
-          setEnvironments(envsRes.data);
-          if (envsRes.data.length > 0) setCurrentEnv(envsRes.data[0]);
+          setCurrentOrgRole(data.role);
+          setCollections(data.collections);
+          setRequests(data.requests);
+          setEnvironments(data.environments);
+          if (data.environments.length > 0) setCurrentEnv(data.environments[0]);
           // Note: History is managed locally via localStorage, not from API
         } catch (error) {
           console.error('Failed to load org data:', error);